@@ -1,14 +1,66 @@
+import atexit
+import copy
 import json
 import os
+import tempfile
+import threading
+from types import MappingProxyType
 
+from utils.config_diff import diff_configs, merge_configs
+from utils.config_shards import ConfigShards
+from utils.file_lock import FileLock
+from utils.file_watcher import FileWatcher, file_signature
 from utils.logger import Logger
+from utils.record_store import RecordStore
+
+
+def freeze(value):
+    """
+    将配置转换为只读快照：dict 转为 MappingProxyType，list 转为 tuple
+    Args:
+        value: 从JSON解析得到的配置
+    Returns:
+        只读的配置
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
 
 
 class Config:
+    SAVE_DELAY = 0.5  # 合并写入的等待时间（秒），期间的多次保存只写一次文件
+
     def __init__(self):
         self.config_file = "config.json"  # 配置文件路径在根目录
         self.logger = Logger()
 
+        # 配置缓存：只在文件的 mtime、inode 或大小变化后重新解析
+        self._lock = threading.RLock()
+        self._data = None  # 最近一次解析的配置
+        self._snapshot = None  # _data 的只读快照
+        self._records = None  # _data 中记录的索引，单条记录的修改先写入这里
+        self._records_modified = False  # _records 有修改尚未同步到 _data
+        self._signature = None  # 解析时的文件状态签名
+        self._base = None  # 最近一次读取或写入文件时的配置快照，作为合并外部修改时的共同版本
+        self._unnotified = None  # 合并外部修改前的快照，尚未通知监听者时不为None
+        self._stale = True  # 文件监视器报告变化后置为 True
+        self.generation = 0  # 配置每变化一次加一，使用方可据此判断是否需要刷新
+        self._watcher = None
+
+        # 延迟写入：保存时先更新缓存，SAVE_DELAY 后统一写入文件
+        self._dirty = False
+        self._save_timer = None
+
+        self._listeners = []  # 配置文件被外部修改后的回调，参数为 ConfigDiff
+        self._state = {}  # 运行状态，JSON模式下只保存在内存中
+
+        # include 字段引用的分片文件，与主配置中的记录合并后提供给更新器
+        self._shards = ConfigShards(freeze)
+        self._merged_platforms = None  # 合并后的记录，平台标识 -> 记录配置元组
+        self._merged_version = None  # _merged_platforms 对应的 (主配置快照, 分片版本)
+
         self.default_config = {
             "platforms": {},  # DNS平台配置
             "settings": {
@@ -17,30 +69,366 @@ class Config:
             }
         }
 
+        self._open()
+
+        # 退出前写入尚未保存的修改
+        atexit.register(self.flush)
+
+    def _open(self):
+        """打开存储，子类可替换为其他存储"""
         # 确保配置文件存在
         if not os.path.exists(self.config_file):
-            self.save_config(self.default_config)
+            self.save_config(self.default_config, immediate=True)
 
-    def load_config(self):
-        """加载配置"""
+        # 监视配置文件，外部修改后使缓存失效
+        self._watcher = FileWatcher(self.config_file, self._on_file_changed)
+        self._watcher.start()
+
+    def _on_file_changed(self):
+        """配置文件发生变化（在监视线程中调用）"""
+        self._stale = True
+        if self._listeners:
+            self._reload_and_notify()
+
+    def add_listener(self, callback):
+        """
+        注册配置热加载回调：配置文件被其他程序修改后，在监视线程中以 ConfigDiff 调用。
+        本程序自身的保存不会触发回调
+        Args:
+            callback: 回调函数
+        """
+        self._listeners.append(callback)
+
+    def _reload_and_notify(self):
+        """重新解析配置文件，有差异时通知监听者"""
+        with self._lock:
+            if self._data is not None:
+                self._sync_records()
+            old_snapshot, generation = self._snapshot, self.generation
+            self._refresh()
+            diff = self._take_external_diff(old_snapshot if self.generation != generation else None)
+
+        self._notify(diff)
+
+    def _take_external_diff(self, old_snapshot=None):
+        """
+        计算外部修改带来的差异，合并外部修改后尚未通知的差异优先
+        Args:
+            old_snapshot: 重新解析前的快照，为None且没有待通知的合并时返回None
+        Returns:
+            ConfigDiff: 差异
+        """
+        if self._unnotified is not None:
+            old_snapshot, self._unnotified = self._unnotified, None
+        if old_snapshot is None:
+            return None
+        self._sync_records()
+        signature = self._signature
+        return diff_configs(old_snapshot, self._snapshot, signature[0] / 1e9 if signature else None)
+
+    def _notify(self, diff):
+        """通知监听者"""
+        if not diff:
+            return
+        self.logger.info(f"检测到配置文件变化：{diff.summary()}")
+        for callback in list(self._listeners):
+            try:
+                callback(diff)
+            except Exception as e:
+                self.logger.error(f"处理配置变化失败: {str(e)}")
+
+    def _refresh(self):
+        """文件状态签名变化时重新解析配置，否则使用缓存"""
+        with self._lock:
+            # 监视器可用且未报告变化时无需检查文件
+            if self._data is not None and not self._stale and self._watcher and self._watcher.using_inotify:
+                return
+
+            self._stale = False
+            signature = file_signature(self.config_file)
+            if self._data is not None and signature == self._signature:
+                return
+
+            # 有尚未写入的修改时，把其他程序的修改合并进内存，写入时一并保存
+            if self._dirty:
+                self._merge_external()
+                return
+
+            try:
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                self.logger.error(f"加载配置文件失败: {str(e)}")
+                if self._data is not None:
+                    return  # 保留上一次成功解析的配置
+                data = copy.deepcopy(self.default_config)
+
+            self._set_data(data, signature)
+            self._base = self._snapshot
+
+    def _merge_external(self):
+        """
+        重新读取被其他程序修改的配置文件，与本程序尚未写入的修改三方合并。
+        无法合并时放弃本程序尚未写入的修改，改用文件中的配置
+        Returns:
+            bool: 是否合并成功，文件暂时无法解析（例如正在被其他程序写入）时返回None
+        """
+        signature = file_signature(self.config_file)
         try:
             with open(self.config_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                theirs = json.load(f)
         except Exception as e:
-            self.logger.error(f"加载配置文件失败: {str(e)}")
-            return self.default_config
+            self.logger.warning(f"读取被修改的配置文件失败，稍后重试: {str(e)}")
+            return None
+
+        self._sync_records()
+        if self._unnotified is None:
+            self._unnotified = self._snapshot
+
+        merged, conflicts = merge_configs(self._base, self._data, theirs)
+        if conflicts:
+            self.logger.error(f"配置文件已被其他程序修改，与尚未保存的修改冲突（{', '.join(map(str, conflicts[:5]))}），"
+                              f"已放弃当前程序的修改并重新加载")
+            self._set_data(theirs, signature)
+            self._base = self._snapshot
+            self._dirty = False
+            return False
+
+        self.logger.info("配置文件已被其他程序修改，已与尚未保存的修改合并")
+        self._set_data(merged, signature)
+        self._base = freeze(theirs)
+        return True
+
+    def _set_data(self, data, signature):
+        """更新缓存"""
+        self._data = data
+        self._snapshot = freeze(data)
+        self._records = RecordStore.from_platforms(data.get('platforms'))
+        self._records_modified = False
+        self._signature = signature
+        self.generation += 1
+
+    def _sync_records(self):
+        """把单条记录的修改同步到完整配置和快照，在需要完整配置时才执行"""
+        if self._records_modified:
+            self._data['platforms'] = self._records.to_platforms()
+            self._snapshot = freeze(self._data)
+            self._records_modified = False
+
+    def get_snapshot(self):
+        """
+        获取配置的只读快照，不复制、不解析，适合频繁读取
+        Returns:
+            MappingProxyType: 只读配置，其中的列表为 tuple
+        """
+        self._refresh()
+        with self._lock:
+            self._sync_records()
+            return self._snapshot
+
+    def load_config(self):
+        """加载配置，返回可修改的副本"""
+        self._refresh()
+        with self._lock:
+            self._sync_records()
+            return copy.deepcopy(self._data)
+
+    def get_record_store(self):
+        """
+        获取记录索引，只用于查询，修改请使用 upsert_record / delete_record
+        Returns:
+            RecordStore: 记录索引
+        """
+        self._refresh()
+        return self._records
+
+    def get_record(self, key):
+        """
+        按主键获取记录
+        Args:
+            key: (平台标识, 主机名, 域名, 记录类型)
+        Returns:
+            dict: 记录配置的副本，不存在返回None
+        """
+        self._refresh()
+        with self._lock:
+            return self._records.get(key)
 
-    def save_config(self, config):
-        """保存配置"""
+    def upsert_record(self, platform_name, record, old_key=None):
+        """
+        新增或修改单条记录，只更新索引，完整配置在读取或写入文件时才重新生成
+        Args:
+            platform_name: 平台标识
+            record: 记录配置
+            old_key: 修改前的主键
+        Returns:
+            tuple: 记录的主键
+        """
+        self._refresh()
+        with self._lock:
+            key = self._records.upsert(platform_name, dict(record), old_key)
+            self._mark_records_modified()
+        return key
+
+    def upsert_records(self, records):
+        """
+        批量新增或修改记录，全部完成后只写入一次
+        Args:
+            records: [(平台标识, 记录配置)]
+        Returns:
+            int: 写入的记录数
+        """
+        self._refresh()
+        with self._lock:
+            count = 0
+            for platform_name, record in records:
+                self._records.upsert(platform_name, dict(record))
+                count += 1
+            if count:
+                self._mark_records_modified()
+        return count
+
+    def delete_record(self, key):
+        """
+        删除单条记录
+        Args:
+            key: 主键
+        Returns:
+            bool: 记录是否存在
+        """
+        self._refresh()
+        with self._lock:
+            deleted = self._records.delete(key)
+            if deleted:
+                self._mark_records_modified()
+        return deleted
+
+    def _mark_records_modified(self):
+        """记录已修改，安排写入文件"""
+        self._records_modified = True
+        self.generation += 1
+        self._dirty = True
+        self._schedule_flush()
+
+    def save_config(self, config, immediate=False):
+        """
+        保存配置：立即更新缓存，文件在 SAVE_DELAY 内没有新的修改后再写入
+        Args:
+            config: 完整配置
+            immediate: 是否立即写入文件
+        """
+        with self._lock:
+            self._set_data(copy.deepcopy(config), self._signature)
+            self._dirty = True
+            if not immediate:
+                self._schedule_flush()
+                return
+
+        self.flush()
+
+    def _schedule_flush(self):
+        """SAVE_DELAY 后写入文件，期间的新修改随同一次写入"""
+        if self._save_timer:
+            return
+        self._save_timer = threading.Timer(self.SAVE_DELAY, self.flush)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def flush(self):
+        """
+        将尚未写入的修改写入文件：持有文件锁，写入同目录下的临时文件并同步到磁盘，
+        再原子替换原文件，写入中途崩溃不会损坏配置。
+        文件已被其他程序修改时，在锁内重新读取并合并；无法合并时放弃写入并重新加载
+        Returns:
+            bool: 是否成功（没有待写入的修改也返回True）
+        """
+        with self._lock:
+            if self._save_timer:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._dirty:
+                return True
+
+            success = self._write_file()
+            diff = self._take_external_diff()
+
+        self._notify(diff)
+        return success
+
+    def _write_file(self):
+        """在文件锁内合并外部修改并写入文件，调用方持有 _lock"""
+        temp_file = None
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=4, ensure_ascii=False)
+            with FileLock(self.config_file):
+                if self._signature is not None and file_signature(self.config_file) != self._signature:
+                    merged = self._merge_external()
+                    if merged is None:
+                        self._schedule_flush()  # 不覆盖无法解析的文件，稍后重试
+                    if not merged:
+                        return False
+                self._sync_records()
+
+                directory = os.path.dirname(os.path.abspath(self.config_file))
+                fd, temp_file = tempfile.mkstemp(prefix='.config.', suffix='.tmp', dir=directory)
+                if os.path.exists(self.config_file):
+                    os.chmod(temp_file, os.stat(self.config_file).st_mode & 0o777)  # 保留原文件权限
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self._data, f, indent=4, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_file, self.config_file)
+                temp_file = None
+                self._sync_directory(directory)
+
+                self._signature = file_signature(self.config_file)
+                self._base = self._snapshot
+                self._stale = False
+                self._dirty = False
+            return True
         except Exception as e:
             self.logger.error(f"保存配置失败: {str(e)}")
+            return False
+        finally:
+            if temp_file:
+                try:
+                    os.remove(temp_file)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _sync_directory(directory):
+        """同步目录项，确保重命名已落盘（Windows 不支持，忽略）"""
+        if os.name != 'posix':
+            return
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def get_state(self, key, default=None):
+        """
+        获取运行状态，例如记录最近一次写入的值
+        Args:
+            key: 状态键
+            default: 不存在时的默认值
+        """
+        with self._lock:
+            return copy.deepcopy(self._state.get(key, default))
+
+    def set_state(self, key, value):
+        """
+        保存运行状态，JSON模式下不写入文件，SQLite模式下持久保存
+        Args:
+            key: 状态键
+            value: 可序列化为JSON的值
+        """
+        with self._lock:
+            self._state[key] = copy.deepcopy(value)
 
     def get_update_interval(self):
         """获取更新间隔（秒）"""
-        config = self.load_config()
+        config = self.get_snapshot()
         return config.get('settings', {}).get('update_interval', 300)
 
     def save_settings(self, settings):
@@ -54,7 +442,7 @@ class Config:
 
     def get_settings(self):
         """获取设置"""
-        config = self.load_config()
+        config = self.get_snapshot()
         settings = config.get('settings', {})
         return {
             'interval': settings.get('update_interval', 300) // 60,  # 转换为分钟
@@ -77,62 +465,105 @@ class Config:
         self.logger.info(f"已保存平台配置: [{platform_name.upper()}][{config_data.get('domain', 'unknown')}]")
 
     def get_platform_config(self, platform_name):
-        """获取平台配置"""
-        config = self.load_config()
+        """获取平台配置（只读）"""
+        config = self.get_snapshot()
         return config.get('platforms', {}).get(platform_name, {})
 
+    def get_platform_configs(self):
+        """
+        获取所有平台的记录配置（只读），包括 include 引用的分片文件中的记录，
+        分片文件只在修改后重新解析
+        Returns:
+            Mapping: 平台标识 -> 记录配置列表
+        """
+        snapshot = self.get_snapshot()
+        if not snapshot.get('include'):
+            return snapshot.get('platforms', {})
+
+        with self._lock:
+            self._refresh_shards(snapshot)
+            version = (snapshot, self._shards.version)
+            if self._merged_version != version:
+                self._merged_platforms = self._merge_shards(snapshot)
+                self._merged_version = version
+            return self._merged_platforms
+
+    def refresh_shards(self):
+        """
+        检查分片文件是否有修改
+        Returns:
+            bool: 分片中的记录是否变化
+        """
+        snapshot = self.get_snapshot()
+        if not snapshot.get('include'):
+            return False
+        with self._lock:
+            return self._refresh_shards(snapshot)
+
+    def _refresh_shards(self, snapshot):
+        """按主配置的 include 字段检查分片文件"""
+        base_dir = os.path.dirname(os.path.abspath(self.config_file))
+        return self._shards.refresh(base_dir, snapshot.get('include'))
+
+    def _merge_shards(self, snapshot):
+        """合并主配置和分片中的记录，主配置中的同名记录优先"""
+        platforms = {}
+        for platform_name, records in snapshot.get('platforms', {}).items():
+            platforms[platform_name] = list(records) if isinstance(records, tuple) else [records]
+
+        own_keys = {key for key, _ in self._records} if self._records is not None else set()
+        for key, platform_name, record in self._shards.records():
+            if key in own_keys:
+                continue
+            platforms.setdefault(platform_name, []).append(record)
+
+        return MappingProxyType({name: tuple(records) for name, records in platforms.items()})
+
     def save_dns_config(self, dns_config):
         """保存DNS配置"""
-        config = self.load_config()
-
         # 新格式直接保存
         if 'platforms' in dns_config:
+            config = self.load_config()
             config['platforms'] = dns_config['platforms']
-        else:
-            # 兼容旧格式
-            platform_name = dns_config.get('platform', '').lower().replace(' ', '_')
-            domain = dns_config.get('domain', '')
+            self.save_config(config)
+            return
 
-            if not platform_name or not domain:
-                self.logger.warning("保存DNS配置失败：缺少平台名称或域名")
-                return
+        # 兼容旧格式
+        platform_name = dns_config.get('platform', '').lower().replace(' ', '_')
+        domain = dns_config.get('domain', '')
+
+        if not platform_name or not domain:
+            self.logger.warning("保存DNS配置失败：缺少平台名称或域名")
+            return
 
-            if 'platforms' not in config:
-                config['platforms'] = {}
+        # 创建新的记录配置
+        record_config = {
+            'domain': domain,
+            'hostname': dns_config.get('hostname', '@'),
+            'record_type': dns_config.get('record_type', 'A')
+        }
 
-            # 保存平台配置
-            if platform_name not in config['platforms']:
-                config['platforms'][platform_name] = []
+        # 根据平台类型添加认证信息
+        if platform_name == 'cloudflare':
+            record_config['api_token'] = dns_config.get('api_token', '')
+        elif platform_name == 'tencent':
+            record_config['secret_id'] = dns_config.get('secret_id', '')
+            record_config['secret_key'] = dns_config.get('secret_key', '')
 
-            # 如果不是列表，转换为列表
-            if not isinstance(config['platforms'][platform_name], list):
-                config['platforms'][platform_name] = [config['platforms'][platform_name]]
+        # 更新或添加记录
+        self.upsert_record(platform_name, record_config)
 
-            # 创建新的记录配置
-            record_config = {
-                'domain': domain,
-                'hostname': dns_config.get('hostname', '@'),
-                'record_type': dns_config.get('record_type', 'A')
-            }
 
-            # 根据平台类型添加认证信息
-            if platform_name == 'cloudflare':
-                record_config['api_token'] = dns_config.get('api_token', '')
-            elif platform_name == 'tencent':
-                record_config['secret_id'] = dns_config.get('secret_id', '')
-                record_config['secret_key'] = dns_config.get('secret_key', '')
-
-            # 更新或添加记录
-            found = False
-            for i, record in enumerate(config['platforms'][platform_name]):
-                if (record.get('domain') == domain and
-                        record.get('hostname', '@') == record_config.get('hostname', '@')):
-                    config['platforms'][platform_name][i] = record_config
-                    found = True
-                    break
-
-            if not found:
-                config['platforms'][platform_name].append(record_config)
+def create_config():
+    """
+    创建配置对象：设置了环境变量 DDNS_CONFIG_BACKEND=sqlite 或已存在 config.db 时使用SQLite存储，
+    否则使用 config.json
+    Returns:
+        Config: 配置对象
+    """
+    from utils.sqlite_config import SqliteConfig
 
-        # 保存配置
-        self.save_config(config)
+    backend = os.environ.get('DDNS_CONFIG_BACKEND', '').lower()
+    if backend == 'sqlite' or (backend != 'json' and os.path.exists(SqliteConfig.DB_FILE)):
+        return SqliteConfig()
+    return Config()
@@ -1,7 +1,8 @@
-import importlib
 import time
 
+from dns_platforms import get_platform_class
 from utils.logger import Logger
+from utils.reconciler import Reconciler
 
 
 class DNSUpdater:
@@ -16,6 +17,7 @@ class DNSUpdater:
             'start_time': time.time(),  # 启动时间
         }
         self.platforms = self._init_platforms()
+        self.reconciler = Reconciler()
 
     def get_stats(self):
         """获取统计信息"""
@@ -28,15 +30,8 @@ class DNSUpdater:
         }
 
     def _get_platform_class(self, platform_name):
-        """动态获取DNS平台类"""
-        try:
-            # 将平台名称转换为类名格式 (例如: cloudflare -> CloudflareDNS)
-            class_name = f"{platform_name.title()}DNS"
-            module = importlib.import_module(f"dns_platforms.{platform_name}")
-            return getattr(module, class_name)
-        except Exception as e:
-            self.logger.error(f"加载DNS平台模块失败: {platform_name} - {str(e)}")
-            return None
+        """按需加载DNS平台类"""
+        return get_platform_class(platform_name)
 
     def _init_platforms(self):
         """初始化所有配置的DNS平台"""
@@ -90,46 +85,16 @@ class DNSUpdater:
         # 记录开始更新
         self.logger.info(f"开始更新 {len(self.platforms)} 个DNS记录")
 
-        for platform_key, platform in self.platforms.items():
-            try:
-                # 先获取当前记录
-                try:
-                    current_ipv4, current_ipv6 = platform.get_current_records()
-                except Exception as e:
-                    self.logger.error(f"获取当前记录失败: {str(e)}")
-                    continue
-
-                # 检查是否需要更新
-                need_update = False
-                record_type = platform.record_type
-                current_ip = current_ipv4 if record_type == 'A' else current_ipv6
-                new_ip = ipv4 if record_type == 'A' else ipv6
-
-                if not new_ip:
-                    continue
-
-                # 获取完整域名用于日志
-                full_domain = f"{platform.hostname}.{platform.domain}" if platform.hostname != '@' else platform.domain
-                platform_name = platform.__class__.__name__.replace('DNS', '').upper()
-                log_key = f"[{platform_name}][{full_domain}]"
-
-                if current_ip == new_ip:
-                    self.logger.info(f"{log_key} - 记录已是最新")
-                else:
-                    need_update = True
-                    self.logger.info(f"{log_key} DNS记录需要更新: {record_type}: {current_ip} -> {new_ip}")
-
-                # 只在需要更新时执行更新
-                if need_update:
-                    success = platform.update_records(ipv4, ipv6)
-                    if success:
-                        self._stats['successes'] += 1
-                    else:
-                        self._stats['failures'] += 1
-
-            except Exception as e:
-                self._stats['failures'] += 1
-                self.logger.error(f"[{platform_key}] 检查和更新DNS记录失败: {str(e)}")
+        try:
+            results = self.reconciler.run(self.platforms, ipv4, ipv6)
+            for updated in results.values():
+                if updated is True:
+                    self._stats['successes'] += 1
+                elif updated is False:
+                    self._stats['failures'] += 1
+        except Exception as e:
+            self._stats['failures'] += 1
+            self.logger.error(f"检查和更新DNS记录失败: {str(e)}")
 
         # 记录性能指标
         elapsed = time.time() - start_time
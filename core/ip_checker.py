@@ -1,5 +1,6 @@
 import requests
 
+from utils import http_client
 from utils.logger import Logger
 
 
@@ -25,7 +26,7 @@ class IPChecker:
     def _get_ip(self, url, ip_type):
         """从指定URL获取IP地址"""
         try:
-            response = requests.get(url, timeout=self.timeout)
+            response = http_client.request('GET', url, timeout=self.timeout)
             if response.status_code == 200:
                 ip = response.text.strip()
                 self.logger.debug(f"获取{ip_type}地址成功: {ip}")
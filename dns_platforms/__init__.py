@@ -1,23 +1,31 @@
 """
-@Project ：DDNS 
+@Project ：DDNS
 @File    ：__init__.py
-@IDE     ：PyCharm 
+@IDE     ：PyCharm
 @Author  ：杨逸轩
-@Date    ：2024/11/30 23:49 
+@Date    ：2024/11/30 23:49
 """
-from .aliyun import AliyunDNS
-# 导出所有平台类
-from .cloudflare import CloudflareDNS
-from .tencent import TencentDNS
+from .registry import (PROVIDERS, CAP_BATCH_WRITE, CAP_ZONE_LISTING, get_platform_class, get_spec,
+                       has_capability)
 
 # 平台名称到模块的映射
-PLATFORM_MAPPING = {
-    'Cloudflare': 'cloudflare',
-    '腾讯云': 'tencent'
-    , '阿里云': 'aliyun'
-}
+PLATFORM_MAPPING = {spec.label: spec.platform_id for spec in PROVIDERS.values()}
 
 # 平台显示名称列表
 PLATFORM_NAMES = list(PLATFORM_MAPPING.keys())
 
-__all__ = ['CloudflareDNS', 'TencentDNS', 'AliyunDNS', 'PLATFORM_MAPPING', 'PLATFORM_NAMES']
+
+def __getattr__(name):
+    """按需导出平台类，例如 from dns_platforms import CloudflareDNS 时才导入该平台"""
+    for spec in PROVIDERS.values():
+        if spec.class_name == name:
+            platform_class = get_platform_class(spec.platform_id)
+            if platform_class:
+                return platform_class
+            raise ImportError(f"无法加载DNS平台: {spec.platform_id}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ['CloudflareDNS', 'TencentDNS', 'AliyunDNS', 'DnspodDNS', 'Rfc2136DNS', 'PLATFORM_MAPPING',
+           'PLATFORM_NAMES', 'PROVIDERS', 'CAP_BATCH_WRITE', 'CAP_ZONE_LISTING', 'get_platform_class',
+           'get_spec', 'has_capability']
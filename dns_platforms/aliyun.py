@@ -6,10 +6,7 @@
 @Date    ：2023/12/02
 """
 
-from alibabacloud_alidns20150109 import models as alidns_models
-from alibabacloud_alidns20150109.client import Client
-from alibabacloud_tea_openapi import models as open_api_models
-
+from .api_clients import AliyunRpcClient
 from .base import BaseDNS
 
 
@@ -35,6 +32,8 @@ class AliyunDNS(BaseDNS):
         }
     }
 
+    DOMAIN_PAGE_SIZE = 100  # 域名列表分页大小（接口上限100）
+
     def __init__(self, config):
         """
         初始化阿里云DNS客户端
@@ -43,20 +42,21 @@ class AliyunDNS(BaseDNS):
         """
         super().__init__(config)
         self.client = self._create_client()
+        self._record_id = None  # 最近一次读取到的记录ID
 
     def _create_client(self):
         """
         创建阿里云DNS客户端
         Returns:
-            Client: 阿里云DNS客户端实例，失败返回None
+            AliyunRpcClient: 阿里云DNS客户端实例，失败返回None
         """
         try:
-            config = open_api_models.Config(
-                access_key_id=self.config.get('access_key_id'),
-                access_key_secret=self.config.get('access_key_secret')
+            return AliyunRpcClient(
+                self.config.get('access_key_id'),
+                self.config.get('access_key_secret'),
+                endpoint='alidns.cn-hangzhou.aliyuncs.com',
+                version='2015-01-09'
             )
-            config.endpoint = 'alidns.cn-hangzhou.aliyuncs.com'
-            return Client(config)
         except Exception as e:
             self.logger.error(f"创建阿里云DNS客户端失败: {str(e)}")
             return None
@@ -65,41 +65,56 @@ class AliyunDNS(BaseDNS):
         """
         获取可用域名列表
         Returns:
-            list: 域名列表
+            list: 域名列表（分页拉取全部域名）
         """
         try:
-            request = alidns_models.DescribeDomainsRequest()
-            response = self.client.describe_domains(request)
-            domains = response.body.domains.domain
-            return [domain.domain_name for domain in domains]
+            domains = []
+            page_number = 1
+            while True:
+                response = self.client.call('DescribeDomains', PageNumber=page_number, PageSize=self.DOMAIN_PAGE_SIZE)
+                page = response.get('Domains', {}).get('Domain', [])
+                domains.extend(domain['DomainName'] for domain in page)
+                if not page or len(domains) >= response.get('TotalCount', 0):
+                    break
+                page_number += 1
+            return domains
         except Exception as e:
             self.logger.error(f"获取域名列表失败: {str(e)}")
             return []
 
     def get_current_records(self):
-        """获取当前DNS记录"""
+        """获取当前DNS记录，同时记下记录ID供本轮写入使用"""
         try:
             if not self.client:
                 self.logger.error("阿里云DNS客户端未初始化")
                 return None, None
 
-            request = alidns_models.DescribeDomainRecordsRequest(
-                domain_name=self.domain,
-                rrkey_word=self.hostname,
-                type=self.record_type
+            response = self.client.call(
+                'DescribeDomainRecords',
+                DomainName=self.domain,
+                RRKeyWord=self.hostname,
+                Type=self.record_type
             )
-
-            response = self.client.describe_domain_records(request)
-            records = response.body.domain_records.record
+            records = response.get('DomainRecords', {}).get('Record', [])
 
             ipv4 = None
             ipv6 = None
+            self._record_id = None
 
             for record in records:
-                if record.type == 'A' and record.rr == self.hostname:
-                    ipv4 = record.value
-                elif record.type == 'AAAA' and record.rr == self.hostname:
-                    ipv6 = record.value
+                if record.get('RR') != self.hostname:
+                    continue
+                if record.get('Type') == self.record_type:
+                    self._record_id = record['RecordId']
+                    self.metadata_cache.set('aliyun.record', self._record_cache_key(), record['RecordId'])
+                if record.get('Type') == 'A':
+                    ipv4 = record.get('Value')
+                elif record.get('Type') == 'AAAA':
+                    ipv6 = record.get('Value')
+
+            # 记录已不存在时丢弃持久化的记录ID，写入时改为创建
+            if not self._record_id:
+                self.metadata_cache.invalidate('aliyun.record', self._record_cache_key())
 
             return ipv4, ipv6
 
@@ -108,48 +123,42 @@ class AliyunDNS(BaseDNS):
             return None, None
 
     def _update_record(self, value):
-        """更新记录"""
+        """更新记录，记录不存在时创建"""
         try:
             if not self.client:
                 self.logger.error("阿里云DNS客户端未初始化")
                 return False
 
-            request = alidns_models.DescribeDomainRecordsRequest(
-                domain_name=self.domain,
-                rrkey_word=self.hostname,
-                type=self.record_type
-            )
-
-            response = self.client.describe_domain_records(request)
-            records = response.body.domain_records.record
-
-            # 如果找到记录就更新，否则创建新记录
-            if records:
-                for record in records:
-                    if record.type == self.record_type and record.rr == self.hostname:
-                        try:
-                            update_request = alidns_models.UpdateDomainRecordRequest(
-                                record_id=record.record_id,
-                                rr=self.hostname,
-                                type=self.record_type,
-                                value=value
-                            )
-                            self.client.update_domain_record(update_request)
-                            self.logger.info(f"[ALIYUN][{self.domain}] - 记录更新成功")
-                            return True
-                        except Exception as e:
-                            self.logger.error(f"更新记录失败: {str(e)}")
-                            return False
+            # 已知记录ID就更新，否则创建新记录
+            record_id = self._record_id or self.metadata_cache.get('aliyun.record', self._record_cache_key())
+            if record_id:
+                try:
+                    self.client.call(
+                        'UpdateDomainRecord',
+                        RecordId=record_id,
+                        RR=self.hostname,
+                        Type=self.record_type,
+                        Value=value
+                    )
+                    self.logger.info(f"[ALIYUN][{self.domain}] - 记录更新成功")
+                    return True
+                except Exception as e:
+                    if self._is_not_found(e):
+                        self.clear_cache()
+                    self.logger.error(f"更新记录失败: {str(e)}")
+                    return False
 
             # 创建新记录
             try:
-                add_request = alidns_models.AddDomainRecordRequest(
-                    domain_name=self.domain,
-                    rr=self.hostname,
-                    type=self.record_type,
-                    value=value
+                response = self.client.call(
+                    'AddDomainRecord',
+                    DomainName=self.domain,
+                    RR=self.hostname,
+                    Type=self.record_type,
+                    Value=value
                 )
-                self.client.add_domain_record(add_request)
+                self._record_id = response['RecordId']
+                self.metadata_cache.set('aliyun.record', self._record_cache_key(), self._record_id)
                 self.logger.info(f"[ALIYUN][{self.domain}] - 新记录创建成功")
                 return True
             except Exception as e:
@@ -160,37 +169,17 @@ class AliyunDNS(BaseDNS):
             self.logger.error(f"更新记录失败: {str(e)}")
             return False
 
-    def clear_cache(self):
-        """清除缓存（如果有的话）"""
-        pass
+    def _record_cache_key(self):
+        """记录ID的持久化缓存键"""
+        return f"{self.get_credential_fingerprint()}:{self.domain}:{self.hostname}:{self.record_type}"
 
-    def update_records(self, ipv4, ipv6):
-        """更新DNS记录"""
-        try:
-            current_ipv4, current_ipv6 = self.get_current_records()
-            full_domain = f"{self.hostname}.{self.domain}" if self.hostname != '@' else self.domain
+    @staticmethod
+    def _is_not_found(error):
+        """判断接口错误是否表示记录不存在"""
+        code = str(getattr(error, 'code', '') or '')
+        return 'NotExist' in code or 'NotFound' in code or code == 'DomainRecordNotBelongToUser'
 
-            # 根据记录类型检查是否需要更新
-            if self.record_type == 'A':
-                if not ipv4:
-                    self.logger.warning(f"[ALIYUN][{full_domain}] - 未提供IPv4地址")
-                    return False
-                if current_ipv4 == ipv4:
-                    self.logger.info(f"[ALIYUN][{full_domain}] - 记录已是最新")
-                    return True
-                return self._update_record(ipv4)
-
-            elif self.record_type == 'AAAA':
-                if not ipv6:
-                    self.logger.warning(f"[ALIYUN][{full_domain}] - 未提供IPv6地址")
-                    return False
-                if current_ipv6 == ipv6:
-                    self.logger.info(f"[ALIYUN][{full_domain}] - 记录已是最新")
-                    return True
-                return self._update_record(ipv6)
-
-            return False
-
-        except Exception as e:
-            self.logger.error(f"更新记录失败: {str(e)}")
-            return False
+    def clear_cache(self):
+        """清除缓存的记录ID，包括持久化的元数据"""
+        self._record_id = None
+        self.metadata_cache.invalidate('aliyun.record', self._record_cache_key())
@@ -0,0 +1,186 @@
+"""
+@Project ：DDNS
+@File    ：api_clients.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+阿里云、腾讯云接口的轻量签名客户端，直接基于共享HTTP层实现，无需官方SDK
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from utils import http_client
+
+
+class ApiError(Exception):
+    """云平台接口返回的错误"""
+
+    def __init__(self, code, message, request_id=None):
+        super().__init__(f"[{code}] {message}")
+        self.code = code
+        self.message = message
+        self.request_id = request_id
+
+
+class AliyunRpcClient:
+    """阿里云 RPC 风格接口客户端（签名算法 HMAC-SHA1）"""
+
+    def __init__(self, access_key_id, access_key_secret, endpoint, version):
+        """
+        Args:
+            access_key_id: AccessKey ID
+            access_key_secret: AccessKey Secret
+            endpoint: 接口域名，例如 alidns.cn-hangzhou.aliyuncs.com
+            version: 接口版本，例如 2015-01-09
+        """
+        self.access_key_id = access_key_id
+        self.access_key_secret = access_key_secret
+        self.endpoint = endpoint
+        self.version = version
+
+    @staticmethod
+    def _percent_encode(value):
+        """按阿里云规范进行URL编码"""
+        return quote(str(value), safe='~')
+
+    def _sign(self, params):
+        """计算请求签名"""
+        canonicalized = '&'.join(
+            f"{self._percent_encode(k)}={self._percent_encode(v)}" for k, v in sorted(params.items())
+        )
+        string_to_sign = f"GET&%2F&{self._percent_encode(canonicalized)}"
+        digest = hmac.new(f"{self.access_key_secret}&".encode('utf-8'),
+                          string_to_sign.encode('utf-8'), hashlib.sha1).digest()
+        return base64.b64encode(digest).decode('utf-8')
+
+    def call(self, action, **params):
+        """
+        调用接口
+        Args:
+            action: 接口名称，例如 DescribeDomainRecords
+            **params: 接口参数，值为None的参数会被忽略
+        Returns:
+            dict: 响应内容
+        Raises:
+            ApiError: 接口返回错误
+        """
+        query = {k: v for k, v in params.items() if v is not None}
+        query.update({
+            'Action': action,
+            'Format': 'JSON',
+            'Version': self.version,
+            'AccessKeyId': self.access_key_id,
+            'SignatureMethod': 'HMAC-SHA1',
+            'SignatureVersion': '1.0',
+            'SignatureNonce': uuid.uuid4().hex,
+            'Timestamp': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        })
+        query['Signature'] = self._sign(query)
+
+        response = http_client.request('GET', f"https://{self.endpoint}/", params=query)
+        try:
+            data = response.json()
+        except ValueError:
+            raise ApiError(f"HTTP{response.status_code}", response.text[:200])
+
+        if not response.ok:
+            raise ApiError(data.get('Code', f"HTTP{response.status_code}"), data.get('Message', ''),
+                           data.get('RequestId'))
+        return data
+
+
+class TencentCloudClient:
+    """腾讯云 API 3.0 客户端（签名算法 TC3-HMAC-SHA256）"""
+
+    def __init__(self, secret_id, secret_key, service, version, region=''):
+        """
+        Args:
+            secret_id: SecretId
+            secret_key: SecretKey
+            service: 产品名，例如 teo、dnspod
+            version: 接口版本，例如 2022-09-01
+            region: 地域，全局接口可为空
+        """
+        self.secret_id = secret_id
+        self.secret_key = secret_key
+        self.service = service
+        self.version = version
+        self.region = region
+        self.host = f"{service}.tencentcloudapi.com"
+
+    @staticmethod
+    def _hmac(key, message):
+        return hmac.new(key, message.encode('utf-8'), hashlib.sha256).digest()
+
+    def _authorization(self, action, payload, timestamp):
+        """计算 Authorization 请求头"""
+        date = datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d')
+        content_type = 'application/json; charset=utf-8'
+        signed_headers = 'content-type;host;x-tc-action'
+
+        canonical_request = '\n'.join([
+            'POST',
+            '/',
+            '',
+            f"content-type:{content_type}\nhost:{self.host}\nx-tc-action:{action.lower()}\n",
+            signed_headers,
+            hashlib.sha256(payload.encode('utf-8')).hexdigest(),
+        ])
+        credential_scope = f"{date}/{self.service}/tc3_request"
+        string_to_sign = '\n'.join([
+            'TC3-HMAC-SHA256',
+            str(timestamp),
+            credential_scope,
+            hashlib.sha256(canonical_request.encode('utf-8')).hexdigest(),
+        ])
+
+        secret_date = self._hmac(f"TC3{self.secret_key}".encode('utf-8'), date)
+        secret_service = self._hmac(secret_date, self.service)
+        secret_signing = self._hmac(secret_service, 'tc3_request')
+        signature = hmac.new(secret_signing, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+
+        return (f"TC3-HMAC-SHA256 Credential={self.secret_id}/{credential_scope}, "
+                f"SignedHeaders={signed_headers}, Signature={signature}")
+
+    def call(self, action, params=None):
+        """
+        调用接口
+        Args:
+            action: 接口名称，例如 DescribeZones
+            params: 接口参数
+        Returns:
+            dict: 响应中的 Response 内容
+        Raises:
+            ApiError: 接口返回错误
+        """
+        payload = json.dumps(params or {})
+        timestamp = int(time.time())
+        headers = {
+            'Authorization': self._authorization(action, payload, timestamp),
+            'Content-Type': 'application/json; charset=utf-8',
+            'Host': self.host,
+            'X-TC-Action': action,
+            'X-TC-Timestamp': str(timestamp),
+            'X-TC-Version': self.version,
+        }
+        if self.region:
+            headers['X-TC-Region'] = self.region
+
+        response = http_client.request('POST', f"https://{self.host}/", data=payload.encode('utf-8'), headers=headers)
+        try:
+            result = response.json().get('Response', {})
+        except ValueError:
+            raise ApiError(f"HTTP{response.status_code}", response.text[:200])
+
+        error = result.get('Error')
+        if error:
+            raise ApiError(error.get('Code', ''), error.get('Message', ''), result.get('RequestId'))
+        return result
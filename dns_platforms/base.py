@@ -8,9 +8,19 @@
 DNS平台的基类，定义了所有DNS平台必须实现的接口
 """
 
+import hashlib
+import json
 from abc import ABC, abstractmethod
 
 from utils.logger import Logger
+from utils.metadata_cache import MetadataCache
+from .registry import has_capability
+
+# 描述记录本身而非凭据的配置字段
+RECORD_FIELDS = ('platform', 'hostname', 'domain', 'record_type')
+
+# 记录的调度设置：更新间隔（秒）、优先级、复核间隔（秒），修改后无需重建平台实例
+SCHEDULE_FIELDS = ('interval', 'priority', 'verify_interval')
 
 
 class BaseDNS(ABC):
@@ -27,6 +37,33 @@ class BaseDNS(ABC):
         self.hostname = config.get('hostname', '@')
         self.record_type = config.get('record_type', 'A')
         self.logger = Logger()
+        self.metadata_cache = MetadataCache()
+
+    @classmethod
+    def platform_id(cls):
+        """平台标识，即平台模块名"""
+        return cls.__module__.rsplit('.', 1)[-1]
+
+    @classmethod
+    def supports(cls, capability):
+        """平台是否支持指定能力，能力在注册表中声明"""
+        return has_capability(cls.platform_id(), capability)
+
+    @classmethod
+    def new_cycle(cls):
+        """
+        新一轮更新开始前调用，用于清理平台在每轮内共享的缓存
+        """
+        pass
+
+    def warm_up(self):
+        """
+        预热：提前发现Zone ID、记录ID等元数据，在后台线程中执行。
+        构造函数不应发起网络请求，需要的发现工作放在这里；未预热的实例在首次读取时再按需发现
+        Returns:
+            bool: 元数据是否已就绪
+        """
+        return True
 
     @abstractmethod
     def get_current_records(self):
@@ -37,54 +74,46 @@ class BaseDNS(ABC):
         """
         pass
 
-    def update_records(self, ipv4, ipv6):
+    def read(self):
+        """
+        读取当前记录类型的记录值
+        Returns:
+            str: 记录值，记录不存在或读取失败返回None
+        """
+        ipv4, ipv6 = self.get_current_records()
+        return ipv4 if self.record_type == 'A' else ipv6
+
+    def write(self, value):
         """
-        更新DNS记录
+        写入记录值，由调和引擎在记录值与期望值不一致时调用
         Args:
-            ipv4: IPv4地址
-            ipv6: IPv6地址
+            value: 新的记录值
         Returns:
-            bool: 如果记录已是最新返回 True，如果更新成功也返回 True，更新失败返回 False
-        """
-        try:
-            # 先获取当前记录
-            current_ipv4, current_ipv6 = self.get_current_records()
-
-            # 构建完整域名
-            full_domain = f"{self.hostname}.{self.domain}" if self.hostname != '@' else self.domain
-
-            # 根据记录类型检查是否需要更新
-            if self.record_type == 'A':
-                if not ipv4:
-                    self.logger.warning(f"[{self.__class__.__name__}][{full_domain}] - 未提供IPv4地址")
-                    return False
-                if current_ipv4 == ipv4:
-                    self.logger.info(f"[{self.__class__.__name__}][{full_domain}] - 记录已是最新")
-                    return True  # 记录已是最新，直接返回True，不显示更新成功
-                # 只在需要更新时调用_update_record
-                success = self._update_record(ipv4)
-                if success:
-                    self.logger.info(f"[{self.__class__.__name__}][{full_domain}] - 记录更新成功")
-                return success
-
-            elif self.record_type == 'AAAA':
-                if not ipv6:
-                    self.logger.warning(f"[{self.__class__.__name__}][{full_domain}] - 未提供IPv6地址")
-                    return False
-                if current_ipv6 == ipv6:
-                    self.logger.info(f"[{self.__class__.__name__}][{full_domain}] - 记录已是最新")
-                    return True  # 记录已是最新，直接返回True，不显示更新成功
-                # 只在需要更新时调用_update_record
-                success = self._update_record(ipv6)
-                if success:
-                    self.logger.info(f"[{self.__class__.__name__}][{full_domain}] - 记录更新成功")
-                return success
-
-            return False
-
-        except Exception as e:
-            self.logger.error(f"更新记录失败: {str(e)}")
-            return False
+            bool: 是否成功
+        """
+        return self._update_record(value)
+
+    @abstractmethod
+    def _update_record(self, value):
+        """
+        写入记录值，只使用 get_current_records 已获取的信息，不再重复读取
+        Args:
+            value: 新的记录值
+        Returns:
+            bool: 是否成功
+        """
+        pass
+
+    @classmethod
+    def write_batch(cls, changes):
+        """
+        批量写入同一平台、同一区域的多条记录，默认逐条调用 write
+        Args:
+            changes: [(平台实例, 新的记录值)]
+        Returns:
+            dict: 平台实例 -> 是否成功
+        """
+        return {platform: platform.write(value) for platform, value in changes}
 
     @abstractmethod
     def get_domains(self):
@@ -95,6 +124,38 @@ class BaseDNS(ABC):
         """
         pass
 
+    @staticmethod
+    def credential_fingerprint(config):
+        """
+        计算凭据指纹，用作缓存键，避免在缓存中保存密钥明文
+        Args:
+            config: 记录配置
+        Returns:
+            str: 16位十六进制指纹
+        """
+        items = sorted((k, str(v)) for k, v in config.items() if k not in RECORD_FIELDS and k not in SCHEDULE_FIELDS)
+        return hashlib.sha256(json.dumps(items).encode('utf-8')).hexdigest()[:16]
+
+    def get_credential_fingerprint(self):
+        """获取当前记录所用凭据的指纹"""
+        return self.credential_fingerprint(self.config)
+
+    @classmethod
+    def record_key(cls, config):
+        """
+        计算记录的标识键，配置未变化的记录在重新加载时可复用已有实例
+        Args:
+            config: 记录配置
+        Returns:
+            tuple: (平台标识, 主机名, 域名, 记录类型, 凭据指纹)
+        """
+        return (cls.platform_id(), config.get('hostname', '@'), config.get('domain'),
+                config.get('record_type', 'A'), cls.credential_fingerprint(config))
+
+    def get_record_key(self):
+        """获取当前记录的标识键"""
+        return self.record_key(self.config)
+
     def get_platform_key(self):
         """
         获取平台标识
@@ -6,9 +6,9 @@
 @Date    ：2023/12/02
 """
 
-import requests
 from PySide6.QtCore import Signal
 
+from utils import http_client
 from utils.threads import BaseThread
 from .base import BaseDNS
 
@@ -17,6 +17,7 @@ class CloudflareDNS(BaseDNS):
     """Cloudflare DNS平台实现"""
 
     API_BASE = "https://api.cloudflare.com/client/v4"
+    ZONE_PAGE_SIZE = 50  # 域名列表分页大小（接口上限50）
 
     CONFIG_FIELDS = {
         'hostname': {
@@ -47,9 +48,26 @@ class CloudflareDNS(BaseDNS):
         }
         self._zone_id = None
         self._record_ids = {}
+        self._last_status = None  # 最近一次请求的HTTP状态码
 
-        if self.domain:
-            self._zone_id = self._fetch_zone_id()
+    def _zone_cache_key(self):
+        """Zone ID 的持久化缓存键"""
+        return f"{self.get_credential_fingerprint()}:{self.domain}"
+
+    def _record_cache_key(self, record_type):
+        """记录ID的持久化缓存键"""
+        return f"{self._zone_id}:{self._full_domain()}:{record_type}"
+
+    def _load_zone_id(self):
+        """优先从持久化缓存获取zone_id，未命中时再请求API"""
+        zone_id = self.metadata_cache.get('cloudflare.zone', self._zone_cache_key())
+        if zone_id:
+            return zone_id
+
+        zone_id = self._fetch_zone_id()
+        if zone_id:
+            self.metadata_cache.set('cloudflare.zone', self._zone_cache_key(), zone_id)
+        return zone_id
 
     def _fetch_zone_id(self):
         """
@@ -59,7 +77,8 @@ class CloudflareDNS(BaseDNS):
         """
         try:
             self.logger.debug(f"正在获取域名 {self.domain} 的Zone ID...")
-            response = requests.get(
+            response = http_client.request(
+                'GET',
                 f"{self.API_BASE}/zones",
                 headers=self.headers,
                 params={'name': self.domain}
@@ -78,48 +97,45 @@ class CloudflareDNS(BaseDNS):
             self.logger.error(f"获取Zone ID失败: {str(e)}")
             return None
 
+    def warm_up(self):
+        """预热：提前获取zone_id"""
+        if not self._zone_id and self.domain:
+            self._zone_id = self._load_zone_id()
+        return bool(self._zone_id)
+
     def get_zone_id(self):
         """获取缓存的zone_id"""
         return self._zone_id
 
-    def get_record_id(self, zone_id, record_type):
-        """获取DNS记录ID（使用缓存）"""
-        if record_type in self._record_ids:
-            return self._record_ids[record_type]
+    def _invalidate_zone(self):
+        """Zone不存在时丢弃内存和磁盘中的zone_id及记录ID"""
+        self.metadata_cache.invalidate('cloudflare.zone', self._zone_cache_key())
+        for record_type in list(self._record_ids):
+            self._invalidate_record(record_type)
+        self._zone_id = None
 
-        try:
-            params = {
-                'type': record_type,
-                'name': f"{self.hostname}.{self.domain}" if self.hostname != '@' else self.domain
-            }
+    def _invalidate_record(self, record_type):
+        """记录不存在时丢弃内存和磁盘中的记录ID"""
+        self.metadata_cache.invalidate('cloudflare.record', self._record_cache_key(record_type))
+        self._record_ids.pop(record_type, None)
 
-            response = requests.get(
-                f"{self.API_BASE}/zones/{zone_id}/dns_records",
-                headers=self.headers,
-                params=params
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            if data['success'] and data['result']:
-                record_id = data['result'][0]['id']
-                self._record_ids[record_type] = record_id
-                return record_id
-            return None
-        except Exception as e:
-            self.logger.error(f"获取Cloudflare记录ID失败: {str(e)}")
-            return None
+    def _cache_record_id(self, record_type, record_id):
+        """缓存记录ID"""
+        self._record_ids[record_type] = record_id
+        self.metadata_cache.set('cloudflare.record', self._record_cache_key(record_type), record_id)
 
     def _make_request(self, method, endpoint, **kwargs):
         """通用的API请求处理方法"""
+        self._last_status = None
         try:
             url = f"{self.API_BASE}/{endpoint}"
-            response = requests.request(
+            response = http_client.request(
                 method,
                 url,
                 headers=self.headers,
                 **kwargs
             )
+            self._last_status = response.status_code
             response.raise_for_status()
             data = response.json()
 
@@ -132,116 +148,114 @@ class CloudflareDNS(BaseDNS):
             self.logger.error(f"API请求出错: {str(e)}")
             return None
 
+    def _full_domain(self):
+        """获取完整域名"""
+        return f"{self.hostname}.{self.domain}" if self.hostname != '@' else self.domain
+
     def get_current_records(self):
-        """获取当前DNS记录"""
-        zone_id = self.get_zone_id()
+        """获取当前DNS记录，每次只发起一次查询，并缓存记录ID供写入使用"""
+        zone_id = self.get_zone_id() or (self.domain and self._load_zone_id())
+        self._zone_id = zone_id
         if not zone_id:
             self.logger.error(f"获取Zone ID失败，请检查域名 {self.domain} 是否正确配置")
             return None, None
 
-        ipv4_id = self.get_record_id(zone_id, 'A')
-        ipv6_id = self.get_record_id(zone_id, 'AAAA')
-
-        ipv4 = None
-        ipv6 = None
-
-        if ipv4_id:
-            result = self._make_request('GET', f"zones/{zone_id}/dns_records/{ipv4_id}")
-            if result:
-                ipv4 = result['content']
+        record = None
+        record_id = (self._record_ids.get(self.record_type) or
+                     self.metadata_cache.get('cloudflare.record', self._record_cache_key(self.record_type)))
 
-        if ipv6_id:
-            result = self._make_request('GET', f"zones/{zone_id}/dns_records/{ipv6_id}")
-            if result:
-                ipv6 = result['content']
-
-        return ipv4, ipv6
+        if record_id:
+            # 已知记录ID时直接读取该记录
+            record = self._make_request('GET', f"zones/{zone_id}/dns_records/{record_id}")
+            if record is None and self._last_status == 404:
+                self._invalidate_record(self.record_type)
+                record_id = None
+            elif record is not None:
+                self._record_ids[self.record_type] = record_id
+
+        if not record_id:
+            result = self._make_request(
+                'GET',
+                f"zones/{zone_id}/dns_records",
+                params={'type': self.record_type, 'name': self._full_domain()}
+            )
+            if result is None and self._last_status == 404:
+                self._invalidate_zone()
+            elif result:
+                record = result[0]
+                self._cache_record_id(self.record_type, record['id'])
+            elif result is not None:
+                # 查询成功但记录不存在，写入时需要创建；查询失败时保留已缓存的ID
+                self._record_ids.pop(self.record_type, None)
+
+        content = record['content'] if record else None
+        if self.record_type == 'A':
+            return content, None
+        return None, content
 
     def update_record(self, zone_id, record_id, record_type, ip):
         """更新DNS记录"""
         data = {
             'type': record_type,
-            'name': f"{self.hostname}.{self.domain}" if self.hostname != '@' else self.domain,
+            'name': self._full_domain(),
             'content': ip,
             'proxied': False
         }
 
+        result = None
         if record_id:
             # 更新现有记录
             result = self._make_request('PUT', f"zones/{zone_id}/dns_records/{record_id}", json=data)
-        else:
+            if result is None and self._last_status == 404:
+                # 缓存的记录已被删除，改为创建
+                self._invalidate_record(record_type)
+                record_id = None
+
+        if not record_id:
             # 创建新记录
             result = self._make_request('POST', f"zones/{zone_id}/dns_records", json=data)
 
+        if result is not None:
+            self._cache_record_id(record_type, result['id'])
         return result is not None
 
-    def update_records(self, ipv4, ipv6):
-        """更新所有DNS记录"""
-        zone_id = self.get_zone_id()
-        if not zone_id:
-            self.logger.error("获取Zone ID失败")
-            return False
-
-        current_ipv4, current_ipv6 = self.get_current_records()
-        full_domain = f"{self.hostname}.{self.domain}" if self.hostname != '@' else self.domain
-
-        if ipv4 and ipv4 != current_ipv4:
-            ipv4_id = self.get_record_id(zone_id, 'A')
-            self.logger.info(f"[CLOUDFLARE][{full_domain}] DNS记录需要更新: IPv4: {current_ipv4 or '无'} -> {ipv4}")
-            if not self.update_record(zone_id, ipv4_id, 'A', ipv4):
-                return False
-
-        if ipv6 and ipv6 != current_ipv6:
-            ipv6_id = self.get_record_id(zone_id, 'AAAA')
-            self.logger.info(f"[CLOUDFLARE][{full_domain}] DNS记录需要更新: IPv6: {current_ipv6 or '无'} -> {ipv6}")
-            if not self.update_record(zone_id, ipv6_id, 'AAAA', ipv6):
-                return False
-
-        return True
-
     def get_domains(self):
-        """获取可用域名列表"""
+        """获取可用域名列表（分页拉取全部域名）"""
         try:
-            result = self._make_request('GET', 'zones')
-            if result:
-                return [zone['name'] for zone in result]
-            return []
+            domains = []
+            page = 1
+            while True:
+                result = self._make_request('GET', 'zones', params={'page': page, 'per_page': self.ZONE_PAGE_SIZE})
+                if result is None:
+                    return []  # 请求失败时不返回不完整的列表
+                domains.extend(zone['name'] for zone in result)
+                if len(result) < self.ZONE_PAGE_SIZE:
+                    break
+                page += 1
+            return domains
         except Exception as e:
             self.logger.error(f"获取域名列表失败: {str(e)}")
             return []
 
     def clear_cache(self):
-        """清除所有缓存"""
+        """清除所有缓存，包括持久化的元数据"""
+        if self._zone_id:
+            self._invalidate_zone()
         self._zone_id = None
         self._record_ids.clear()
 
     def _update_record(self, value):
-        """更新记录"""
-        try:
-            # 获取记录ID
-            record_id = self._get_record_id()
-            if not record_id:
-                # 如果记录不存在，创建新记录
-                return self._create_record(value)
-
-            # 更新现有记录
-            url = f"{self.api_base}/zones/{self.zone_id}/dns_records/{record_id}"
-            data = {
-                'type': self.record_type,
-                'name': f"{self.hostname}.{self.domain}" if self.hostname != '@' else self.domain,
-                'content': value,
-                'proxied': False
-            }
-
-            response = self._make_request('PUT', url, json=data)
-            if response and response.get('success'):
-                self.logger.info(f"[CLOUDFLARE][{self.domain}] - 记录更新成功")
-                return True
+        """更新记录，使用读取时缓存的记录ID，记录不存在时创建"""
+        zone_id = self.get_zone_id()
+        if not zone_id:
+            self.logger.error("获取Zone ID失败")
             return False
 
-        except Exception as e:
-            self.logger.error(f"更新记录失败: {str(e)}")
-            return False
+        record_id = (self._record_ids.get(self.record_type) or
+                     self.metadata_cache.get('cloudflare.record', self._record_cache_key(self.record_type)))
+        if record_id:
+            self.logger.debug(f"[CLOUDFLARE][{self._full_domain()}] - 更新已有记录 {record_id}")
+        return self.update_record(zone_id, record_id, self.record_type, value)
 
 
 class CloudflareRequestThread(BaseThread):
@@ -256,7 +270,7 @@ class CloudflareRequestThread(BaseThread):
 
     def run(self):
         try:
-            response = requests.request(self.method, f"{CloudflareDNS.API_BASE}/{self.endpoint}", **self.kwargs)
+            response = http_client.request(self.method, f"{CloudflareDNS.API_BASE}/{self.endpoint}", **self.kwargs)
             if response.ok:
                 data = response.json()
                 if data.get('success'):
@@ -0,0 +1,292 @@
+"""
+@Project ：DDNS
+@File    ：dnspod.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+"""
+
+import threading
+import time
+
+from .api_clients import ApiError, TencentCloudClient
+from utils import deadline
+from .base import BaseDNS
+
+
+class DnspodDNS(BaseDNS):
+    """DNSPod 平台实现，支持同一域名下的记录批量修改"""
+
+    CONFIG_FIELDS = {
+        'hostname': {
+            'label': '主机名',
+            'placeholder': '@ 表示根域名，或输入子域名如 www'
+        },
+        'domain': {
+            'label': '域名',
+            'placeholder': '例如：example.com'
+        },
+        'secret_id': {
+            'label': 'SecretId',
+            'placeholder': '腾讯云SecretId'
+        },
+        'secret_key': {
+            'label': 'SecretKey',
+            'placeholder': '腾讯云SecretKey'
+        }
+    }
+
+    # 按凭据指纹共享的客户端和每轮的记录索引；指纹包含 SecretKey，修改密钥后会创建新的客户端
+    _clients = {}  # 凭据指纹 -> TencentCloudClient
+    _record_index = {}  # (凭据指纹, domain) -> {(子域名, 记录类型): 记录详情}
+    _cache_lock = threading.Lock()
+    _key_locks = {}  # 缓存键 -> 构建该缓存时持有的锁
+
+    RECORD_PAGE_SIZE = 3000
+    DOMAIN_PAGE_SIZE = 3000
+    BATCH_POLL_INTERVAL = 0.5  # 查询批量任务状态的间隔（秒）
+    BATCH_WAIT = 10  # 等待批量任务完成的最长时间（秒）
+    DEFAULT_LINE = "默认"
+
+    def __init__(self, config):
+        """
+        初始化DNSPod客户端
+        Args:
+            config: 包含认证信息的配置字典
+        """
+        super().__init__(config)
+        self.secret_id = self.config.get('secret_id')
+        self.credential = self.get_credential_fingerprint()
+        self.client = self._init_client()
+        self._observed = False  # 是否已成功读取过记录，写入只使用读取到的记录详情
+        self._record = None  # 最近一次读取到（或创建）的当前类型记录详情，不存在为None
+
+    def _init_client(self):
+        """
+        获取API客户端，同一凭据只创建一次
+        Returns:
+            TencentCloudClient: 客户端实例，未配置凭据返回None
+        """
+        with self._cache_lock:
+            client = self._clients.get(self.credential)
+            if client:
+                return client
+
+            if not self.secret_id or not self.config.get('secret_key'):
+                self.logger.error("DNSPod客户端初始化失败: 缺少SecretId或SecretKey")
+                return None
+
+            client = TencentCloudClient(self.secret_id, self.config.get('secret_key'), 'dnspod', '2021-03-23')
+            self._clients[self.credential] = client
+            return client
+
+    @classmethod
+    def new_cycle(cls):
+        """新一轮更新开始时丢弃上一轮的记录索引"""
+        with cls._cache_lock:
+            cls._record_index.clear()
+
+    @classmethod
+    def _lock_for(cls, key):
+        """获取指定缓存键的构建锁"""
+        with cls._cache_lock:
+            return cls._key_locks.setdefault(key, threading.Lock())
+
+    def get_domains(self):
+        """获取域名列表（分页拉取全部域名）"""
+        if not self.client:
+            return []
+
+        try:
+            domains = []
+            offset = 0
+            while True:
+                params = {"Offset": offset, "Limit": self.DOMAIN_PAGE_SIZE}
+                result = self.client.call('DescribeDomainList', params)
+
+                page = result.get('DomainList') or []
+                domains.extend(domain['Name'] for domain in page if domain.get('Status') == 'ENABLE')
+
+                offset += len(page)
+                total = (result.get('DomainCountInfo') or {}).get('AllTotal', 0)
+                if not page or offset >= total:
+                    break
+
+            return domains
+
+        except Exception as e:
+            self.logger.error(f"获取域名列表失败: {str(e)}")
+            return []
+
+    def _get_record_index(self):
+        """
+        获取当前域名的记录索引，每轮更新每个域名只调用一次 DescribeRecordList
+        Returns:
+            dict: (子域名, 记录类型) -> 记录详情
+        """
+        key = (self.credential, self.domain)
+        index = self._record_index.get(key)
+        if index is not None:
+            return index
+
+        with self._lock_for(key):
+            # 等锁期间可能已由其他线程构建完成
+            index = self._record_index.get(key)
+            if index is not None:
+                return index
+
+            index = {}
+            offset = 0
+            while True:
+                params = {
+                    "Domain": self.domain,
+                    "Offset": offset,
+                    "Limit": self.RECORD_PAGE_SIZE
+                }
+
+                try:
+                    result = self.client.call('DescribeRecordList', params)
+                except ApiError as e:
+                    # 域名下没有任何记录时接口以错误码返回
+                    if e.code == 'ResourceNotFound.NoDataOfRecord':
+                        break
+                    raise
+
+                page = result.get('RecordList') or []
+                for record in page:
+                    if record.get('Type') in ('A', 'AAAA'):
+                        index.setdefault((record.get('Name'), record['Type']), record)
+
+                offset += len(page)
+                total = (result.get('RecordCountInfo') or {}).get('TotalCount', 0)
+                if not page or offset >= total:
+                    break
+
+            self._record_index[key] = index
+            return index
+
+    def _get_record(self, record_type):
+        """获取当前主机名指定类型的记录详情"""
+        return self._get_record_index().get((self.hostname, record_type))
+
+    def get_current_records(self):
+        """获取当前DNS记录"""
+        try:
+            if not self.client:
+                self.logger.error("DNSPod客户端未初始化")
+                return None, None
+
+            ipv4_record = self._get_record('A')
+            ipv6_record = self._get_record('AAAA')
+            self._record = ipv4_record if self.record_type == 'A' else ipv6_record
+            self._observed = True
+
+            return (ipv4_record or {}).get('Value'), (ipv6_record or {}).get('Value')
+
+        except Exception as e:
+            self.logger.error(f"获取记录失败: {str(e)}")
+            return None, None
+
+    def _update_record(self, value):
+        """更新单条记录，记录不存在时创建，使用读取时得到的记录详情"""
+        if not self._observed:
+            self.logger.error(f"{self.get_platform_key()} - 尚未读取到记录，跳过写入")
+            return False
+
+        try:
+            record = self._record
+            params = {
+                "Domain": self.domain,
+                "SubDomain": self.hostname,
+                "RecordType": self.record_type,
+                "RecordLine": self.DEFAULT_LINE,
+                "Value": value
+            }
+
+            if record:
+                params["RecordId"] = record['RecordId']
+                self.client.call('ModifyRecord', params)
+            else:
+                result = self.client.call('CreateRecord', params)
+                self._record = {'RecordId': result.get('RecordId'), 'Name': self.hostname,
+                                'Type': self.record_type, 'Value': value}
+
+            self.logger.info(f"[DNSPOD][{self.domain}] - 记录更新成功")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"更新记录失败: {str(e)}")
+            return False
+
+    @classmethod
+    def write_batch(cls, changes):
+        """
+        批量写入记录：同一账号、同一域名、同一目标值的记录合并为一次 ModifyRecordBatch。
+        批量修改是异步任务，等待任务完成后按每条记录的执行结果返回，未确认的记录视为失败
+        Args:
+            changes: [(DnspodDNS 实例, 新的记录值)]
+        Returns:
+            dict: 平台实例 -> 是否成功
+        """
+        results = {}
+        batches = {}  # (凭据指纹, domain, 目标值) -> [(平台实例, 记录ID)]
+
+        for platform, new_ip in changes:
+            # 只使用本轮（或上一次）读取到的记录详情，读取失败时不再重新读取
+            record = platform._record
+            if not platform._observed or not record:
+                # 未读取到的记录由 _update_record 放弃写入，不存在的记录只能逐条创建
+                results[platform] = platform._update_record(new_ip)
+            else:
+                key = (platform.credential, platform.domain, new_ip)
+                batches.setdefault(key, []).append((platform, record['RecordId']))
+
+        for (_, domain, new_ip), items in batches.items():
+            client = items[0][0].client
+            logger = items[0][0].logger
+            try:
+                params = {
+                    "RecordIdList": [record_id for _, record_id in items],
+                    "Change": "value",
+                    "ChangeTo": new_ip
+                }
+                result = client.call('ModifyRecordBatch', params)
+                succeeded = cls._wait_batch_job(client, result.get('JobId'))
+
+                for platform, record_id in items:
+                    results[platform] = record_id in succeeded
+                failed = len(items) - sum(1 for _, record_id in items if record_id in succeeded)
+                if failed:
+                    logger.error(f"[DNSPOD][{domain}] - 批量更新 {len(items)} 条记录，{failed} 条未确认成功")
+                else:
+                    logger.info(f"[DNSPOD][{domain}] - 批量更新 {len(items)} 条记录成功")
+            except Exception as e:
+                logger.error(f"[DNSPOD][{domain}] - 批量更新记录失败: {str(e)}")
+                for platform, _ in items:
+                    results[platform] = False
+
+        return results
+
+    @classmethod
+    def _wait_batch_job(cls, client, job_id):
+        """
+        等待批量任务完成，最多等待 BATCH_WAIT 秒且不超过本轮的截止时间
+        Args:
+            client: API客户端
+            job_id: ModifyRecordBatch 返回的任务ID
+        Returns:
+            set: 执行成功的记录ID，任务未在等待时间内完成时为空
+        """
+        if job_id is None:
+            return set()
+
+        wait_until = time.monotonic() + cls.BATCH_WAIT
+        while True:
+            result = client.call('DescribeBatchTask', {"JobId": job_id})
+            if result.get('Status') != 'running':
+                return {record.get('RecordId') for detail in result.get('DetailList') or []
+                        for record in detail.get('RecordList') or [] if record.get('Status') == 'success'}
+
+            if time.monotonic() >= wait_until or deadline.expired():
+                return set()
+            time.sleep(cls.BATCH_POLL_INTERVAL)
@@ -0,0 +1,101 @@
+"""
+@Project ：DDNS
+@File    ：registry.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+DNS平台注册表：平台标识到平台类的延迟加载映射，并声明各平台支持的能力
+"""
+
+import importlib
+import threading
+import time
+
+from utils.logger import Logger
+
+# 平台能力
+CAP_BATCH_WRITE = 'batch_write'  # 支持由 write_batch 合并提交多条记录
+CAP_ZONE_LISTING = 'zone_listing'  # 支持获取账号下的域名列表
+
+
+class ProviderSpec:
+    """平台声明，不导入平台模块即可获取名称和能力"""
+
+    def __init__(self, platform_id, label, class_name, capabilities=()):
+        """
+        Args:
+            platform_id: 平台标识，同时是 dns_platforms 下的模块名和配置中的键
+            label: 界面显示名称
+            class_name: 平台类名
+            capabilities: 支持的能力集合
+        """
+        self.platform_id = platform_id
+        self.label = label
+        self.module = f"dns_platforms.{platform_id}"
+        self.class_name = class_name
+        self.capabilities = frozenset(capabilities)
+
+    def supports(self, capability):
+        """是否支持指定能力"""
+        return capability in self.capabilities
+
+
+# 所有可用平台，按界面显示顺序排列
+PROVIDERS = {
+    spec.platform_id: spec for spec in [
+        ProviderSpec('cloudflare', 'Cloudflare', 'CloudflareDNS', {CAP_ZONE_LISTING}),
+        ProviderSpec('tencent', '腾讯云', 'TencentDNS', {CAP_ZONE_LISTING}),
+        ProviderSpec('aliyun', '阿里云', 'AliyunDNS', {CAP_ZONE_LISTING}),
+        ProviderSpec('dnspod', 'DNSPod', 'DnspodDNS', {CAP_ZONE_LISTING, CAP_BATCH_WRITE}),
+        ProviderSpec('rfc2136', 'RFC 2136', 'Rfc2136DNS', {CAP_BATCH_WRITE}),
+    ]
+}
+
+_classes = {}  # 平台标识 -> 已加载的平台类
+_lock = threading.Lock()
+
+
+def get_spec(platform_id):
+    """获取平台声明，未知平台返回None"""
+    return PROVIDERS.get(platform_id)
+
+
+def has_capability(platform_id, capability):
+    """平台是否支持指定能力，无需导入平台模块"""
+    spec = PROVIDERS.get(platform_id)
+    return bool(spec and spec.supports(capability))
+
+
+def get_platform_class(platform_id):
+    """
+    获取平台类，首次使用时才导入对应模块及其SDK
+    Args:
+        platform_id: 平台标识
+    Returns:
+        type: 平台类，未知平台或导入失败返回None
+    """
+    platform_class = _classes.get(platform_id)
+    if platform_class:
+        return platform_class
+
+    spec = PROVIDERS.get(platform_id)
+    if not spec:
+        Logger().error(f"未知的DNS平台: {platform_id}")
+        return None
+
+    with _lock:
+        if platform_id in _classes:
+            return _classes[platform_id]
+
+        try:
+            start = time.perf_counter()
+            module = importlib.import_module(spec.module)
+            platform_class = getattr(module, spec.class_name)
+            elapsed = time.perf_counter() - start
+            _classes[platform_id] = platform_class
+            Logger().debug(f"加载DNS平台模块: {platform_id}，耗时 {elapsed * 1000:.1f} ms")
+            return platform_class
+        except Exception as e:
+            Logger().error(f"加载DNS平台模块失败: {platform_id} - {str(e)}")
+            return None
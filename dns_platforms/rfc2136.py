@@ -0,0 +1,274 @@
+"""
+@Project ：DDNS
+@File    ：rfc2136.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+RFC 2136 动态更新，适用于 BIND、Knot、PowerDNS 等自建权威服务器
+"""
+
+import socket
+import threading
+
+import dns.flags
+import dns.inet
+import dns.message
+import dns.name
+import dns.query
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+import dns.tsigkeyring
+import dns.update
+
+from utils import deadline
+from .base import BaseDNS
+
+
+class Rfc2136DNS(BaseDNS):
+    """RFC 2136 动态更新平台实现，同一区域的变更合并为一条 UPDATE 消息"""
+
+    CONFIG_FIELDS = {
+        'hostname': {
+            'label': '主机名',
+            'placeholder': '@ 表示根域名，或输入子域名如 www'
+        },
+        'domain': {
+            'label': '区域',
+            'placeholder': '例如: example.com'
+        },
+        'server': {
+            'label': '主服务器',
+            'placeholder': '主服务器IP或主机名，可带端口，例如: 192.0.2.1:53'
+        },
+        'key_name': {
+            'label': 'TSIG 密钥名',
+            'placeholder': '例如: ddns-key',
+            'optional': True
+        },
+        'key_secret': {
+            'label': 'TSIG 密钥',
+            'placeholder': 'Base64 编码的 TSIG 密钥',
+            'optional': True
+        },
+        'key_algorithm': {
+            'label': 'TSIG 算法',
+            'placeholder': '例如: hmac-sha256',
+            'optional': True
+        },
+        'ttl': {
+            'label': 'TTL',
+            'placeholder': '默认 300 秒',
+            'optional': True
+        }
+    }
+
+    DEFAULT_PORT = 53
+    DEFAULT_TTL = 300
+    TIMEOUT = 10
+
+    # 主服务器主机名解析结果，同一主机名只解析一次
+    _addresses = {}  # 主机名 -> IP地址
+    _address_lock = threading.Lock()
+
+    def __init__(self, config):
+        """
+        初始化RFC 2136客户端
+        Args:
+            config: 包含主服务器和TSIG密钥的配置字典
+        """
+        super().__init__(config)
+        self.server, self.port = self._parse_server(config.get('server', ''))
+        self.ttl = self._parse_ttl(config.get('ttl'))
+        self.zone = dns.name.from_text(self.domain) if self.domain else None
+        self.keyring = None
+        self.key_algorithm = None
+        self._current_value = None  # 最近一次读取到的记录值
+        self._current_rdataset = None  # 最近一次读取到的完整记录集，用作写入时的先决条件
+
+        if config.get('key_name') and config.get('key_secret'):
+            self.keyring = dns.tsigkeyring.from_text({config['key_name']: config['key_secret']})
+            self.key_algorithm = dns.name.from_text(config.get('key_algorithm') or 'hmac-sha256')
+
+    def _parse_server(self, server):
+        """
+        解析主服务器地址
+        Args:
+            server: 形如 host、host:port 或 [ipv6]:port 的地址
+        Returns:
+            tuple: (主机, 端口)
+        """
+        server = server.strip()
+        if server.startswith('['):
+            host, _, port = server[1:].partition(']')
+            port = port.lstrip(':')
+        elif server.count(':') == 1:
+            host, _, port = server.partition(':')
+        else:
+            host, port = server, ''
+        return host, int(port) if port else self.DEFAULT_PORT
+
+    def _parse_ttl(self, value):
+        """解析TTL，未填写或无效时使用 DEFAULT_TTL"""
+        if value in (None, ''):
+            return self.DEFAULT_TTL
+        try:
+            ttl = int(value)
+            if not 0 <= ttl <= 2147483647:
+                raise ValueError(value)
+            return ttl
+        except (TypeError, ValueError):
+            self.logger.warning(f"TTL无效，使用默认值 {self.DEFAULT_TTL}: {value}")
+            return self.DEFAULT_TTL
+
+    def _address(self):
+        """
+        获取主服务器的IP地址，dns.query 只接受IP地址，配置为主机名时解析一次并缓存
+        Returns:
+            str: IP地址
+        Raises:
+            OSError: 主机名无法解析
+        """
+        if dns.inet.is_address(self.server):
+            return self.server
+
+        with self._address_lock:
+            address = self._addresses.get(self.server)
+            if address is None:
+                infos = socket.getaddrinfo(self.server, self.port, proto=socket.IPPROTO_UDP)
+                address = infos[0][4][0]
+                self._addresses[self.server] = address
+            return address
+
+    def warm_up(self):
+        """预热：解析主服务器地址"""
+        try:
+            return bool(self.server and self._address())
+        except Exception as e:
+            self.logger.error(f"解析主服务器地址失败: {str(e)}")
+            return False
+
+    def _fqdn(self):
+        """获取记录的完整名称"""
+        if self.hostname == '@':
+            return self.zone
+        return dns.name.from_text(self.hostname, origin=self.zone)
+
+    def _query(self, record_type):
+        """
+        直接向主服务器查询记录
+        Args:
+            record_type: 记录类型
+        Returns:
+            dns.rrset.RRset: 记录集，不存在返回None
+        """
+        query = dns.message.make_query(self._fqdn(), record_type)
+        if self.keyring:
+            query.use_tsig(self.keyring, algorithm=self.key_algorithm)
+
+        address = self._address()
+        response = dns.query.udp(query, address, port=self.port, timeout=deadline.get_timeout(self.TIMEOUT))
+        if response.flags & dns.flags.TC:
+            response = dns.query.tcp(query, address, port=self.port, timeout=deadline.get_timeout(self.TIMEOUT))
+
+        rdtype = dns.rdatatype.from_text(record_type)
+        for rrset in response.answer:
+            if rrset.rdtype == rdtype and rrset.name == self._fqdn():
+                return rrset
+        return None
+
+    def get_current_records(self):
+        """获取当前DNS记录，并记下读取到的值作为写入时的先决条件"""
+        try:
+            self._current_rdataset = self._query(self.record_type)
+            # 记录集有多条记录时任取一条作为当前值，写入时整个记录集会被替换为新值
+            self._current_value = next(iter(self._current_rdataset)).to_text() if self._current_rdataset else None
+            if self.record_type == 'A':
+                return self._current_value, None
+            return None, self._current_value
+        except Exception as e:
+            self.logger.error(f"查询记录失败: {str(e)}")
+            return None, None
+
+    def get_domains(self):
+        """动态更新协议不提供区域列表，返回已配置的区域"""
+        return [self.domain] if self.domain else []
+
+    def _send_update(self, changes):
+        """
+        发送一条包含多条记录变更的 UPDATE 消息
+        Args:
+            changes: [(平台实例, 读取到的记录集, 新值)]
+        Returns:
+            bool: 服务器返回 NOERROR 时为 True
+        """
+        update = dns.update.UpdateMessage(self.zone, keyring=self.keyring, keyalgorithm=self.key_algorithm)
+
+        for platform, current_rdataset, new_ip in changes:
+            name = platform._fqdn()
+            # 先决条件：记录集仍与读取时完全一致，避免覆盖他人的并发修改
+            if current_rdataset:
+                # 以零TTL列出记录集中的每条记录，要求服务器上的记录集与之完全相同
+                update.present(name, *current_rdataset)
+            else:
+                update.absent(name, platform.record_type)
+            update.replace(name, platform.ttl, platform.record_type, new_ip)
+
+        response = dns.query.tcp(update, self._address(), port=self.port, timeout=deadline.get_timeout(self.TIMEOUT))
+        rcode = response.rcode()
+        if rcode != dns.rcode.NOERROR:
+            self.logger.error(f"[RFC2136][{self.domain}] - 服务器拒绝更新: {dns.rcode.to_text(rcode)}")
+            return False
+        return True
+
+    def _set_written(self, value):
+        """写入成功后，把本地记下的记录集更新为写入的值"""
+        self._current_value = value
+        self._current_rdataset = dns.rrset.from_text(self._fqdn(), self.ttl, 'IN', self.record_type, value)
+
+    def _update_record(self, value):
+        """更新单条记录"""
+        try:
+            success = self._send_update([(self, self._current_rdataset, value)])
+            if success:
+                self._set_written(value)
+                self.logger.info(f"[RFC2136][{self.domain}] - 记录更新成功")
+            return success
+        except Exception as e:
+            self.logger.error(f"更新记录失败: {str(e)}")
+            return False
+
+    @classmethod
+    def write_batch(cls, changes):
+        """
+        批量写入记录：同一主服务器、同一区域的变更合并为一条 UPDATE 消息，
+        先决条件使用各记录最近一次读取到的值
+        Args:
+            changes: [(Rfc2136DNS 实例, 新的记录值)]
+        Returns:
+            dict: 平台实例 -> 是否成功
+        """
+        results = {}
+        zones = {}  # (服务器, 端口, 区域, 密钥名) -> [(平台实例, 读取到的记录集, 新值)]
+
+        for platform, new_ip in changes:
+            key = (platform.server, platform.port, platform.zone, platform.config.get('key_name'))
+            zones.setdefault(key, []).append((platform, platform._current_rdataset, new_ip))
+
+        for zone_changes in zones.values():
+            first = zone_changes[0][0]
+            try:
+                success = first._send_update(zone_changes)
+                if success:
+                    first.logger.info(f"[RFC2136][{first.domain}] - 批量更新 {len(zone_changes)} 条记录成功")
+            except Exception as e:
+                first.logger.error(f"[RFC2136][{first.domain}] - 批量更新记录失败: {str(e)}")
+                success = False
+
+            for platform, _, new_ip in zone_changes:
+                if success:
+                    platform._set_written(new_ip)
+                results[platform] = success
+
+        return results
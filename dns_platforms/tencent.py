@@ -6,14 +6,9 @@
 @Date    ：2023/12/02
 """
 
-import json
-
-from tencentcloud.common import credential
-from tencentcloud.common.exception.tencent_cloud_sdk_exception import TencentCloudSDKException
-from tencentcloud.common.profile.client_profile import ClientProfile
-from tencentcloud.common.profile.http_profile import HttpProfile
-from tencentcloud.teo.v20220901 import teo_client, models
+import threading
 
+from .api_clients import ApiError, TencentCloudClient
 from .base import BaseDNS
 
 
@@ -39,77 +34,176 @@ class TencentDNS(BaseDNS):
         }
     }
 
+    # 按凭据指纹共享的客户端、域名列表和加速域名索引，供所有实例复用；
+    # 指纹包含 SecretKey，修改密钥后会创建新的客户端
+    _clients = {}  # 凭据指纹 -> TencentCloudClient
+    _zone_cache = {}  # 凭据指纹 -> {域名: zone_id}
+    _domain_index = {}  # zone_id -> {DomainName: 加速域名详情}
+    _cache_lock = threading.Lock()
+    _key_locks = {}  # 缓存键 -> 构建该缓存时持有的锁，避免不同站点互相阻塞
+
+    # 分页大小（DescribeZones 最大100，DescribeAccelerationDomains 最大200）
+    ZONE_PAGE_SIZE = 100
+    DOMAIN_PAGE_SIZE = 200
+
     def __init__(self, config):
         """
-        初���化腾讯云DNS
+        初始化腾讯云DNS
         Args:
             config: 包含认证信息的配置字典
         """
         super().__init__(config)
-        self.client = None
-        self._zone_ids = {}  # 用于缓存域名和zone_id的映射
-        self._init_client()
-        # 初始化时获取一次域名列表
-        if self.client:
-            self.get_domains()
+        self.secret_id = self.config.get('secret_id')
+        self.credential = self.get_credential_fingerprint()
+        self.client = self._init_client()
 
     def _init_client(self):
-        """初始化API客户端"""
-        try:
-            # 实例化认证对象
-            cred = credential.Credential(
-                self.config.get('secret_id'),
-                self.config.get('secret_key')
-            )
-
-            # 实例化http选项
-            http_profile = HttpProfile()
-            http_profile.endpoint = "teo.tencentcloudapi.com"
-
-            # 实例化client选项
-            client_profile = ClientProfile()
-            client_profile.httpProfile = http_profile
-
-            # 实例化要请求产品的client对象
-            self.client = teo_client.TeoClient(cred, "", client_profile)
-
-        except TencentCloudSDKException as e:
-            self.logger.error(f"腾讯云DNS客户端初始化失败: {str(e)}")
-
-    def _cache_zone_id(self, zone_name, zone_id):
-        """缓存域名和zone_id的映射关系"""
-        self._zone_ids[zone_name] = zone_id
+        """
+        获取API客户端，同一凭据只创建一次
+        Returns:
+            TencentCloudClient: 客户端实例，未配置凭据返回None
+        """
+        with self._cache_lock:
+            client = self._clients.get(self.credential)
+            if client:
+                return client
+
+            if not self.secret_id or not self.config.get('secret_key'):
+                self.logger.error("腾讯云DNS客户端初始化失败: 缺少SecretId或SecretKey")
+                return None
+
+            client = TencentCloudClient(self.secret_id, self.config.get('secret_key'), 'teo', '2022-09-01')
+            self._clients[self.credential] = client
+            return client
+
+    @classmethod
+    def new_cycle(cls):
+        """新一轮更新开始时丢弃上一轮的域名列表和加速域名索引"""
+        with cls._cache_lock:
+            cls._zone_cache.clear()
+            cls._domain_index.clear()
+
+    @classmethod
+    def _lock_for(cls, key):
+        """获取指定缓存键的构建锁"""
+        with cls._cache_lock:
+            return cls._key_locks.setdefault(key, threading.Lock())
+
+    def _zone_cache_key(self, domain):
+        """ZoneId 的持久化缓存键"""
+        return f"{self.credential}:{domain}"
 
     def get_zone_id(self, domain):
-        """获取域名对应的zone_id"""
-        return self._zone_ids.get(domain)
-
-    def get_domains(self):
-        """获取域名列表"""
+        """获取域名对应的zone_id，优先使用持久化缓存，同一凭据的域名列表只拉取一次"""
+        zones = self._zone_cache.get(self.credential)
+        if zones is None:
+            zone_id = self.metadata_cache.get('tencent.zone', self._zone_cache_key(domain))
+            if zone_id:
+                return zone_id
+
+            with self._lock_for(('zones', self.credential)):
+                if self.credential not in self._zone_cache:
+                    self.get_domains()
+            zones = self._zone_cache.get(self.credential, {})
+
+        zone_id = zones.get(domain)
+        if zone_id:
+            self.metadata_cache.set('tencent.zone', self._zone_cache_key(domain), zone_id)
+        return zone_id
+
+    def warm_up(self):
+        """预热：提前获取zone_id，同一凭据的域名列表只拉取一次"""
         try:
-            req = models.DescribeZonesRequest()
-            params = {}
-            req.from_json_string(json.dumps(params))
+            return bool(self.domain and self.get_zone_id(self.domain))
+        except Exception as e:
+            self.logger.error(f"预热失败: {str(e)}")
+            return False
 
-            response = self.client.DescribeZones(req)
-            zones = json.loads(response.to_json_string())
+    def _invalidate_zone(self, domain):
+        """站点不存在时丢弃共享缓存和持久化缓存中的zone_id"""
+        self.metadata_cache.invalidate('tencent.zone', self._zone_cache_key(domain))
+        with self._cache_lock:
+            self._zone_cache.pop(self.credential, None)
+
+    def get_domains(self):
+        """获取域名列表（分页拉取并刷新共享缓存）"""
+        if not self.client:
+            return []
 
-            domains = []
-            if 'Zones' in zones:
-                for zone in zones['Zones']:
+        try:
+            zones = {}
+            offset = 0
+            while True:
+                params = {"Offset": offset, "Limit": self.ZONE_PAGE_SIZE}
+                result = self.client.call('DescribeZones', params)
+
+                page = result.get('Zones') or []
+                for zone in page:
                     # 只要ActiveStatus是active就认为域名可用
                     if zone.get('ActiveStatus') == 'active':
-                        domain = zone['ZoneName']
-                        zone_id = zone['ZoneId']
-                        domains.append(domain)
-                        self._cache_zone_id(domain, zone_id)
+                        zones[zone['ZoneName']] = zone['ZoneId']
 
-            return domains
+                offset += len(page)
+                if not page or offset >= result.get('TotalCount', 0):
+                    break
 
-        except TencentCloudSDKException as e:
+            with self._cache_lock:
+                self._zone_cache[self.credential] = zones
+            return list(zones.keys())
+
+        except Exception as e:
             self.logger.error(f"获取域名列表失败: {str(e)}")
             return []
 
+    def _get_domain_index(self, zone_id):
+        """
+        获取站点下加速域名的索引，每轮更新每个站点只构建一次
+        Args:
+            zone_id: 站点ID
+        Returns:
+            dict: DomainName -> 加速域名详情，失败返回None
+        """
+        index = self._domain_index.get(zone_id)
+        if index is not None:
+            return index
+
+        with self._lock_for(('domains', zone_id)):
+            # 等锁期间可能已由其他线程构建完成
+            index = self._domain_index.get(zone_id)
+            if index is not None:
+                return index
+
+            index = {}
+            offset = 0
+            while True:
+                params = {
+                    "ZoneId": zone_id,
+                    "Offset": offset,
+                    "Limit": self.DOMAIN_PAGE_SIZE,
+                    "Filters": [
+                        {
+                            "Name": "origin-type",
+                            "Values": ["IP_DOMAIN"],
+                            "Fuzzy": True
+                        }
+                    ],
+                    "Direction": "desc",
+                    "Order": "created_on",
+                    "Match": "all"
+                }
+                result = self.client.call('DescribeAccelerationDomains', params)
+
+                page = result.get('AccelerationDomains') or []
+                for domain in page:
+                    index[domain.get('DomainName', '')] = domain
+
+                offset += len(page)
+                if not page or offset >= result.get('TotalCount', 0):
+                    break
+
+            self._domain_index[zone_id] = index
+            return index
+
     def get_current_records(self):
         """获取当前DNS记录"""
         try:
@@ -118,47 +212,31 @@ class TencentDNS(BaseDNS):
                 self.logger.error(f"未找到域名 {self.domain} 的ZoneId")
                 return None, None
 
-            req = models.DescribeAccelerationDomainsRequest()
-            params = {
-                "ZoneId": zone_id,
-                "Filters": [
-                    {
-                        "Name": "origin-type",
-                        "Values": ["IP_DOMAIN"],
-                        "Fuzzy": True
-                    }
-                ],
-                "Direction": "desc",
-                "Order": "created_on",
-                "Match": "all"
-            }
-            req.from_json_string(json.dumps(params))
-
-            response = self.client.DescribeAccelerationDomains(req)
-            result = json.loads(response.to_json_string())
+            index = self._get_domain_index(zone_id)
+            target_domain = f"{self.hostname}.{self.domain}" if self.hostname != '@' else self.domain
 
             ipv4 = None
             ipv6 = None
 
-            if 'AccelerationDomains' in result:
-                for domain in result['AccelerationDomains']:
-                    domain_name = domain.get('DomainName', '')
-                    target_domain = f"{self.hostname}.{self.domain}" if self.hostname != '@' else self.domain
-
-                    if domain_name == target_domain:
-                        origin_detail = domain.get('OriginDetail', {})
-                        if origin_detail.get('OriginType') == 'IP_DOMAIN':
-                            origin = origin_detail.get('Origin')
-                            # 根据IP格式判断是IPv4还是IPv6
-                            if ':' in origin:  # IPv6包含冒号
-                                ipv6 = origin
-                            else:  # IPv4
-                                ipv4 = origin
-                        break
+            domain = index.get(target_domain)
+            if domain:
+                origin_detail = domain.get('OriginDetail', {})
+                if origin_detail.get('OriginType') == 'IP_DOMAIN':
+                    origin = origin_detail.get('Origin')
+                    # 根据IP格式判断是IPv4还是IPv6
+                    if ':' in origin:  # IPv6包含冒号
+                        ipv6 = origin
+                    else:  # IPv4
+                        ipv4 = origin
 
             return ipv4, ipv6
 
-        except TencentCloudSDKException as e:
+        except ApiError as e:
+            if 'NotFound' in e.code:
+                self._invalidate_zone(self.domain)
+            self.logger.error(f"获取记录失败: {str(e)}")
+            return None, None
+        except Exception as e:
             self.logger.error(f"获取记录失败: {str(e)}")
             return None, None
 
@@ -178,22 +256,23 @@ class TencentDNS(BaseDNS):
                 "Origin": value
             }
 
-            req = models.ModifyAccelerationDomainRequest()
             params = {
                 "ZoneId": zone_id,
                 "DomainName": full_domain,
                 "OriginInfo": origin_info
             }
-            req.from_json_string(json.dumps(params))
-
-            response = self.client.ModifyAccelerationDomain(req)
-            result = json.loads(response.to_json_string())
+            result = self.client.call('ModifyAccelerationDomain', params)
 
-            success = 'Response' in result and 'RequestId' in result['Response']
+            success = 'RequestId' in result
             if success:
                 self.logger.info(f"[TENCENT][{full_domain}] - 记录更新成功")
             return success
 
-        except TencentCloudSDKException as e:
+        except ApiError as e:
+            if 'NotFound' in e.code:
+                self._invalidate_zone(self.domain)
+            self.logger.error(f"更新记录失败: {str(e)}")
+            return False
+        except Exception as e:
             self.logger.error(f"更新记录失败: {str(e)}")
             return False
@@ -11,8 +11,9 @@ import sys
 from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication
 
-from config import Config
+from config import create_config
 from ui.main_window import MainWindow
+from utils.config_reloader import ConfigReloader
 from utils.dns_updater import DNSUpdater
 from utils.ip_checker import IPChecker
 from utils.logger import Logger
@@ -26,7 +27,7 @@ if __name__ == "__main__":
 
     try:
         logger = Logger()
-        config = Config()
+        config = create_config()  # 默认 config.json，可切换为SQLite存储
         ip_checker = IPChecker()
 
         # 创建主窗口并立即显示
@@ -35,6 +36,10 @@ if __name__ == "__main__":
         window.show()
         app.processEvents()
 
+        # 配置文件被外部修改后热加载
+        config_reloader = ConfigReloader(config)
+        config_reloader.config_changed.connect(window.on_config_changed)
+
 
         # 延迟初始化DNS更新器和其他功能
         def delayed_init():
@@ -44,6 +49,7 @@ if __name__ == "__main__":
                 dns_updater = DNSUpdater(config, window)
                 window.dns_updater = dns_updater
                 window.set_dns_updater(dns_updater)
+                config_reloader.config_changed.connect(dns_updater.apply_config_diff)
 
                 # 设置内存监控
                 memory_timer = QTimer()
@@ -73,6 +79,8 @@ if __name__ == "__main__":
                 window.close()
             if memory_timer:
                 memory_timer.stop()
+            if 'config' in locals():
+                config.flush()  # 写入尚未保存的配置修改
         except Exception as cleanup_error:
             logger.error(f"清理资源时发生错误: {str(cleanup_error)}")
 
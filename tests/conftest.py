@@ -0,0 +1,14 @@
+"""
+测试公共配置：把项目根目录加入导入路径，并在临时目录中运行，
+避免日志、元数据缓存等文件写入工作目录
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.chdir(tempfile.mkdtemp(prefix='ddns-tests-'))
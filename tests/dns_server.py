@@ -0,0 +1,123 @@
+"""
+离线测试用的权威DNS服务器：在本机 UDP/TCP 端口上应答查询并执行 RFC 2136 UPDATE，
+按先决条件校验，记录收到的消息数量
+"""
+
+import socket
+import socketserver
+import struct
+import threading
+
+import dns.message
+import dns.name
+import dns.opcode
+import dns.rcode
+import dns.rdataclass
+import dns.rdatatype
+import dns.rrset
+
+
+class StandInDNSServer:
+    """单区域的测试服务器，记录保存在 {(名称, 记录类型): {记录值}} 中"""
+
+    def __init__(self, zone, keyring=None):
+        """
+        Args:
+            zone: 区域名，例如 example.com
+            keyring: TSIG 密钥环，设置后要求所有请求签名
+        """
+        self.zone = dns.name.from_text(zone)
+        self.keyring = keyring
+        self.records = {}
+        self.queries = 0
+        self.updates = 0
+        self.lock = threading.Lock()
+
+        server = self
+
+        class UDPHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                data, sock = self.request
+                sock.sendto(server.handle(data), self.client_address)
+
+        class TCPHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                length = struct.unpack('!H', self._recv(2))[0]
+                response = server.handle(self._recv(length))
+                self.request.sendall(struct.pack('!H', len(response)) + response)
+
+            def _recv(self, size):
+                data = b''
+                while len(data) < size:
+                    chunk = self.request.recv(size - len(data))
+                    if not chunk:
+                        raise EOFError
+                    data += chunk
+                return data
+
+        self._tcp = socketserver.ThreadingTCPServer(('127.0.0.1', 0), TCPHandler)
+        self.port = self._tcp.server_address[1]
+        self._udp = socketserver.ThreadingUDPServer(('127.0.0.1', self.port), UDPHandler)
+        for srv in (self._tcp, self._udp):
+            srv.daemon_threads = True
+            threading.Thread(target=srv.serve_forever, daemon=True).start()
+
+    def close(self):
+        for srv in (self._tcp, self._udp):
+            srv.shutdown()
+            srv.server_close()
+
+    def set(self, name, rdtype, *values):
+        """设置记录集"""
+        self.records[(dns.name.from_text(name), rdtype)] = set(values)
+
+    def get(self, name, rdtype):
+        """获取记录集"""
+        return self.records.get((dns.name.from_text(name), rdtype), set())
+
+    def handle(self, wire):
+        message = dns.message.from_wire(wire, keyring=self.keyring)
+        if self.keyring and not message.had_tsig:
+            response = dns.message.make_response(message)
+            response.set_rcode(dns.rcode.REFUSED)
+            return response.to_wire()
+
+        with self.lock:
+            if message.opcode() == dns.opcode.UPDATE:
+                self.updates += 1
+                response = dns.message.make_response(message)
+                response.set_rcode(self._update(message))
+            else:
+                self.queries += 1
+                response = dns.message.make_response(message)
+                question = message.question[0]
+                values = self.records.get((question.name, dns.rdatatype.to_text(question.rdtype)))
+                if values:
+                    response.answer.append(dns.rrset.from_text_list(
+                        question.name, 300, 'IN', question.rdtype, sorted(values)))
+        return response.to_wire()
+
+    def _update(self, message):
+        """按 RFC 2136 第3节检查先决条件并执行更新，返回响应码"""
+        required = {}
+        for rrset in message.prerequisite:
+            key = (rrset.name, dns.rdatatype.to_text(rrset.rdtype))
+            if rrset.deleting == dns.rdataclass.NONE:
+                if self.records.get(key):
+                    return dns.rcode.YXRRSET
+            elif rrset.deleting == dns.rdataclass.ANY:
+                if not self.records.get(key):
+                    return dns.rcode.NXRRSET
+            else:
+                required.setdefault(key, set()).update(rdata.to_text() for rdata in rrset)
+        for key, values in required.items():
+            if self.records.get(key, set()) != values:
+                return dns.rcode.NXRRSET
+
+        for rrset in message.update:
+            key = (rrset.name, dns.rdatatype.to_text(rrset.rdtype))
+            if rrset.deleting == dns.rdataclass.ANY:
+                self.records.pop(key, None)
+            else:
+                self.records.setdefault(key, set()).update(rdata.to_text() for rdata in rrset)
+        return dns.rcode.NOERROR
@@ -0,0 +1,74 @@
+"""配置文件被其他程序修改时，尚未写入的修改与外部修改合并，冲突时放弃写入"""
+
+import json
+
+import pytest
+
+from config import Config
+from utils.config_diff import merge_configs
+
+
+def record(hostname, **fields):
+    return dict({'hostname': hostname, 'domain': 'example.com', 'record_type': 'A', 'api_token': 't'}, **fields)
+
+
+def test_merge_takes_both_sides():
+    base = {'platforms': {'cloudflare': [record('www')]}, 'settings': {'update_interval': 300}}
+    ours = {'platforms': {'cloudflare': [record('www'), record('api')]}, 'settings': {'update_interval': 300}}
+    theirs = {'platforms': {'cloudflare': [record('www', api_token='new')]}, 'settings': {'update_interval': 600}}
+
+    merged, conflicts = merge_configs(base, ours, theirs)
+
+    assert not conflicts
+    assert merged['platforms']['cloudflare'] == [record('www', api_token='new'), record('api')]
+    assert merged['settings'] == {'update_interval': 600}
+
+
+def test_merge_reports_conflicting_edits():
+    base = {'platforms': {'cloudflare': [record('www')]}}
+    ours = {'platforms': {'cloudflare': [record('www', api_token='ours')]}}
+    theirs = {'platforms': {'cloudflare': []}}
+
+    _, conflicts = merge_configs(base, ours, theirs)
+
+    assert conflicts == ['cloudflare_www.example.com_A']
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = Config()
+    config.upsert_record('cloudflare', record('www'))
+    assert config.flush()
+    yield config
+    config._watcher.stop()
+
+
+def edit_file(change):
+    with open('config.json', 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    change(data)
+    with open('config.json', 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=4)
+
+
+def test_flush_merges_external_edit(config):
+    config.upsert_record('cloudflare', record('api'))
+    edit_file(lambda data: data['settings'].update(update_interval=900))
+
+    assert config.flush()
+    with open('config.json', 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    assert [item['hostname'] for item in saved['platforms']['cloudflare']] == ['www', 'api']
+    assert saved['settings']['update_interval'] == 900
+    assert config.get_update_interval() == 900
+
+
+def test_flush_refuses_conflicting_write(config):
+    config.upsert_record('cloudflare', record('www', api_token='ours'))
+    edit_file(lambda data: data['platforms']['cloudflare'][0].update(api_token='theirs'))
+
+    assert not config.flush()
+    with open('config.json', 'r', encoding='utf-8') as f:
+        assert json.load(f)['platforms']['cloudflare'][0]['api_token'] == 'theirs'
+    assert config.get_record(('cloudflare', 'www', 'example.com', 'A'))['api_token'] == 'theirs'
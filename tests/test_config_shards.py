@@ -0,0 +1,35 @@
+"""分片文件只在修改后重新解析，解析失败的文件在再次修改前不重复解析"""
+
+import json
+import os
+
+from utils.config_shards import ConfigShards
+
+
+def write_shard(path, hostname, mtime_ns):
+    path.write_text(json.dumps({'platforms': {'cloudflare': [
+        {'hostname': hostname, 'domain': 'example.com', 'api_token': 't'}]}}), encoding='utf-8')
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_broken_shard_is_parsed_once_until_changed(tmp_path):
+    shard = tmp_path / 'team.json'
+    write_shard(shard, 'www', 1_000_000_000)
+    shards = ConfigShards()
+    parsed = []
+    parse = shards._parse
+    shards._parse = lambda path: parsed.append(path) or parse(path)
+
+    assert shards.refresh(str(tmp_path), ['team.json'])
+    shard.write_text('{broken', encoding='utf-8')
+    os.utime(shard, ns=(2_000_000_000, 2_000_000_000))
+    shards.refresh(str(tmp_path), ['team.json'])
+    shards.refresh(str(tmp_path), ['team.json'])
+    assert len(parsed) == 2
+    assert [key for key, _, _ in shards.records()] == [('cloudflare', 'www', 'example.com', 'A')]
+
+    # 修复后重新解析
+    write_shard(shard, 'api', 3_000_000_000)
+    assert shards.refresh(str(tmp_path), ['team.json'])
+    assert len(parsed) == 3
+    assert [key for key, _, _ in shards.records()] == [('cloudflare', 'api', 'example.com', 'A')]
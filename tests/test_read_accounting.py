@@ -0,0 +1,281 @@
+"""每轮更新中每条记录最多读取一次：用计数的假客户端替换各平台的接口客户端"""
+
+from collections import Counter
+
+import pytest
+
+from dns_platforms.aliyun import AliyunDNS
+from dns_platforms.dnspod import DnspodDNS
+from dns_platforms.tencent import TencentDNS
+from utils.reconciler import Reconciler
+
+IPV4 = '198.51.100.7'
+IPV6 = '2001:db8::7'
+HOSTS = ['@', 'www', 'api', 'mail']
+
+
+class FakeAliyunClient:
+    """按 (主机名, 类型) 保存记录，统计 DescribeDomainRecords 次数"""
+
+    def __init__(self):
+        self.records = {}
+        self.reads = Counter()
+
+    def call(self, action, **params):
+        if action == 'DescribeDomainRecords':
+            key = (params['RRKeyWord'], params['Type'])
+            self.reads[key] += 1
+            value = self.records.get(key)
+            record = [{'RR': key[0], 'Type': key[1], 'Value': value, 'RecordId': '-'.join(key)}] if value else []
+            return {'DomainRecords': {'Record': record}}
+        if action == 'UpdateDomainRecord':
+            self.records[(params['RR'], params['Type'])] = params['Value']
+            return {}
+        if action == 'AddDomainRecord':
+            self.records[(params['RR'], params['Type'])] = params['Value']
+            return {'RecordId': f"{params['RR']}-{params['Type']}"}
+        raise AssertionError(action)
+
+
+class FakeTencentClient:
+    """单站点的 EdgeOne 接口，统计各读取接口的调用次数"""
+
+    def __init__(self):
+        self.domains = {}
+        self.reads = Counter()
+
+    def call(self, action, params=None):
+        self.reads[action] += 1
+        if action == 'DescribeZones':
+            return {'Zones': [{'ZoneName': 'example.com', 'ZoneId': 'zone-1', 'ActiveStatus': 'active'}],
+                    'TotalCount': 1}
+        if action == 'DescribeAccelerationDomains':
+            page = [{'DomainName': name, 'OriginDetail': {'OriginType': 'IP_DOMAIN', 'Origin': origin}}
+                    for name, origin in self.domains.items()]
+            return {'AccelerationDomains': page, 'TotalCount': len(page)}
+        if action == 'ModifyAccelerationDomain':
+            self.domains[params['DomainName']] = params['OriginInfo']['Origin']
+            return {'RequestId': 'req'}
+        raise AssertionError(action)
+
+
+class FakeDnspodClient:
+    """单域名的 DNSPod 接口，统计 DescribeRecordList 次数，批量任务立即完成"""
+
+    def __init__(self):
+        self.records = {}  # RecordId -> 记录详情
+        self.reads = Counter()
+        self._jobs = {}
+
+    def call(self, action, params=None):
+        if action == 'DescribeRecordList':
+            self.reads[params['Domain']] += 1
+            page = list(self.records.values())
+            return {'RecordList': page, 'RecordCountInfo': {'TotalCount': len(page)}}
+        if action == 'ModifyRecordBatch':
+            for record_id in params['RecordIdList']:
+                self.records[record_id]['Value'] = params['ChangeTo']
+            self._jobs[len(self._jobs)] = params['RecordIdList']
+            return {'JobId': len(self._jobs) - 1}
+        if action == 'DescribeBatchTask':
+            return {'Status': 'success', 'DetailList': [
+                {'RecordList': [{'RecordId': record_id, 'Status': 'success'}
+                                for record_id in self._jobs[params['JobId']]]}]}
+        if action in ('CreateRecord', 'ModifyRecord'):
+            record_id = params.get('RecordId') or len(self.records) + 1
+            self.records[record_id] = {'RecordId': record_id, 'Name': params['SubDomain'],
+                                       'Type': params['RecordType'], 'Value': params['Value']}
+            return {'RecordId': record_id}
+        raise AssertionError(action)
+
+
+def make_platforms(platform_class, credentials, client=None):
+    """为每个主机名创建 A 和 AAAA 记录的平台实例，并替换为假客户端"""
+    platforms = {}
+    for hostname in HOSTS:
+        for record_type in ('A', 'AAAA'):
+            platform = platform_class(dict(credentials, hostname=hostname, domain='example.com',
+                                           record_type=record_type))
+            if client is not None:
+                platform.client = client
+            platforms[f"{platform.get_platform_key()}[{record_type}]"] = platform
+    return platforms
+
+
+def run_cycle(reconciler, platform_class, platforms):
+    """模拟一轮更新"""
+    platform_class.new_cycle()
+    return reconciler.run(platforms, IPV4, IPV6)
+
+
+@pytest.fixture
+def reconciler():
+    return Reconciler()
+
+
+def test_aliyun_reads_each_record_once(reconciler):
+    client = FakeAliyunClient()
+    client.records[('www', 'A')] = '192.0.2.1'
+    platforms = make_platforms(AliyunDNS, {'access_key_id': 'id', 'access_key_secret': 'secret'}, client)
+
+    results = run_cycle(reconciler, AliyunDNS, platforms)
+    assert all(results.values())
+    assert set(client.reads) == {(hostname, record_type) for hostname in HOSTS for record_type in ('A', 'AAAA')}
+    assert max(client.reads.values()) == 1
+
+    # 下一轮记录已同步，不再读取
+    client.reads.clear()
+    run_cycle(reconciler, AliyunDNS, platforms)
+    assert not client.reads
+
+
+def test_tencent_reads_zone_index_once_per_cycle(reconciler):
+    client = FakeTencentClient()
+    client.domains = {'www.example.com': '192.0.2.1', 'api.example.com': IPV4}
+    platforms = make_platforms(TencentDNS, {'secret_id': 'id', 'secret_key': 'accounting'}, client)
+
+    run_cycle(reconciler, TencentDNS, platforms)
+    assert client.reads['DescribeZones'] <= 1
+    assert client.reads['DescribeAccelerationDomains'] == 1
+
+    client.reads.clear()
+    run_cycle(reconciler, TencentDNS, platforms)
+    assert client.reads['DescribeAccelerationDomains'] == 0
+
+
+def test_dnspod_reads_record_list_once_per_cycle(reconciler):
+    client = FakeDnspodClient()
+    for record_id, (hostname, record_type) in enumerate([('www', 'A'), ('api', 'A'), ('www', 'AAAA')], 1):
+        client.records[record_id] = {'RecordId': record_id, 'Name': hostname, 'Type': record_type,
+                                     'Value': '192.0.2.1' if record_type == 'A' else '2001:db8::1'}
+    platforms = make_platforms(DnspodDNS, {'secret_id': 'id', 'secret_key': 'accounting'}, client)
+
+    results = run_cycle(reconciler, DnspodDNS, platforms)
+    assert all(results.values())
+    assert client.reads == Counter({'example.com': 1})
+
+    client.reads.clear()
+    run_cycle(reconciler, DnspodDNS, platforms)
+    assert not client.reads
+
+
+class FakeCloudflareApi:
+    """Cloudflare 接口，统计每条记录的读取次数"""
+
+    def __init__(self):
+        self.records = {}  # 记录ID -> 记录详情
+        self.reads = Counter()
+
+    def request(self, method, url, params=None, json=None, **kwargs):
+        path = url.split('/client/v4/', 1)[1]
+        if path == 'zones':
+            result = [{'id': 'zone-1', 'name': 'example.com'}]
+        elif path == 'zones/zone-1/dns_records' and method == 'GET':
+            self.reads[(params['name'], params['type'])] += 1
+            result = [record for record in self.records.values()
+                      if (record['name'], record['type']) == (params['name'], params['type'])]
+        elif path == 'zones/zone-1/dns_records' and method == 'POST':
+            result = dict(json, id=f"{json['name']}-{json['type']}")
+            self.records[result['id']] = result
+        else:
+            record_id = path.rsplit('/', 1)[1]
+            if method == 'GET':
+                record = self.records[record_id]
+                self.reads[(record['name'], record['type'])] += 1
+            else:
+                self.records[record_id] = dict(json, id=record_id)
+            result = self.records[record_id]
+        return FakeResponse({'success': True, 'result': result})
+
+
+class FakeResponse:
+    status_code = 200
+    ok = True
+
+    def __init__(self, data):
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+def test_cloudflare_reads_each_record_once(reconciler, monkeypatch):
+    pytest.importorskip('PySide6')
+    from dns_platforms.cloudflare import CloudflareDNS
+
+    api = FakeCloudflareApi()
+    api.records['www-A'] = {'id': 'www-A', 'name': 'www.example.com', 'type': 'A', 'content': '192.0.2.1'}
+    monkeypatch.setattr('utils.http_client.request', api.request)
+    platforms = make_platforms(CloudflareDNS, {'api_token': 'accounting'})
+
+    results = run_cycle(reconciler, CloudflareDNS, platforms)
+    assert all(results.values())
+    assert len(api.reads) == len(platforms)
+    assert max(api.reads.values()) == 1
+
+    api.reads.clear()
+    run_cycle(reconciler, CloudflareDNS, platforms)
+    assert not api.reads
+
+
+class MemoryStateStore:
+    """只实现 get_state / set_state 的运行状态存储"""
+
+    def __init__(self):
+        self.state = {}
+
+    def get_state(self, key, default=None):
+        return self.state.get(key, default)
+
+    def set_state(self, key, value):
+        self.state[key] = value
+
+
+def test_saved_state_skips_reads_after_restart():
+    store = MemoryStateStore()
+    client = FakeAliyunClient()
+    platforms = make_platforms(AliyunDNS, {'access_key_id': 'id', 'access_key_secret': 'restart'}, client)
+    run_cycle(Reconciler(store), AliyunDNS, platforms)
+
+    # 重启后复核间隔内不重新读取已确认的记录，期望值变化的记录仍先读取再写入
+    client.reads.clear()
+    AliyunDNS.new_cycle()
+    results = Reconciler(store).run(platforms, IPV4, '2001:db8::8')
+    assert set(client.reads) == {(hostname, 'AAAA') for hostname in HOSTS}
+    assert all(results.values())
+
+
+def test_dnspod_failed_read_is_not_retried_on_write(reconciler):
+    client = FakeDnspodClient()
+    call = client.call
+
+    def failing_call(action, params=None):
+        if action == 'DescribeRecordList':
+            client.reads[params['Domain']] += 1
+            raise ConnectionError('timeout')
+        return call(action, params)
+
+    client.call = failing_call
+    platforms = make_platforms(DnspodDNS, {'secret_id': 'id', 'secret_key': 'failed-read'}, client)
+
+    results = run_cycle(reconciler, DnspodDNS, platforms)
+    assert not any(results.values())
+    assert not client.records
+    assert client.reads['example.com'] <= len(platforms)
+
+
+def test_record_interval_drives_verification(reconciler):
+    client = FakeAliyunClient()
+    platforms = make_platforms(AliyunDNS, {'access_key_id': 'id', 'access_key_secret': 'interval', 'interval': 60},
+                               client)
+    run_cycle(reconciler, AliyunDNS, platforms)
+
+    # 距上次确认超过记录的更新间隔，重新读取
+    for state in reconciler._states.values():
+        state.checked_at -= 120
+    client.reads.clear()
+    run_cycle(reconciler, AliyunDNS, platforms)
+    assert max(client.reads.values()) == 1 and len(client.reads) == len(platforms)
@@ -0,0 +1,88 @@
+"""RFC 2136 平台：使用本机的测试服务器离线验证查询、合并更新和先决条件"""
+
+import base64
+
+import dns.tsigkeyring
+import pytest
+
+from dns_platforms.rfc2136 import Rfc2136DNS
+from tests.dns_server import StandInDNSServer
+
+KEY_NAME = 'ddns-key'
+KEY_SECRET = base64.b64encode(b'0123456789abcdef0123456789abcdef').decode()
+
+
+@pytest.fixture
+def server():
+    server = StandInDNSServer('example.com', dns.tsigkeyring.from_text({KEY_NAME: KEY_SECRET}))
+    yield server
+    server.close()
+
+
+def make_platform(server, hostname, record_type='A', host='127.0.0.1'):
+    return Rfc2136DNS({
+        'platform': 'rfc2136',
+        'hostname': hostname,
+        'domain': 'example.com',
+        'record_type': record_type,
+        'server': f"{host}:{server.port}",
+        'key_name': KEY_NAME,
+        'key_secret': KEY_SECRET,
+    })
+
+
+def test_read_queries_primary(server):
+    server.set('www.example.com', 'A', '192.0.2.1')
+    platform = make_platform(server, 'www')
+
+    assert platform.read() == '192.0.2.1'
+    assert make_platform(server, 'missing').read() is None
+    assert server.queries == 2
+
+
+def test_batch_sends_one_update_per_zone(server):
+    server.set('www.example.com', 'A', '192.0.2.1')
+    server.set('example.com', 'A', '192.0.2.1')
+    platforms = [make_platform(server, 'www'), make_platform(server, '@'), make_platform(server, 'new')]
+    for platform in platforms:
+        platform.read()
+
+    results = Rfc2136DNS.write_batch([(platform, '198.51.100.7') for platform in platforms])
+
+    assert all(results.values())
+    assert server.updates == 1
+    for name in ('www.example.com', 'example.com', 'new.example.com'):
+        assert server.get(name, 'A') == {'198.51.100.7'}
+
+
+def test_prerequisite_covers_whole_rrset(server):
+    server.set('www.example.com', 'A', '192.0.2.1', '192.0.2.2')
+    platform = make_platform(server, 'www')
+    platform.read()
+
+    assert platform.write('198.51.100.7')
+    assert server.get('www.example.com', 'A') == {'198.51.100.7'}
+
+
+def test_prerequisite_rejects_concurrent_change(server):
+    server.set('www.example.com', 'A', '192.0.2.1')
+    platform = make_platform(server, 'www')
+    platform.read()
+    server.set('www.example.com', 'A', '203.0.113.9')
+
+    assert not platform.write('198.51.100.7')
+    assert server.get('www.example.com', 'A') == {'203.0.113.9'}
+
+
+def test_server_hostname_is_resolved(server):
+    server.set('www.example.com', 'A', '192.0.2.1')
+    platform = make_platform(server, 'www', host='localhost')
+
+    assert platform.warm_up()
+    assert platform.read() == '192.0.2.1'
+
+
+def test_invalid_ttl_falls_back_to_default():
+    platform = Rfc2136DNS({'server': '127.0.0.1', 'domain': 'example.com', 'ttl': 'abc'})
+    assert platform.ttl == Rfc2136DNS.DEFAULT_TTL
+    assert Rfc2136DNS({'server': '127.0.0.1', 'domain': 'example.com', 'ttl': '60'}).ttl == 60
@@ -1,12 +1,11 @@
-import importlib
-
 from PySide6.QtCore import Qt, QPoint, QTimer
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QFormLayout,
-                               QPushButton, QLineEdit, QComboBox,
+                               QPushButton, QLineEdit, QComboBox, QSpinBox,
                                QWidget, QGroupBox, QHBoxLayout, QMessageBox)
 
-from dns_platforms import PLATFORM_NAMES, PLATFORM_MAPPING
+from dns_platforms import PLATFORM_NAMES, PLATFORM_MAPPING, CAP_ZONE_LISTING, get_platform_class, has_capability
 from utils.logger import Logger
+from utils.scheduler import PRIORITY_NAMES, PRIORITY_NORMAL
 
 
 class DNSRecordDialog(QDialog):
@@ -21,6 +20,9 @@ class DNSRecordDialog(QDialog):
         # 初始化UI组件
         self.platform_combo = None
         self.record_type_combo = None
+        self.interval_spin = None
+        self.priority_combo = None
+        self.verify_spin = None
         self.platform_settings = None
         self.form_layout = None
         self.form_fields = {}
@@ -72,9 +74,38 @@ class DNSRecordDialog(QDialog):
         self.record_type_combo.addItems(["A (IPv4)", "AAAA (IPv6)"])
         self.record_type_combo.setFixedHeight(32)
 
+        # 更新间隔，0 表示跟随全局设置
+        self.interval_spin = QSpinBox()
+        self.interval_spin.setObjectName("configInput")
+        self.interval_spin.setRange(0, 86400)
+        self.interval_spin.setSingleStep(30)
+        self.interval_spin.setSuffix(" 秒")
+        self.interval_spin.setSpecialValueText("跟随全局设置")
+        self.interval_spin.setFixedHeight(32)
+
+        # 优先级
+        self.priority_combo = QComboBox()
+        self.priority_combo.setObjectName("configCombo")
+        for priority, name in PRIORITY_NAMES.items():
+            self.priority_combo.addItem(name, priority)
+        self.priority_combo.setCurrentIndex(self.priority_combo.findData(PRIORITY_NORMAL))
+        self.priority_combo.setFixedHeight(32)
+
+        # 复核间隔，0 表示使用默认值
+        self.verify_spin = QSpinBox()
+        self.verify_spin.setObjectName("configInput")
+        self.verify_spin.setRange(0, 1440)
+        self.verify_spin.setSingleStep(5)
+        self.verify_spin.setSuffix(" 分钟")
+        self.verify_spin.setSpecialValueText("跟随更新间隔（未设置时 30 分钟）")
+        self.verify_spin.setFixedHeight(32)
+
         # 添加基本设置
         form_layout.addRow("DNS平台:", self.platform_combo)
         form_layout.addRow("记录类型:", self.record_type_combo)
+        form_layout.addRow("更新间隔:", self.interval_spin)
+        form_layout.addRow("优先级:", self.priority_combo)
+        form_layout.addRow("复核间隔:", self.verify_spin)
 
         # 创建平台特定设置容
         self.platform_settings = QWidget()
@@ -130,9 +161,9 @@ class DNSRecordDialog(QDialog):
             if not module_name:
                 return
 
-            module = importlib.import_module(f"dns_platforms.{module_name}")
-            class_name = module_name.title() + 'DNS'
-            platform_class = getattr(module, class_name)
+            platform_class = get_platform_class(module_name)
+            if not platform_class:
+                return
 
             # 创建所有字段（除了域名字段）
             for field_name, field_config in platform_class.CONFIG_FIELDS.items():
@@ -171,14 +202,12 @@ class DNSRecordDialog(QDialog):
                 input_field = QComboBox()
                 input_field.setObjectName("configCombo")
                 input_field.setFixedHeight(32)
+                # 不提供区域列表的平台需要手动填写域名
+                input_field.setEditable(not has_capability(module_name, CAP_ZONE_LISTING))
 
-                # 果有认证信息，立即获取域名列表
-                auth_fields = {}
-                for field_name, field in self.form_fields.items():
-                    if field_name != 'domain':  # 跳过域名字段
-                        auth_fields[field_name] = field.text().strip()
-
-                if all(auth_fields.values()):  # 如果所有认证字段都有值
+                # 如果必填的认证信息都已填写，立即获取域名列表
+                auth_fields, missing = self._collect_auth_fields(platform_class)
+                if not missing:
                     try:
                         platform_instance = platform_class(auth_fields)
                         domains = platform_instance.get_domains()
@@ -213,20 +242,15 @@ class DNSRecordDialog(QDialog):
             if not module_name:
                 return
 
-            module = importlib.import_module(f"dns_platforms.{module_name}")
-            class_name = module_name.title() + 'DNS'
-            platform_class = getattr(module, class_name)
+            platform_class = get_platform_class(module_name)
+            if not platform_class:
+                return
 
             # 收集认证信息
-            config = {}
-            for field_name, field in self.form_fields.items():
-                if field_name != 'domain':  # 跳过域名字段
-                    if isinstance(field, QLineEdit):
-                        value = field.text().strip()
-                        if not value:  # 如果必要字段为空
-                            QMessageBox.warning(self, "错误", "请填写所有必要的认证信息")
-                            return
-                        config[field_name] = value
+            config, missing = self._collect_auth_fields(platform_class)
+            if missing:
+                QMessageBox.warning(self, "错误", "请填写所有必要的认证信息")
+                return
 
             # 创建平台实例并获取域名列表
             try:
@@ -246,6 +270,24 @@ class DNSRecordDialog(QDialog):
         except Exception as e:
             QMessageBox.critical(self, "错误", f"初始化DNS平台失败: {str(e)}")
 
+    def _collect_auth_fields(self, platform_class):
+        """
+        收集表单中已填写的字段，主机名和标记为 optional 的字段可以为空
+        Returns:
+            tuple: (字段名 -> 值, 是否有必填字段为空)
+        """
+        config = {}
+        missing = False
+        for field_name, field in self.form_fields.items():
+            if field_name == 'domain' or not isinstance(field, QLineEdit):
+                continue
+            value = field.text().strip()
+            if value:
+                config[field_name] = value
+            elif field_name != 'hostname' and not platform_class.CONFIG_FIELDS.get(field_name, {}).get('optional'):
+                missing = True
+        return config, missing
+
     def mousePressEvent(self, event):
         """记录鼠标按下的位置"""
         if event.button() == Qt.LeftButton:
@@ -281,6 +323,13 @@ class DNSRecordDialog(QDialog):
                 type_index = self.record_type_combo.findText(type_text)
                 if type_index >= 0:
                     self.record_type_combo.setCurrentIndex(type_index)
+
+            # 设置调度选项
+            self.interval_spin.setValue(int(self.record_data.get('interval') or 0))
+            priority_index = self.priority_combo.findData(int(self.record_data.get('priority', PRIORITY_NORMAL)))
+            if priority_index >= 0:
+                self.priority_combo.setCurrentIndex(priority_index)
+            self.verify_spin.setValue(int(self.record_data.get('verify_interval') or 0) // 60)
         except Exception as e:
             self.logger.error(f"初始化基本字段失败: {str(e)}")
 
@@ -323,4 +372,12 @@ class DNSRecordDialog(QDialog):
             if field_name not in ['domain', 'hostname']:  # 已经添加过的字段跳过
                 data[field_name] = field.text()
 
+        # 调度选项只保存非默认值
+        if self.interval_spin.value():
+            data['interval'] = self.interval_spin.value()
+        if self.priority_combo.currentData() != PRIORITY_NORMAL:
+            data['priority'] = self.priority_combo.currentData()
+        if self.verify_spin.value():
+            data['verify_interval'] = self.verify_spin.value() * 60
+
         return data
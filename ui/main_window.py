@@ -174,6 +174,13 @@ class MainWindow(QMainWindow):
         if hasattr(self, 'status_tab'):
             self.status_tab.dns_updater = dns_updater
 
+    def on_config_changed(self, diff):
+        """配置文件被外部修改后刷新界面"""
+        if diff.records_changed:
+            self.dns_tab.refresh_records()
+        if diff.settings:
+            self.settings_tab.load_config()
+
     def check_for_updates(self):
         """检查更新"""
 
@@ -1,14 +1,14 @@
-import importlib
-from pathlib import Path
-
 from PySide6.QtCore import Qt
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QPushButton, QLineEdit, QGroupBox, QTableWidget, QTableWidgetItem,
                                QHBoxLayout,
-                               QHeaderView)
+                               QHeaderView, QFileDialog)
 
-from dns_platforms import PLATFORM_MAPPING
+from dns_platforms import PLATFORM_MAPPING, PLATFORM_NAMES, get_platform_class, get_spec
 from ui.dialogs.dns_record_dialog import DNSRecordDialog
+from utils import bulk_io
 from utils.logger import Logger
+from utils.record_store import make_key
+from utils.threads import BulkImportThread, ThreadManager
 
 
 class DNSTab(QWidget):
@@ -75,7 +75,20 @@ class DNSTab(QWidget):
         self.delete_btn.clicked.connect(self.delete_selected_record)
         self.delete_btn.setVisible(False)  # 初始隐藏
 
+        # 批量导入导出按钮
+        self.import_btn = QPushButton("导入")
+        self.import_btn.setObjectName("primaryButton")
+        self.import_btn.setFixedWidth(60)
+        self.import_btn.clicked.connect(self.import_records)
+
+        self.export_btn = QPushButton("导出")
+        self.export_btn.setObjectName("primaryButton")
+        self.export_btn.setFixedWidth(60)
+        self.export_btn.clicked.connect(self.export_records)
+
         button_layout.addWidget(self.add_btn)
+        button_layout.addWidget(self.import_btn)
+        button_layout.addWidget(self.export_btn)
         button_layout.addStretch()
         button_layout.addWidget(self.edit_btn)
         button_layout.addWidget(self.delete_btn)
@@ -98,64 +111,40 @@ class DNSTab(QWidget):
         if not selected_rows:
             return
 
-        row = selected_rows[0].row()
-        platform = self.records_table.item(row, 0).text()
-        domain = self.records_table.item(row, 1).text()
-        hostname = self.records_table.item(row, 2).text()
-
-        # 获取平台模块名 - 修改这部分代码
-        platform_mapping = {
-            'Tencent': '腾讯云',
-            'Aliyun': '阿里云',
-            'Cloudflare': 'Cloudflare'
-        }
-        platform_name = platform_mapping.get(platform, platform)
-        platform_module = PLATFORM_MAPPING.get(platform_name)
-
-        if not platform_module:
-            self.logger.error(f"不支持的DNS平台: {platform}")
+        key = self._row_key(selected_rows[0].row())
+        record_data = self.config.get_record(key) if key else None
+        if not record_data:
+            self.logger.error("未找到选中的DNS记录")
             return
 
-        # 从配置中获取完整记录数据
-        config = self.config.load_config()
-        platforms = config.get('platforms', {})
-        records = platforms.get(platform_module, [])
-
-        # 查找匹配的记录
-        record_data = None
-        for record in records:
-            if record.get('domain') == domain and record.get('hostname', '@') == hostname:
-                record_data = record.copy()
-                record_data['platform'] = platform_name  # 使用正确的平台名称
-                break
-
-        if record_data:
-            dialog = DNSRecordDialog(self, record_data)
-            if dialog.exec():
-                # 获取新的表单数据
-                form_data = dialog.get_form_data()
-
-                # 更新配置
-                config = self.config.load_config()
-                platforms = config.get('platforms', {})
-                records = platforms.get(platform_module, [])
-
-                # 更新匹配的记录
-                for i, record in enumerate(records):
-                    if record.get('domain') == domain and record.get('hostname', '@') == hostname:
-                        records[i] = form_data
-                        break
-
-                # 保存配置
-                config['platforms'][platform_module] = records
-                self.config.save_config(config)
-
-                # 刷新显示
-                self.refresh_records()
-
-                # 显示成功消息
+        spec = get_spec(key[0])
+        record_data['platform'] = spec.label if spec else key[0]  # 使用正确的平台名称
+
+        dialog = DNSRecordDialog(self, record_data)
+        if dialog.exec():
+            # 获取新的表单数据
+            form_data = dialog.get_form_data()
+            platform_module = PLATFORM_MAPPING.get(form_data['platform'])
+            if not platform_module:
+                self.logger.error(f"不支持的DNS平台: {form_data['platform']}")
+                return
+
+            new_key = make_key(platform_module, form_data)
+            if new_key != key and new_key in self.config.get_record_store():
                 if self.main_window:
-                    self.main_window.show_message("DNS记录已更新", "success")
+                    self.main_window.show_message("相同的DNS记录已存在", "error")
+                return
+
+            # 更新配置
+            self.config.upsert_record(platform_module, form_data, old_key=key)
+            self._reload_platforms()
+
+            # 刷新显示
+            self.refresh_records()
+
+            # 显示成功消息
+            if self.main_window:
+                self.main_window.show_message("DNS记录已更新", "success")
 
     def delete_selected_record(self):
         """删除选中的记录"""
@@ -245,19 +234,14 @@ class DNSTab(QWidget):
                 self.logger.error(f"不支持的DNS平台: {platform_name}")
                 return
 
-            # 更新配置
-            config = self.config.load_config()
-            if 'platforms' not in config:
-                config['platforms'] = {}
-
-            if platform_module not in config['platforms']:
-                config['platforms'][platform_module] = []
+            if make_key(platform_module, form_data) in self.config.get_record_store():
+                if self.main_window:
+                    self.main_window.show_message("相同的DNS记录已存在", "error")
+                return
 
             # 添加记录
-            config['platforms'][platform_module].append(form_data)
-
-            # 保存配置
-            self.config.save_config(config)
+            self.config.upsert_record(platform_module, form_data)
+            self._reload_platforms()
 
             # 刷新显示
             self.refresh_records()
@@ -266,6 +250,49 @@ class DNSTab(QWidget):
             if self.main_window:
                 self.main_window.show_message("DNS记录已添加", "success")
 
+    def import_records(self):
+        """从 CSV / JSONL 文件批量导入记录，校验在后台线程中进行"""
+        path, _ = QFileDialog.getOpenFileName(self, "导入DNS记录", "", "记录文件 (*.csv *.jsonl *.ndjson)")
+        if not path:
+            return
+
+        self.import_btn.setEnabled(False)
+        import_thread = BulkImportThread(path)
+        import_thread.success.connect(self._on_import_prepared)
+        import_thread.error.connect(lambda e: self.main_window.show_message(f"导入失败: {e}", "error"))
+        import_thread.finished.connect(lambda: self.import_btn.setEnabled(True))
+        ThreadManager.instance().submit_thread(import_thread)
+
+    def _on_import_prepared(self, result):
+        """导入文件校验完成，在主线程中一次写入配置"""
+        records, report = result
+        if records:
+            bulk_io.commit_import(self.config, records, report)
+            self._reload_platforms()
+            self.refresh_records()
+
+        self.logger.info(f"批量导入DNS记录：{report.summary()}")
+        for line_no, message in report.errors[:100]:
+            self.logger.warning(f"导入第 {line_no} 行失败: {message}")
+        if len(report.errors) > 100:
+            self.logger.warning(f"另有 {len(report.errors) - 100} 行导入失败")
+
+        if self.main_window:
+            self.main_window.show_message(report.summary(), "error" if report.errors else "success")
+
+    def export_records(self):
+        """导出全部记录为 CSV / JSONL 文件"""
+        path, _ = QFileDialog.getSaveFileName(self, "导出DNS记录", "dns_records.csv", "CSV (*.csv);;JSONL (*.jsonl)")
+        if not path:
+            return
+
+        try:
+            count = bulk_io.export_records(self.config, path)
+            self.main_window.show_message(f"已导出 {count} 条DNS记录", "success")
+        except Exception as e:
+            self.logger.error(f"导出DNS记录失败: {str(e)}")
+            self.main_window.show_message("导出DNS记录失败", "error")
+
     def edit_record(self, record_data):
         """编辑现有记录"""
         dialog = DNSRecordDialog(self, record_data)
@@ -276,34 +303,31 @@ class DNSTab(QWidget):
         """删除记录"""
         # 使用对话框请求确认
         if self.main_window.show_dialog("确定删除这条DNS记录吗？", "confirm"):
+            key = self._row_key(row)
             self.records_table.removeRow(row)
-            self.save_config()
+            if key:
+                self.config.delete_record(key)
+                self._reload_platforms()
             # 使Toast显示成功消息
             self.main_window.show_message("DNS记录已删除", "success")
 
     def load_config(self):
         """加载配置到表格"""
-        config = self.config.load_config()
-        platforms = config.get('platforms', {})
-
         # 清空表格
         self.records_table.setRowCount(0)
 
         # 添加记录到表格
-        for platform_name, records in platforms.items():
-            if isinstance(records, list):
-                for record in records:
-                    self._add_record_to_table(platform_name, record)
-            else:
-                self._add_record_to_table(platform_name, records)
-
-    def _add_record_to_table(self, platform_name, record):
-        """添加单条记录到表格"""
+        for key, record in self.config.get_record_store():
+            self._add_record_to_table(key, record)
+
+    def _add_record_to_table(self, key, record):
+        """添加单条记录到表格，主键保存在第一列的数据中"""
         row = self.records_table.rowCount()
         self.records_table.insertRow(row)
 
-        # 平台名称首字母大写
-        display_name = platform_name.replace('_', ' ').title()
+        # 显示注册表中的平台名称
+        spec = get_spec(key[0])
+        display_name = spec.label if spec else key[0]
 
         # 设置表格内容并居中对齐
         for col, text in enumerate([
@@ -314,91 +338,37 @@ class DNSTab(QWidget):
             item = QTableWidgetItem(text)
             item.setTextAlignment(Qt.AlignCenter)  # 设置文本居中对齐
             self.records_table.setItem(row, col, item)
+        self.records_table.item(row, 0).setData(Qt.UserRole, key)
 
-    def save_config(self):
-        """保存DNS配置"""
-        config = self.config.load_config()
-        new_platforms = {}
-
-        # 遍历表格中的所有记录
-        for row in range(self.records_table.rowCount()):
-            platform_name = self.records_table.item(row, 0).text()
-            record_type = self.records_table.item(row, 1).text().split(' ')[0]
-            domain = self.records_table.item(row, 2).text()
+    def _row_key(self, row):
+        """获取表格行对应的记录主键"""
+        item = self.records_table.item(row, 0)
+        return item.data(Qt.UserRole) if item else None
 
-            # 获取平台模块名
-            platform_module = PLATFORM_MAPPING.get(platform_name)
-            if not platform_module:
-                continue  # 跳过不支持的平台
-
-            # 确保平台配置是列表
-            if platform_module not in new_platforms:
-                new_platforms[platform_module] = []
-
-            # 从现有配置中获取认证信息
-            record_config = {
-                'domain': domain,
-                'record_type': record_type
-            }
-
-            # 查找并保留认证信息
-            if platform_module in config.get('platforms', {}):
-                old_records = config['platforms'][platform_module]
-                if isinstance(old_records, list):
-                    for old_record in old_records:
-                        if old_record.get('domain') == domain:
-                            # 获取平台的配置字段
-                            try:
-                                module = importlib.import_module(f"dns_platforms.{platform_module}")
-                                platform_class = getattr(module, f"{platform_module.title()}DNS")
-                                # 保留所有平台特定的字段
-                                for field in platform_class.CONFIG_FIELDS:
-                                    if field != 'domain':  # 域名已经有了
-                                        record_config[field] = old_record.get(field, '')
-                            except Exception:
-                                pass  # 如果获取平台配置失败，跳过
-                            break
-                elif isinstance(old_records, dict):
-                    if old_records.get('domain') == domain:
-                        try:
-                            module = importlib.import_module(f"dns_platforms.{platform_module}")
-                            platform_class = getattr(module, f"{platform_module.title()}DNS")
-                            # 保留所平台特定的字段
-                            for field in platform_class.CONFIG_FIELDS:
-                                if field != 'domain':  # 域名已经有了
-                                    record_config[field] = old_records.get(field, '')
-                        except Exception:
-                            pass  # 如果获取平台配置失败，跳过
-
-            # 添加记录到新配置
-            new_platforms[platform_module].append(record_config)
-
-        # 更新配置
-        config['platforms'] = new_platforms
-        self.config.save_config(config)
+    def save_config(self):
+        """保存DNS配置：删除表格中已移除的记录"""
+        keys = {self._row_key(row) for row in range(self.records_table.rowCount())}
+        removed = [key for key, _ in self.config.get_record_store() if key not in keys]
+        for key in removed:
+            self.config.delete_record(key)
+        if removed:
+            self._reload_platforms()
+
+    def _reload_platforms(self):
+        """记录变更后通知DNS更新器增量重新加载"""
+        dns_updater = getattr(self.main_window, 'dns_updater', None)
+        if dns_updater:
+            dns_updater.reload_platforms()
 
     def get_record_config(self, row):
         """获取完整的记录配置（包括明文API Token）"""
-        platform = self.records_table.item(row, 0).text().lower().replace(' ', '_')
-        config = self.config.load_config()
-        platforms = config.get('platforms', {})
-        records = platforms.get(platform, [])
-
-        # 找到对应的记录
-        domain = self.records_table.item(row, 1).text()
-        for record in records:
-            if record.get('domain') == domain:
-                return record
-        return None
+        key = self._row_key(row)
+        return self.config.get_record(key) if key else None
 
     def load_available_platforms(self):
         """加载可用的DNS平台"""
         try:
-            platforms_dir = Path(__file__).parent.parent.parent / 'dns_platforms'
-            for file in platforms_dir.glob('*.py'):
-                if file.stem not in ['__init__', 'base', 'aliyun']:  # 暂时排除aliyun
-                    platform_name = file.stem.title()
-                    self.platform_combo.addItem(platform_name)
+            self.platform_combo.addItems(PLATFORM_NAMES)
         except Exception as e:
             self.logger.error(f"载DNS平台列表失败: {str(e)}")
 
@@ -414,10 +384,10 @@ class DNSTab(QWidget):
             if not module_name:
                 return
 
-            # 动态加载平台类
-            module = importlib.import_module(f"dns_platforms.{module_name}")
-            class_name = module_name.title() + 'DNS'  # 使用模块名构造类名
-            platform_class = getattr(module, class_name)
+            # 按需加载平台类
+            platform_class = get_platform_class(module_name)
+            if not platform_class:
+                return
 
             # 保存当前表单的值
             current_values = {}
@@ -503,20 +473,7 @@ class DNSTab(QWidget):
     def refresh_records(self):
         """刷新DNS记录列表"""
         try:
-            # 清空表格
-            self.records_table.setRowCount(0)
-
-            # 重新加载配置
-            config = self.config.load_config()
-            platforms = config.get('platforms', {})
-
-            # 添加记录到表格
-            for platform_name, records in platforms.items():
-                if isinstance(records, list):
-                    for record in records:
-                        self._add_record_to_table(platform_name, record)
-                else:
-                    self._add_record_to_table(platform_name, records)
+            self.load_config()
 
             # 更新按钮状态
             self.on_selection_changed()
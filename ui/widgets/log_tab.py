@@ -1,37 +1,104 @@
-from PySide6.QtCore import QTimer
-from PySide6.QtGui import QTextCharFormat, QColor, QTextCursor
-from PySide6.QtWidgets import (QWidget, QVBoxLayout, QTextEdit,
-                               QPushButton, QHBoxLayout)
+import time
 
+from PySide6.QtCore import QTimer, Qt, QAbstractListModel, QModelIndex
+from PySide6.QtGui import QColor, QFont
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QListView, QPushButton, QHBoxLayout, QComboBox, QLineEdit,
+                               QAbstractItemView, QLabel)
+
+from utils.log_store import LogEntry
 from utils.logger import Logger
 
+# 级别过滤：显示该级别及以上的日志
+LEVEL_ORDER = {'TRACE': 0, 'DEBUG': 1, 'INFO': 2, 'SUCCESS': 3, 'WARNING': 4, 'ERROR': 5, 'CRITICAL': 6}
+
+
+class LogModel(QAbstractListModel):
+    """日志列表模型，只为可见的行生成显示内容，行数不超过 max_rows"""
+
+    def __init__(self, colors, max_rows, parent=None):
+        """
+        Args:
+            colors: 级别名称 -> QColor
+            max_rows: 最多保留的行数，超出时丢弃最旧的行
+        """
+        super().__init__(parent)
+        self.colors = colors
+        self.max_rows = max_rows
+        self._rows = []  # [(LogEntry, 格式化后的文本)]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        entry, text = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            return text
+        if role == Qt.ForegroundRole:
+            return self.colors.get(entry.level, self.colors['default'])
+        return None
+
+    @staticmethod
+    def format(entry):
+        """格式化一条日志"""
+        time_str = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry.time))
+        return f"{time_str} | {entry.level:8} | {entry.message}"
+
+    def append(self, entries):
+        """一次追加一批日志，超出上限时一次删除最旧的行"""
+        if not entries:
+            return
+        entries = entries[-self.max_rows:]
+
+        excess = len(self._rows) + len(entries) - self.max_rows
+        if excess > 0:
+            self.beginRemoveRows(QModelIndex(), 0, excess - 1)
+            del self._rows[:excess]
+            self.endRemoveRows()
+
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(entries) - 1)
+        self._rows.extend((entry, self.format(entry)) for entry in entries)
+        self.endInsertRows()
+
+    def reset(self, entries):
+        """替换全部日志"""
+        self.beginResetModel()
+        self._rows = [(entry, self.format(entry)) for entry in entries[-self.max_rows:]]
+        self.endResetModel()
+
 
 class LogTab(QWidget):
+    REFRESH_INTERVAL = 500  # 刷新间隔（毫秒）
+
     def __init__(self, config):
         super().__init__()
         self.config = config
         self.logger = Logger()
+        self._last_seq = 0  # 已读取的最后一条日志的序号
+        self._writer_stats = None  # 最近一次显示的日志写入统计
 
         # 添加初始测试日志
         self.logger.info("日志系统初始化成功")
         self.logger.debug("调试模式已启用")
 
-        self.setup_ui()
-
-        # 定时刷新日志
-        self.refresh_timer = QTimer(self)
-        self.refresh_timer.timeout.connect(self.refresh_log)
-        self.refresh_timer.start(500)  # 每500ms刷新一次
-
         # 设置日志颜色
         self.log_formats = {
             'INFO': QColor("#2ecc71"),  # 绿色
             'WARNING': QColor("#f1c40f"),  # 黄色
             'ERROR': QColor("#e74c3c"),  # 红色
             'DEBUG': QColor("#3498db"),  # 蓝色
-            'timestamp': QColor("#95a5a6"),  # 灰色
+            'default': QColor("#2f3542"),
         }
 
+        self.setup_ui()
+
+        # 定时刷新日志
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh_log)
+        self.refresh_timer.start(self.REFRESH_INTERVAL)
+
         # 立即刷新一次日志
         self.refresh_log()
 
@@ -40,10 +107,38 @@ class LogTab(QWidget):
         layout.setContentsMargins(20, 20, 20, 20)
         layout.setSpacing(20)
 
-        # 日志显示区域
-        self.log_text = QTextEdit()
-        self.log_text.setObjectName("logText")
-        self.log_text.setReadOnly(True)
+        # 过滤区域
+        filter_layout = QHBoxLayout()
+        filter_layout.setContentsMargins(0, 0, 0, 0)
+
+        self.level_combo = QComboBox()
+        self.level_combo.setObjectName("configCombo")
+        self.level_combo.setFixedHeight(32)
+        for label, level in [("全部级别", 'TRACE'), ("调试及以上", 'DEBUG'), ("信息及以上", 'INFO'),
+                             ("警告及以上", 'WARNING'), ("仅错误", 'ERROR')]:
+            self.level_combo.addItem(label, level)
+        self.level_combo.currentIndexChanged.connect(self.apply_filter)
+
+        self.search_input = QLineEdit()
+        self.search_input.setObjectName("configInput")
+        self.search_input.setFixedHeight(32)
+        self.search_input.setPlaceholderText("搜索日志内容")
+        self.search_input.textChanged.connect(self.apply_filter)
+
+        filter_layout.addWidget(self.level_combo)
+        filter_layout.addWidget(self.search_input, 1)
+
+        # 日志显示区域：列表视图只绘制可见的行
+        # 显示的行数与日志缓存的容量一致，过滤后从缓存重建时行数不会变少
+        self.log_model = LogModel(self.log_formats, self.logger.get_buffer_capacity(), self)
+        self.log_view = QListView()
+        self.log_view.setObjectName("logText")
+        self.log_view.setModel(self.log_model)
+        self.log_view.setUniformItemSizes(True)
+        self.log_view.setWordWrap(False)
+        self.log_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.log_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.log_view.setFont(QFont("Consolas", 9))
 
         # 按钮区域
         button_layout = QHBoxLayout()
@@ -57,61 +152,72 @@ class LogTab(QWidget):
         self.refresh_btn.setObjectName("primaryButton")
         self.refresh_btn.clicked.connect(self.refresh_log)
 
+        # 日志写入线程的统计，打包后的窗口程序没有控制台，写入失败只能在这里看到
+        self.stats_label = QLabel()
+        self.stats_label.setObjectName("logStatsLabel")
+
+        button_layout.addWidget(self.stats_label)
         button_layout.addStretch()
         button_layout.addWidget(self.refresh_btn)
         button_layout.addWidget(self.clear_btn)
 
-        layout.addWidget(self.log_text)
+        layout.addLayout(filter_layout)
+        layout.addWidget(self.log_view)
         layout.addLayout(button_layout)
 
-    def append_colored_text(self, record):
-        """添加带颜色的文本"""
-        try:
-            # 时间戳
-            time_obj = record['time']
-            time_str = time_obj.strftime('%Y-%m-%d %H:%M:%S')
-            self.append_text(f"{time_str} | ", self.log_formats['timestamp'])
-
-            # 日志级别
-            level = record['level'].name
-            level_color = self.log_formats.get(level, QColor("#2f3542"))
-            self.append_text(f"{level:8} | ", level_color)
-
-            # 消息内容
-            self.append_text(f"{record['message']}\n", level_color)
-        except Exception as e:
-            self.append_text(f"Error formatting log: {str(e)}\n", self.log_formats['ERROR'])
-
-    def append_text(self, text, color):
-        cursor = self.log_text.textCursor()
-        format = QTextCharFormat()
-        format.setForeground(color)
-        cursor.movePosition(QTextCursor.End)
-        cursor.insertText(text, format)
-        self.log_text.setTextCursor(cursor)
+    def _filter(self, entries):
+        """按级别和关键字过滤日志"""
+        min_level = LEVEL_ORDER.get(self.level_combo.currentData(), 0)
+        keyword = self.search_input.text().strip().lower()
+        if min_level == 0 and not keyword:
+            return entries
+        return [entry for entry in entries
+                if LEVEL_ORDER.get(entry.level, 0) >= min_level and (not keyword or keyword in entry.message.lower())]
 
     def refresh_log(self):
-        """刷新日志内容"""
+        """读取新日志并作为一批追加到列表"""
+        self.update_writer_stats()
         try:
-            # 获取当前日志数量
-            current_count = self.log_text.document().lineCount()
-
-            # 获取新日志
-            buffer = self.logger.get_buffer()
-
-            # 如果有新日志，添加到显示区域
-            if len(buffer) > current_count - 1:  # -1 因为空文档的行数是1
-                for record in buffer[current_count - 1:]:
-                    self.append_colored_text(record)
-
-                # 滚动到底部
-                scrollbar = self.log_text.verticalScrollBar()
-                scrollbar.setValue(scrollbar.maximum())
+            entries = self.logger.read_since(self._last_seq)
+            if not entries:
+                return
+            self._last_seq = entries[-1].seq
+
+            # 用户正在查看旧日志时不自动滚动
+            scrollbar = self.log_view.verticalScrollBar()
+            at_bottom = scrollbar.value() >= scrollbar.maximum()
+
+            self.log_model.append(self._filter(entries))
+            if at_bottom:
+                self.log_view.scrollToBottom()
         except Exception as e:
-            self.append_text(f"Error refreshing log: {str(e)}\n", self.log_formats['ERROR'])
+            # 直接显示在列表中，不写入日志，避免每次刷新失败又产生新的日志
+            self.log_model.append([LogEntry(self._last_seq, time.time(), 'ERROR', f"刷新日志失败: {str(e)}")])
+
+    def update_writer_stats(self):
+        """显示日志写入的条数、丢弃条数和失败次数，统计未变化时不更新"""
+        stats = self.logger.get_writer_stats()
+        stats = (stats.get('written', 0), stats.get('dropped', 0), stats.get('errors', 0)) if stats else None
+        if stats == self._writer_stats:
+            return
+        self._writer_stats = stats
+        if stats is None:
+            self.stats_label.clear()
+            return
+        written, dropped, errors = stats
+        self.stats_label.setText(f"已写入 {written} 条，丢弃 {dropped} 条，写入失败 {errors} 次")
+        self.stats_label.setStyleSheet("color: #e74c3c;" if dropped or errors else "")
+
+    def apply_filter(self):
+        """过滤条件变化，在内存日志中重新筛选"""
+        entries = self.logger.read_since(0)
+        if entries:
+            self._last_seq = entries[-1].seq
+        self.log_model.reset(self._filter(entries))
+        self.log_view.scrollToBottom()
 
     def clear_log(self):
         """清除日志"""
-        self.log_text.clear()
         self.logger.clear_buffer()
+        self.log_model.reset([])
         self.logger.info("日志已清除")
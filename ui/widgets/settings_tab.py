@@ -75,7 +75,11 @@ class SettingsTab(QWidget):
             'startup': self.startup_checkbox.isChecked()
         }
 
-        self.config.save_settings(settings)
+        try:
+            self.config.save_settings(settings)
+        except Exception as e:
+            self.main_window.show_message(f"保存设置失败: {str(e)}", "error")
+            return
         self.load_config()
 
         if self.main_window and hasattr(self.main_window, 'status_tab'):
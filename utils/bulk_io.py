@@ -0,0 +1,313 @@
+"""
+@Project ：DDNS
+@File    ：bulk_io.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+批量导入导出DNS记录：逐行读取 CSV / JSONL 并按平台的 CONFIG_FIELDS 校验，
+按凭据批量确认域名，全部记录一次写入配置。
+命令行用法：python -m utils.bulk_io import records.csv [--no-verify]
+          python -m utils.bulk_io export records.jsonl
+          python -m utils.bulk_io export-json config.json（SQLite存储模式下导出配置）
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dns_platforms import CAP_ZONE_LISTING, PLATFORM_MAPPING, get_platform_class, has_capability
+from dns_platforms.base import SCHEDULE_FIELDS
+from utils.logger import Logger
+from utils.record_store import RecordStore, make_key
+
+RECORD_TYPES = ('A', 'AAAA')
+BASE_COLUMNS = ['platform', 'hostname', 'domain', 'record_type']
+MAX_RESOLVERS = 8  # 同时获取域名列表的凭据数量上限
+
+
+class ImportReport:
+    """导入结果，错误按行号记录"""
+
+    def __init__(self):
+        self.total = 0  # 读取的行数
+        self.added = 0
+        self.updated = 0
+        self.errors = []  # [(行号, 错误信息)]
+        self.elapsed = 0.0
+
+    @property
+    def imported(self):
+        return self.added + self.updated
+
+    def error(self, line_no, message):
+        self.errors.append((line_no, message))
+
+    def summary(self):
+        """结果摘要"""
+        return (f"共 {self.total} 行，新增 {self.added} 条，更新 {self.updated} 条，"
+                f"失败 {len(self.errors)} 行，耗时 {self.elapsed:.1f} 秒")
+
+
+def iter_rows(path):
+    """
+    逐行读取 CSV 或 JSONL 文件，不一次性载入内存
+    Args:
+        path: 文件路径，按扩展名区分格式（.csv / .jsonl / .ndjson）
+    Yields:
+        tuple: (行号, 字段字典)，无法解析的行字段字典为None
+    """
+    if path.lower().endswith('.csv'):
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, {key: value for key, value in row.items() if key}
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_no, row if isinstance(row, dict) else None
+
+
+def validate_row(row):
+    """
+    按平台的 CONFIG_FIELDS 校验并规范化一行记录
+    Args:
+        row: 字段字典
+    Returns:
+        tuple: (平台标识, 记录配置)
+    Raises:
+        ValueError: 校验失败，异常信息说明原因
+    """
+    platform = str(row.get('platform') or '').strip()
+    platform_name = PLATFORM_MAPPING.get(platform, platform)  # 同时接受显示名称和平台标识
+    platform_class = get_platform_class(platform_name)
+    if not platform_class:
+        raise ValueError(f"不支持的DNS平台: {platform or '（空）'}")
+
+    record_type = str(row.get('record_type') or 'A').strip().upper()
+    if record_type not in RECORD_TYPES:
+        raise ValueError(f"不支持的记录类型: {record_type}")
+
+    record = {'hostname': str(row.get('hostname') or '').strip() or '@', 'record_type': record_type}
+    for field_name, field_config in platform_class.CONFIG_FIELDS.items():
+        if field_name == 'hostname':
+            continue
+        value = row.get(field_name)
+        value = '' if value is None else str(value).strip()
+        if value:
+            record[field_name] = value
+        elif field_name == 'domain' or not field_config.get('optional'):
+            raise ValueError(f"缺少字段: {field_name}（{field_config['label']}）")
+    record['domain'] = record['domain'].rstrip('.').lower()
+
+    for field_name in SCHEDULE_FIELDS:
+        value = row.get(field_name)
+        if value in (None, ''):
+            continue
+        try:
+            record[field_name] = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{field_name} 必须是整数: {value}")
+
+    # 只允许已知字段，避免拼写错误的列被静默忽略
+    known = set(BASE_COLUMNS) | set(platform_class.CONFIG_FIELDS) | set(SCHEDULE_FIELDS)
+    unknown = [key for key, value in row.items() if key not in known and value not in (None, '')]
+    if unknown:
+        raise ValueError(f"未知字段: {', '.join(unknown)}")
+
+    return platform_name, record
+
+
+def resolve_zones(records, report):
+    """
+    按凭据批量确认域名：每个凭据只获取一次域名列表，域名不在列表中的记录视为错误。
+    获取域名列表失败的凭据不做校验
+    Args:
+        records: {主键: (行号, 平台标识, 记录配置)}，校验失败的记录会被移除
+        report: ImportReport
+    """
+    # 用记录索引的凭据索引分组
+    store = RecordStore()
+    for _, platform_name, record in records.values():
+        store.upsert(platform_name, record)
+    groups = {credential: store.by_credential(*credential) for credential in store.credentials()
+              if has_capability(credential[0], CAP_ZONE_LISTING)}  # (平台标识, 凭据指纹) -> [主键]
+    if not groups:
+        return
+
+    logger = Logger()
+
+    def fetch(group_key):
+        platform_name, _ = group_key
+        _, _, record = records[groups[group_key][0]]
+        try:
+            return group_key, set(get_platform_class(platform_name)(record).get_domains() or ())
+        except Exception as e:
+            logger.error(f"[{platform_name}] - 获取域名列表失败: {str(e)}")
+            return group_key, set()
+
+    with ThreadPoolExecutor(max_workers=min(MAX_RESOLVERS, len(groups))) as executor:
+        domain_lists = dict(executor.map(fetch, groups))
+    for group_key, domains in domain_lists.items():
+        if not domains:
+            logger.warning(f"[{group_key[0]}] - 未获取到域名列表，跳过 {len(groups[group_key])} 条记录的域名校验")
+
+    # 按区域索引逐个区域校验
+    for platform_name, domain in store.zones():
+        for key in store.by_zone(platform_name, domain):
+            domains = domain_lists.get((platform_name, store.fingerprint(key)))
+            if domains and domain not in domains:
+                report.error(records[key][0], f"账号下没有域名: {domain}")
+                del records[key]
+
+
+def prepare_import(path, verify_zones=True):
+    """
+    读取并校验导入文件，不修改配置
+    Args:
+        path: CSV / JSONL 文件路径
+        verify_zones: 是否在线确认域名属于对应账号
+    Returns:
+        tuple: ([(平台标识, 记录配置)], ImportReport)
+    """
+    report = ImportReport()
+    started = time.perf_counter()
+    records = {}  # 主键 -> (行号, 平台标识, 记录配置)
+
+    try:
+        for line_no, row in iter_rows(path):
+            report.total += 1
+            if row is None:
+                report.error(line_no, "无法解析")
+                continue
+            try:
+                platform_name, record = validate_row(row)
+            except ValueError as e:
+                report.error(line_no, str(e))
+                continue
+
+            key = make_key(platform_name, record)
+            if key in records:
+                report.error(line_no, f"与第 {records[key][0]} 行重复")
+                continue
+            records[key] = (line_no, platform_name, record)
+    except Exception as e:
+        report.error(0, f"读取文件失败: {str(e)}")
+
+    if verify_zones:
+        resolve_zones(records, report)
+
+    report.errors.sort()
+    report.elapsed = time.perf_counter() - started
+    return [(platform_name, record) for _, platform_name, record in records.values()], report
+
+
+def commit_import(config, records, report):
+    """
+    一次写入全部记录，已存在的记录被更新
+    Args:
+        config: 配置对象
+        records: [(平台标识, 记录配置)]
+        report: ImportReport，补充新增和更新的数量
+    """
+    started = time.perf_counter()
+    store = config.get_record_store()
+    report.updated = sum(1 for platform_name, record in records if make_key(platform_name, record) in store)
+    report.added = len(records) - report.updated
+    config.upsert_records(records)
+    config.flush()
+    report.elapsed += time.perf_counter() - started
+
+
+def import_records(config, path, verify_zones=True):
+    """
+    导入记录
+    Returns:
+        ImportReport: 导入结果
+    """
+    records, report = prepare_import(path, verify_zones)
+    if records:
+        commit_import(config, records, report)
+    return report
+
+
+def export_records(config, path):
+    """
+    导出全部记录（包括分片中的记录）
+    Args:
+        config: 配置对象
+        path: 导出路径，按扩展名区分 CSV / JSONL
+    Returns:
+        int: 导出的记录数
+    """
+    rows = []
+    for platform_name, records in config.get_platform_configs().items():
+        if not isinstance(records, (list, tuple)):
+            records = [records]
+        for record in records:
+            row = {'platform': platform_name}
+            row.update((key, value) for key, value in record.items() if key != 'platform')
+            rows.append(row)
+
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.csv'):
+            columns = list(BASE_COLUMNS)
+            for row in rows:
+                columns.extend(key for key in row if key not in columns)
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + '\n')
+    os.replace(temp_file, path)
+    return len(rows)
+
+
+def main(argv=None):
+    """命令行入口"""
+    from config import create_config
+
+    parser = argparse.ArgumentParser(prog='python -m utils.bulk_io', description='批量导入导出DNS记录')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    import_parser = subparsers.add_parser('import', help='从 CSV / JSONL 导入记录')
+    import_parser.add_argument('path')
+    import_parser.add_argument('--no-verify', action='store_true', help='不在线确认域名')
+    export_parser = subparsers.add_parser('export', help='导出记录为 CSV / JSONL')
+    export_parser.add_argument('path')
+    export_json_parser = subparsers.add_parser('export-json', help='把SQLite存储的配置导出为 config.json 格式')
+    export_json_parser.add_argument('path')
+    args = parser.parse_args(argv)
+
+    config = create_config()
+    if args.command == 'export-json':
+        if not hasattr(config, 'export_json'):
+            print("当前未使用SQLite存储，配置已是 config.json", file=sys.stderr)
+            return 1
+        return 0 if config.export_json(args.path) else 1
+    if args.command == 'export':
+        print(f"已导出 {export_records(config, args.path)} 条记录到 {args.path}")
+        return 0
+
+    report = import_records(config, args.path, verify_zones=not args.no_verify)
+    for line_no, message in report.errors:
+        print(f"第 {line_no} 行: {message}", file=sys.stderr)
+    print(report.summary())
+    return 1 if report.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+@Project ：DDNS
+@File    ：config_diff.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+配置差异：比较两份配置，得出新增、删除、修改的记录和变化的设置，用于热加载；
+合并本程序与其他程序对同一配置文件的修改
+"""
+
+import time
+from collections.abc import Mapping
+
+_MISSING = object()  # 合并时表示配置项不存在
+
+
+def record_platform_key(platform_name, record):
+    """
+    记录在运行时使用的标识，与 DNSInitThread 生成的 platform_key 一致
+    Args:
+        platform_name: 平台标识
+        record: 记录配置
+    Returns:
+        str: platform_key
+    """
+    hostname = record.get('hostname', '@')
+    domain = record.get('domain', 'unknown')
+    full_domain = f"{hostname}.{domain}" if hostname != '@' else domain
+    return f"{platform_name}_{full_domain}_{record.get('record_type', 'A')}"
+
+
+def iter_records(config):
+    """
+    遍历配置中的所有记录
+    Args:
+        config: 完整配置
+    Yields:
+        tuple: (platform_key, 平台标识, 记录配置)
+    """
+    for platform_name, records in (config or {}).get('platforms', {}).items():
+        if not isinstance(records, (list, tuple)):
+            records = [records]
+        for record in records:
+            yield record_platform_key(platform_name, record), platform_name, record
+
+
+class ConfigDiff:
+    """两份配置之间的差异"""
+
+    def __init__(self, modified_at=None):
+        """
+        Args:
+            modified_at: 配置文件的修改时间（time.time()），用于统计生效耗时
+        """
+        self.added = {}  # platform_key -> (平台标识, 记录配置)
+        self.removed = set()  # platform_key
+        self.changed = {}  # platform_key -> (平台标识, 新的记录配置)
+        self.settings = {}  # 设置项 -> (旧值, 新值)
+        self.modified_at = modified_at or time.time()
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed or self.settings)
+
+    @property
+    def records_changed(self):
+        """记录是否有变化"""
+        return bool(self.added or self.removed or self.changed)
+
+    def latency(self):
+        """从文件修改到现在的耗时（秒）"""
+        return max(0.0, time.time() - self.modified_at)
+
+    def summary(self):
+        """差异摘要，用于日志"""
+        parts = [f"新增 {len(self.added)} 条", f"删除 {len(self.removed)} 条", f"修改 {len(self.changed)} 条记录"]
+        if self.settings:
+            parts.append(f"设置变化: {', '.join(self.settings)}")
+        return '，'.join(parts)
+
+
+def diff_configs(old, new, modified_at=None):
+    """
+    比较两份配置
+    Args:
+        old: 旧配置
+        new: 新配置
+        modified_at: 新配置文件的修改时间
+    Returns:
+        ConfigDiff: 差异
+    """
+    diff = ConfigDiff(modified_at)
+    old_records = {key: record for key, _, record in iter_records(old)}
+
+    for platform_key, platform_name, record in iter_records(new):
+        old_record = old_records.pop(platform_key, None)
+        if old_record is None:
+            diff.added[platform_key] = (platform_name, record)
+        elif old_record != record:
+            diff.changed[platform_key] = (platform_name, record)
+    diff.removed.update(old_records)
+
+    old_settings = (old or {}).get('settings', {})
+    new_settings = (new or {}).get('settings', {})
+    for name in set(old_settings) | set(new_settings):
+        if old_settings.get(name) != new_settings.get(name):
+            diff.settings[name] = (old_settings.get(name), new_settings.get(name))
+
+    return diff
+
+
+def _thaw(value):
+    """把只读快照转换回 dict / list，便于与普通配置比较"""
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def merge_configs(base, ours, theirs):
+    """
+    三方合并：以共同的基础版本为准，分别合并双方对记录、设置和其他顶层字段的修改。
+    记录按 platform_key 合并，设置按名称合并；双方修改了同一项且结果不同时视为冲突
+    Args:
+        base: 双方共同的基础版本，为None时视为空配置
+        ours: 本程序的配置
+        theirs: 其他程序写入的配置
+    Returns:
+        tuple: (合并后的配置, 冲突项列表)，有冲突时合并结果不可用
+    """
+    base, ours, theirs = _thaw(base) or {}, _thaw(ours) or {}, _thaw(theirs) or {}
+    conflicts = []
+
+    def pick(name, base_value, our_value, their_value):
+        if our_value == base_value:
+            return their_value
+        if their_value == base_value or their_value == our_value:
+            return our_value
+        conflicts.append(name)
+        return our_value
+
+    merged = {}
+    for name in list(theirs) + [name for name in ours if name not in theirs]:
+        if name in ('platforms', 'settings'):
+            continue
+        value = pick(name, base.get(name, _MISSING), ours.get(name, _MISSING), theirs.get(name, _MISSING))
+        if value is not _MISSING:
+            merged[name] = value
+
+    settings = {}
+    base_settings, our_settings, their_settings = (base.get('settings', {}), ours.get('settings', {}),
+                                                   theirs.get('settings', {}))
+    for name in list(their_settings) + [name for name in our_settings if name not in their_settings]:
+        value = pick(f"settings.{name}", base_settings.get(name, _MISSING), our_settings.get(name, _MISSING),
+                     their_settings.get(name, _MISSING))
+        if value is not _MISSING:
+            settings[name] = value
+    merged['settings'] = settings
+
+    # 记录按对方文件中的顺序排列，本程序新增的记录排在最后
+    base_records, our_records, their_records = ({key: (name, record) for key, name, record in iter_records(config)}
+                                                for config in (base, ours, theirs))
+    platforms = {}
+    for key in list(their_records) + [key for key in our_records if key not in their_records]:
+        value = pick(key, base_records.get(key, _MISSING), our_records.get(key, _MISSING),
+                     their_records.get(key, _MISSING))
+        if value is not _MISSING:
+            platform_name, record = value
+            platforms.setdefault(platform_name, []).append(record)
+    merged['platforms'] = platforms
+
+    return merged, conflicts
@@ -0,0 +1,28 @@
+"""
+@Project ：DDNS
+@File    ：config_reloader.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+配置热加载：把文件监视线程中的配置变化转发到主线程
+"""
+
+from PySide6.QtCore import QObject, Signal
+
+
+class ConfigReloader(QObject):
+    """在主线程中创建，配置文件被外部修改后发出 config_changed 信号"""
+
+    config_changed = Signal(object)  # ConfigDiff
+
+    def __init__(self, config, parent=None):
+        """
+        Args:
+            config: 配置对象
+            parent: 父对象
+        """
+        super().__init__(parent)
+        self.config = config
+        # 信号由监视线程发出，以队列方式投递到主线程中的接收者
+        config.add_listener(self.config_changed.emit)
@@ -0,0 +1,150 @@
+"""
+@Project ：DDNS
+@File    ：config_shards.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+分片配置：config.json 的 include 字段可引用记录文件或目录（例如每个区域或团队一个文件），
+每个文件格式与 config.json 相同，只读取其中的 platforms。
+重新加载时只解析修改过的文件，合并结果按文件增量维护
+"""
+
+import json
+import os
+
+from utils.file_watcher import file_signature
+from utils.logger import Logger
+from utils.record_store import make_key
+
+
+class ConfigShards:
+    """分片文件的缓存与合并视图，非线程安全，由 Config 在锁内调用"""
+
+    def __init__(self, transform=None):
+        """
+        Args:
+            transform: 解析后对每条记录调用的转换，例如转为只读，只在文件变化时执行
+        """
+        self.logger = Logger()
+        self.transform = transform
+        self._files = {}  # 文件路径 -> (文件状态签名, {主键: (平台标识, 记录配置)})
+        self._merged = {}  # 主键 -> (平台标识, 记录配置, 来源文件)
+        self.version = 0  # 合并结果每变化一次加一
+
+    def refresh(self, base_dir, includes):
+        """
+        检查分片文件，只重新解析状态签名变化的文件
+        Args:
+            base_dir: 相对路径的基准目录（config.json 所在目录）
+            includes: include 字段，文件或目录路径列表
+        Returns:
+            bool: 合并结果是否变化
+        """
+        paths = self._expand(base_dir, includes)
+        changed = False
+
+        for path in [path for path in self._files if path not in paths]:
+            self._unmerge(path)
+            del self._files[path]
+            changed = True
+
+        for path in paths:
+            signature = file_signature(path)
+            cached = self._files.get(path)
+            if cached and cached[0] == signature:
+                continue
+
+            records = self._parse(path)
+            if records is None:
+                # 解析失败时保留上一次的内容，并记下失败文件的签名，文件再次修改前不重复解析
+                self._files[path] = (signature, cached[1] if cached else {})
+                continue
+            if cached:
+                self._unmerge(path)
+            self._files[path] = (signature, records)
+            self._merge(path, records)
+            changed = True
+
+        if changed:
+            self.version += 1
+        return changed
+
+    def records(self):
+        """
+        遍历合并后的记录
+        Yields:
+            tuple: (主键, 平台标识, 记录配置)
+        """
+        for key, (platform_name, record, _) in self._merged.items():
+            yield key, platform_name, record
+
+    def __len__(self):
+        return len(self._merged)
+
+    @staticmethod
+    def _expand(base_dir, includes):
+        """展开 include 字段为有序的文件列表，目录按文件名排序取其中的 .json 文件"""
+        if isinstance(includes, str):
+            includes = [includes]
+
+        paths = []
+        for include in includes or ():
+            path = os.path.normpath(os.path.join(base_dir, include))
+            if os.path.isdir(path):
+                paths.extend(os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith('.json'))
+            elif os.path.isfile(path):
+                paths.append(path)
+        return paths
+
+    def _parse(self, path):
+        """
+        解析分片文件
+        Returns:
+            dict: 主键 -> (平台标识, 记录配置)，失败返回None
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            self.logger.error(f"加载配置分片失败: {path} - {str(e)}")
+            return None
+
+        platforms = data.get('platforms', {}) if isinstance(data, dict) else None
+        if not isinstance(platforms, dict):
+            self.logger.error(f"加载配置分片失败: {path} - 格式错误，应为包含 platforms 对象的 JSON 对象")
+            return None
+
+        records = {}
+        for platform_name, platform_records in platforms.items():
+            if not isinstance(platform_records, list):
+                platform_records = [platform_records]
+            for record in platform_records:
+                if not isinstance(record, dict):
+                    self.logger.error(f"配置分片中的记录格式错误，已忽略: {path} - {platform_name}")
+                    continue
+                key = make_key(platform_name, record)
+                records[key] = (platform_name, self.transform(record) if self.transform else record)
+        return records
+
+    def _merge(self, path, records):
+        """把文件中的记录加入合并结果，已存在的记录保留先加载的文件中的版本"""
+        for key, (platform_name, record) in records.items():
+            owner = self._merged.get(key)
+            if owner and owner[2] != path:
+                self.logger.warning(f"配置分片中的记录重复，已忽略: {path} - {key}")
+                continue
+            self._merged[key] = (platform_name, record, path)
+
+    def _unmerge(self, path):
+        """从合并结果中移除文件中的记录，其他文件中的同名记录补上"""
+        _, records = self._files.get(path, (None, {}))
+        for key in records:
+            owner = self._merged.get(key)
+            if not owner or owner[2] != path:
+                continue
+            del self._merged[key]
+            for other_path, (_, other_records) in self._files.items():
+                if other_path != path and key in other_records:
+                    self._merged[key] = (*other_records[key], other_path)
+                    break
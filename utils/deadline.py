@@ -0,0 +1,114 @@
+"""
+@Project ：DDNS
+@File    ：deadline.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+截止时间：每轮更新创建一个截止时间，绑定到执行线程后，所有网络请求都以剩余时间作为超时
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class DeadlineExceeded(Exception):
+    """时间预算已用完或已被取消"""
+    pass
+
+
+class Deadline:
+    """一次操作的截止时间，可跨线程共享，取消后所有使用者立即停止发起新请求"""
+
+    def __init__(self, seconds, name=''):
+        """
+        Args:
+            seconds: 时间预算（秒）
+            name: 名称，用于日志
+        """
+        self.seconds = seconds
+        self.name = name
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + seconds
+        self._cancelled = False
+
+    def remaining(self):
+        """剩余时间（秒），已取消返回0"""
+        if self._cancelled:
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self):
+        """已用时间（秒）"""
+        return time.monotonic() - self.started_at
+
+    def expired(self):
+        """是否已超时或已取消"""
+        return self.remaining() <= 0
+
+    def cancel(self):
+        """取消，尚未发起的请求将直接失败"""
+        self._cancelled = True
+
+    def check(self):
+        """已超时或已取消时抛出 DeadlineExceeded"""
+        if self.expired():
+            reason = '已取消' if self._cancelled else '已超时'
+            raise DeadlineExceeded(f"{self.name or '操作'}{reason}（预算 {self.seconds} 秒）")
+
+    def timeout(self, cap=None):
+        """
+        计算单次请求的超时时间
+        Args:
+            cap: 单次请求的超时上限（秒）
+        Returns:
+            float: 剩余时间与上限中的较小值
+        Raises:
+            DeadlineExceeded: 预算已用完
+        """
+        self.check()
+        remaining = self.remaining()
+        return min(remaining, cap) if cap else remaining
+
+
+def current():
+    """获取当前线程绑定的截止时间，未绑定返回None"""
+    return getattr(_local, 'deadline', None)
+
+
+@contextmanager
+def scope(deadline):
+    """
+    在当前线程中绑定截止时间，退出时恢复原绑定
+    Args:
+        deadline: Deadline 实例，为None时不限制
+    """
+    previous = current()
+    _local.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _local.deadline = previous
+
+
+def get_timeout(default):
+    """
+    获取当前线程中单次请求应使用的超时时间
+    Args:
+        default: 未绑定截止时间时的默认超时（秒），同时作为上限
+    Returns:
+        float: 超时时间（秒）
+    Raises:
+        DeadlineExceeded: 预算已用完
+    """
+    deadline = current()
+    return deadline.timeout(default) if deadline else default
+
+
+def expired():
+    """当前线程绑定的截止时间是否已到"""
+    deadline = current()
+    return bool(deadline and deadline.expired())
@@ -6,16 +6,47 @@
 @Date    ：2023/12/02
 """
 
+import heapq
+import itertools
+import time
+from collections import deque
+
 from PySide6.QtCore import QObject, QTimer
 
+from utils.config_diff import iter_records
+from utils.deadline import Deadline
 from utils.ip_checker import IPChecker
 from utils.logger import Logger
-from utils.threads import ThreadManager, DNSInitThread, IPCheckThread, DNSUpdateThread
+from utils.reconciler import Reconciler
+from utils.scheduler import PRIORITY_NORMAL, RecordScheduler
+from utils.threads import ThreadManager, DNSInitThread, DNSWarmUpThread, IPFamilyCheckThread, DNSPlanThread
+
+
+def _once(callback):
+    """
+    包装线程结束回调，只执行一次。
+    BaseThread 在 run 中发出的 finished 与 QThread 自身的 finished 是同一个信号，每个线程会触发两次，
+    直接用于计数会使计数提前归零
+    """
+    called = []
+
+    def wrapper():
+        if not called:
+            called.append(True)
+            callback()
+
+    return wrapper
 
 
 class DNSUpdater(QObject):
     """DNS更新器，管理所有DNS平台的更新操作"""
 
+    WARM_UP_TIMEOUT = 30  # 预热期限（秒），超时的记录不再等待，改为首次更新时按需发现
+    CYCLE_BUDGET = 60  # 每轮更新的时间预算（秒），不超过更新间隔
+    MIN_INTERVAL = 30  # 最小更新间隔（秒）
+    MAX_WORKERS = 8  # 同时执行的计划组数量上限
+    WARM_UP_WORKERS = MAX_WORKERS  # 同时执行的预热线程数量上限
+
     def __init__(self, config, main_window=None):
         """
         初始化DNS更新器
@@ -28,10 +59,23 @@ class DNSUpdater(QObject):
         self.main_window = main_window
         self.logger = Logger()
         self.platforms = {}  # 存储所有DNS平台实例
-        self._timer = None  # 定时器
+        self._warming = {}  # 预热中的平台实例，platform_key -> 平台实例
+        self._warm_up_queue = deque()  # 等待预热的记录 (platform_key, 平台实例, 截止时间)
+        self._active_warm_ups = 0  # 正在执行的预热线程数量
+        self._last_ips = None  # 最近一次检查到的 (ipv4, ipv6)，供预热完成的记录立即更新
+        self._outstanding = {}  # 截止时间 -> 尚未结束的线程数
+        self._plan_queue = []  # 待执行的计划组，最小堆 (优先级, -预估耗时, 序号, 计划组, 截止时间)
+        self._plan_counter = itertools.count()
+        self._active_plans = 0  # 正在执行的计划组数量
+        self._change_events = {}  # IP变化所在轮次的截止时间 -> (开始时间, 记录数)
+        self._timer = None  # IP检查定时器，间隔取全局间隔和各记录间隔中的最小值
+        self._tick_timer = None  # 调度定时器，在最近一条记录到期时触发
         self._running = False
         self._update_interval = config.get_update_interval()  # 更新间隔（秒）
         self.ip_checker = IPChecker()
+        self.reconciler = Reconciler(config)
+        self.scheduler = RecordScheduler()
+        self._ip_check_interval = self._update_interval
         self._thread_manager = ThreadManager.instance()
 
     def start(self):
@@ -45,7 +89,13 @@ class DNSUpdater(QObject):
         if not self._timer:
             self._timer = QTimer(self)
             self._timer.timeout.connect(self.check_and_update)
-            self._timer.start(self._update_interval * 1000)
+            self._timer.start(self._ip_check_interval * 1000)
+
+        if not self._tick_timer:
+            self._tick_timer = QTimer(self)
+            self._tick_timer.setSingleShot(True)
+            self._tick_timer.timeout.connect(self._on_tick)
+        self._arm_tick()
 
     def set_update_interval(self, seconds):
         """
@@ -60,65 +110,395 @@ class DNSUpdater(QObject):
             self.config.save_config(config_data)
 
             # 更新运行时间隔
-            self._update_interval = max(30, seconds)  # 最小30秒
+            self._update_interval = max(self.MIN_INTERVAL, seconds)  # 最小30秒
 
-            # 重启定时器
-            if self._timer and self._running:
-                self._timer.stop()  # 先停止当前定时器
-                self._timer.setInterval(self._update_interval * 1000)  # 设置新间隔
-                self._timer.start()  # 重新启动定时器
+            # 未单独设置间隔的记录跟随全局间隔，并重启定时器
+            self._sync_schedule(force_timer=True)
 
         except Exception as e:
             self.logger.error(f"更新间隔设置失败: {str(e)}")
 
     def reload_platforms(self):
-        """重新加载DNS平台"""
-        self.platforms.clear()
-
-        init_thread = DNSInitThread(self.config)
+        """重新加载DNS平台，配置未变化的记录复用已有实例，只构造新增或修改的记录"""
+        init_thread = DNSInitThread(self.config, self.platforms)
         init_thread.success.connect(self._on_reload_finished)
         init_thread.error.connect(lambda e: self.logger.error(f"重新加载平台失败: {e}"))
         self._thread_manager.submit_thread(init_thread)
 
     def _on_reload_finished(self, new_platforms):
-        """平台重新加载完成"""
+        """平台重新加载完成，只预热新建的记录，先就绪的记录先更新"""
+        old_instances = {id(platform) for platform in self.platforms.values()}
+        created = {key: platform for key, platform in new_platforms.items() if id(platform) not in old_instances}
+
+        # 已移除的记录不再等待预热结果
+        for platform_key in list(self._warming):
+            if new_platforms.get(platform_key) is not self._warming[platform_key]:
+                del self._warming[platform_key]
+
         self.platforms = new_platforms
-        self.logger.info(f"DNS平台配置已加载，共 {len(new_platforms)} 个记录")
-        QTimer.singleShot(100, self.check_and_update)
+        self.reconciler.prune(new_platforms)
+        self._sync_schedule()
+        self.logger.info(f"DNS平台配置已加载，共 {len(new_platforms)} 个记录，新建 {len(created)} 个")
+        self._start_warm_up(created)
+
+        # 首次加载时立即检查IP；之后新建的记录在预热完成后使用最近一次的IP更新
+        if self._last_ips is None:
+            QTimer.singleShot(100, self.check_and_update)
+
+    def apply_config_diff(self, diff):
+        """
+        应用配置文件的外部修改（热加载）：只处理有变化的记录和设置，不重新加载全部平台
+        Args:
+            diff: ConfigDiff
+        """
+        added = dict(diff.added)
+
+        for platform_key in diff.removed:
+            self.platforms.pop(platform_key, None)
+            self._warming.pop(platform_key, None)
+
+        for platform_key, (platform_name, record) in diff.changed.items():
+            platform = self.platforms.get(platform_key)
+            # 只修改了调度设置时沿用已有实例，凭据或记录变化时重新构造
+            if platform and type(platform).record_key(record) == platform.get_record_key():
+                platform.config = record
+            else:
+                self.platforms.pop(platform_key, None)
+                self._warming.pop(platform_key, None)
+                added[platform_key] = (platform_name, record)
+
+        update_interval = diff.settings.get('update_interval')
+        if update_interval:
+            try:
+                self._update_interval = max(self.MIN_INTERVAL, int(update_interval[1]))
+            except (TypeError, ValueError):
+                self.logger.warning(f"无效的更新间隔: {update_interval[1]}")
+
+        self.reconciler.prune(self.platforms)
+        self._sync_schedule(force_timer=bool(update_interval))
+
+        if not added:
+            self.logger.info(f"配置热加载已生效，耗时 {diff.latency() * 1000:.0f} 毫秒")
+            return
+
+        records = {}
+        for platform_name, record in added.values():
+            records.setdefault(platform_name, []).append(record)
+        init_thread = DNSInitThread(self.config, records=records)
+        init_thread.success.connect(lambda created: self._on_records_created(created, diff))
+        init_thread.error.connect(lambda e: self.logger.error(f"热加载记录失败: {e}"))
+        self._thread_manager.submit_thread(init_thread)
+
+    def _on_records_created(self, created, diff):
+        """热加载新增的记录构造完成，加入调度并预热"""
+        # 构造期间记录可能又被删除
+        current = {platform_key for platform_key, _, _ in iter_records(self.config.get_snapshot())}
+        created = {key: platform for key, platform in created.items() if key in current}
+        self.platforms.update(created)
+        self._sync_schedule()
+        self._start_warm_up(created)
+        self.logger.info(f"配置热加载已生效，新建 {len(created)} 个记录，耗时 {diff.latency() * 1000:.0f} 毫秒")
+
+    def _start_warm_up(self, platforms):
+        """
+        预热记录：加入预热队列，最多 WARM_UP_WORKERS 个线程并行执行，
+        超过 WARM_UP_TIMEOUT 仍未完成的记录不再等待
+        Args:
+            platforms: 需要预热的平台实例，platform_key -> 平台实例
+        """
+        if not platforms:
+            return
+        self._warming.update(platforms)
+        warm_up_deadline = Deadline(self.WARM_UP_TIMEOUT, '预热')
+
+        self._warm_up_queue.extend((key, platform, warm_up_deadline) for key, platform in platforms.items())
+        self._dispatch_warm_ups()
+
+        QTimer.singleShot(self.WARM_UP_TIMEOUT * 1000, lambda: self._on_warm_up_timeout(platforms, warm_up_deadline))
+
+    def _dispatch_warm_ups(self):
+        """在预热线程数上限内启动队列中的预热任务"""
+        while self._warm_up_queue and self._active_warm_ups < self.WARM_UP_WORKERS:
+            platform_key, platform, warm_up_deadline = self._warm_up_queue.popleft()
+
+            # 排队期间记录已移除、已重新加载或已超时，不再预热
+            if self._warming.get(platform_key) is not platform or warm_up_deadline.expired():
+                continue
+
+            self._active_warm_ups += 1
+            warm_up_thread = DNSWarmUpThread(platform_key, platform, warm_up_deadline)
+            warm_up_thread.success.connect(self._on_platform_warmed)
+            warm_up_thread.error.connect(
+                lambda e, k=platform_key, p=platform: self._on_platform_warmed((k, p, False)))
+            warm_up_thread.finished.connect(_once(self._on_warm_up_done))
+            self._thread_manager.submit_thread(warm_up_thread)
+
+    def _on_warm_up_done(self):
+        """预热线程结束，释放名额并启动下一个"""
+        self._active_warm_ups -= 1
+        self._dispatch_warm_ups()
+
+    def _on_platform_warmed(self, result):
+        """单条记录预热完成，若本轮IP已获取则立即更新该记录"""
+        platform_key, platform, ready = result
+        # 预热期间配置已重新加载或已超时，丢弃结果
+        if self._warming.get(platform_key) is not platform:
+            return
+
+        del self._warming[platform_key]
+        if not ready:
+            self.logger.warning(f"{platform.get_platform_key()} - 预热未完成，将在更新时重新获取元数据")
+
+        if self._running and self._last_ips:
+            self._update_platforms({platform_key: platform}, *self._last_ips)
+
+    def _on_warm_up_timeout(self, platforms, warm_up_deadline):
+        """预热超时，取消本批中尚未完成的请求，剩余记录不再等待，直接参与更新"""
+        warm_up_deadline.cancel()
+        pending = {key: platform for key, platform in platforms.items() if self._warming.get(key) is platform}
+        if not pending:
+            return
+
+        for platform_key in pending:
+            del self._warming[platform_key]
+        self.logger.warning(f"{len(pending)} 个记录预热超时（{self.WARM_UP_TIMEOUT} 秒），将在更新时重新获取元数据")
+
+        if self._running and self._last_ips:
+            self._update_platforms(pending, *self._last_ips)
+
+    def _new_deadline(self, name):
+        """
+        创建一轮更新的截止时间，预算用完时取消尚未完成的请求
+        Args:
+            name: 名称，用于日志
+        Returns:
+            Deadline: 截止时间
+        """
+        cycle_deadline = Deadline(min(self.CYCLE_BUDGET, self._update_interval), name)
+        QTimer.singleShot(int(cycle_deadline.seconds * 1000), lambda: self._on_deadline_reached(cycle_deadline))
+        return cycle_deadline
+
+    def _submit(self, thread, cycle_deadline):
+        """提交受截止时间约束的线程，并统计尚未结束的线程数"""
+        self._outstanding[cycle_deadline] = self._outstanding.get(cycle_deadline, 0) + 1
+        thread.finished.connect(_once(lambda: self._on_thread_done(cycle_deadline)))
+        self._thread_manager.submit_thread(thread)
+
+    def _enqueue_plan(self, group, cycle_deadline):
+        """计划组加入待执行队列，队列按优先级和预估耗时排序"""
+        self._outstanding[cycle_deadline] = self._outstanding.get(cycle_deadline, 0) + 1
+        heapq.heappush(self._plan_queue,
+                       (group.priority, -group.expected, next(self._plan_counter), group, cycle_deadline))
+
+    def _dispatch_plans(self):
+        """在工作线程数上限内启动队列中的计划组"""
+        while self._plan_queue and self._active_plans < self.MAX_WORKERS:
+            _, _, _, group, cycle_deadline = heapq.heappop(self._plan_queue)
+
+            # 排队期间时间预算已用完，直接放弃
+            if cycle_deadline.expired():
+                self.reconciler.skip(group)
+                self._on_thread_done(cycle_deadline)
+                continue
+
+            self._active_plans += 1
+            plan_thread = DNSPlanThread(self.reconciler, group, cycle_deadline)
+            plan_thread.success.connect(self._on_plan_finished)
+            plan_thread.error.connect(
+                lambda e, g=group: self.logger.error(f"[{g.platform_class.__name__}][{g.zone}] - {e}"))
+            plan_thread.finished.connect(_once(lambda d=cycle_deadline: self._on_plan_done(d)))
+            self._thread_manager.submit_thread(plan_thread)
+
+    def _on_plan_done(self, cycle_deadline):
+        """计划组执行结束，释放工作线程并启动下一组"""
+        self._active_plans -= 1
+        self._on_thread_done(cycle_deadline)
+        self._dispatch_plans()
+
+    def _on_thread_done(self, cycle_deadline):
+        """线程结束，全部结束时报告本轮耗时"""
+        remaining = self._outstanding.get(cycle_deadline, 0) - 1
+        if remaining > 0:
+            self._outstanding[cycle_deadline] = remaining
+            return
+
+        self._outstanding.pop(cycle_deadline, None)
+        elapsed = cycle_deadline.elapsed()
+
+        # 报告IP变化后全部记录收敛的耗时
+        change_event = self._change_events.pop(cycle_deadline, None)
+        if change_event:
+            started, count = change_event
+            self.logger.info(f"IP变化后 {count} 条记录已全部处理，收敛耗时 {time.monotonic() - started:.1f} 秒")
+        if elapsed > cycle_deadline.seconds:
+            self.logger.warning(f"{cycle_deadline.name}耗时 {elapsed:.1f} 秒，超出预算 {cycle_deadline.seconds} 秒")
+        else:
+            self.logger.debug(f"{cycle_deadline.name}完成，耗时 {elapsed:.1f} 秒")
+
+    def _on_deadline_reached(self, cycle_deadline):
+        """时间预算用完，取消尚未完成的请求"""
+        pending = self._outstanding.get(cycle_deadline)
+        if not pending:
+            return
+
+        cycle_deadline.cancel()
+        self.logger.warning(f"{cycle_deadline.name}超出时间预算（{cycle_deadline.seconds} 秒），"
+                            f"已取消 {pending} 个未完成的任务")
 
     def check_and_update(self):
-        """检查并更新DNS记录"""
-        if not self._running or not self.platforms:
+        """
+        检查并更新DNS记录，本轮所有网络请求共享同一个截止时间。
+        IPv4和IPv6分别检查，任一地址族的结果就绪后立即处理对应类型的记录
+        """
+        if not self._running:
             return
 
-        ip_thread = IPCheckThread(self.ip_checker)
-        ip_thread.success.connect(self._on_ip_checked)
-        ip_thread.error.connect(lambda e: self.logger.error(f"IP检查失败: {e}"))
-        self._thread_manager.submit_thread(ip_thread)
+        # 分片配置文件有修改时增量重新加载，只重新解析修改过的文件
+        if self.config.refresh_shards():
+            self.logger.info("配置分片已修改，重新加载DNS记录")
+            self.reload_platforms()
 
-    def _on_ip_checked(self, ip_data):
-        """IP检查完成的回调"""
-        ipv4, ipv6 = ip_data
-        if not (ipv4 or ipv6):
-            self.logger.warning("未获取到任何IP地址")
+        if not self.platforms:
             return
 
-        for platform_key, platform in self.platforms.items():
-            try:
-                record_type = platform.config.get('record_type', 'A')
-                current_ip = ipv4 if record_type == 'A' else ipv6
+        # 通知各平台新一轮更新开始，每个平台类只通知一次
+        for platform_class in {type(platform) for platform in self.platforms.values()}:
+            platform_class.new_cycle()
+
+        cycle_deadline = self._new_deadline('本轮更新')
+        for record_type in ('A', 'AAAA'):
+            ip_thread = IPFamilyCheckThread(self.ip_checker, record_type, cycle_deadline)
+            ip_thread.success.connect(lambda result: self._on_ip_checked(result, cycle_deadline))
+            ip_thread.error.connect(lambda e: self.logger.error(f"IP检查失败: {e}"))
+            self._submit(ip_thread, cycle_deadline)
+
+    def _on_ip_checked(self, result, cycle_deadline):
+        """单个地址族的IP检查完成，地址变化时立即更新该类型的全部记录"""
+        record_type, ip = result
+        records = {key: platform for key, platform in self.platforms.items() if platform.record_type == record_type}
+
+        # 检查失败时保留上次的地址，避免下次检查成功时被误判为IP变化
+        if not ip:
+            if records:
+                self.logger.warning(f"未获取到{'IPv4' if record_type == 'A' else 'IPv6'}地址，"
+                                    f"跳过 {len(records)} 条{record_type}记录")
+            return
+
+        ipv4, ipv6 = self._last_ips or ('', '')
+        last_ip = ipv4 if record_type == 'A' else ipv6
+        if record_type == 'A':
+            ipv4 = ip
+        else:
+            ipv6 = ip
+        self._last_ips = (ipv4, ipv6)
+
+        if cycle_deadline.expired():
+            self.logger.warning("IP检查耗尽了本轮时间预算，跳过本轮更新")
+            return
+
+        # IP未变化时由调度器按各记录的间隔处理
+        if ip == last_ip or not records:
+            return
+
+        # IP变化时立即更新该类型的全部记录，预热中的记录等预热完成后再单独更新
+        ready = {key: platform for key, platform in records.items() if key not in self._warming}
+        if len(ready) < len(records):
+            self.logger.info(f"{len(records) - len(ready)} 个记录仍在预热，完成后立即更新")
+
+        started, count = self._change_events.get(cycle_deadline, (time.monotonic(), 0))
+        self._change_events[cycle_deadline] = (started, count + len(ready))
+        self._update_platforms(ready, ipv4, ipv6, cycle_deadline)
+
+    def _record_interval(self, platform):
+        """记录的更新间隔（秒），未设置时使用全局间隔"""
+        try:
+            interval = int(platform.config.get('interval') or 0)
+        except (TypeError, ValueError):
+            interval = 0
+        return max(self.MIN_INTERVAL, interval) if interval > 0 else self._update_interval
+
+    @staticmethod
+    def _record_priority(platform):
+        """记录的优先级，未设置时为普通"""
+        try:
+            return int(platform.config.get('priority', PRIORITY_NORMAL))
+        except (TypeError, ValueError):
+            return PRIORITY_NORMAL
+
+    def _sync_schedule(self, force_timer=False):
+        """
+        按当前记录的调度设置更新调度器，并调整IP检查间隔
+        Args:
+            force_timer: 间隔未变化时也重启IP检查定时器
+        """
+        specs = {key: (self._record_interval(platform), self._record_priority(platform))
+                 for key, platform in self.platforms.items()}
+        self.scheduler.sync(specs)
+
+        # IP检查需跟上间隔最短的记录
+        interval = min([self._update_interval] + [spec[0] for spec in specs.values()])
+        if self._timer and self._running and (force_timer or interval != self._ip_check_interval):
+            self._timer.stop()
+            self._timer.setInterval(interval * 1000)
+            self._timer.start()
+        self._ip_check_interval = interval
+
+        self._arm_tick()
+
+    def _arm_tick(self):
+        """在最近一条记录到期时触发调度"""
+        if not self._tick_timer or not self._running:
+            return
+
+        next_due = self.scheduler.next_due()
+        if next_due is None:
+            self._tick_timer.stop()
+            return
+        self._tick_timer.start(int(max(0.0, next_due - time.monotonic()) * 1000) + 1)
+
+    def _on_tick(self):
+        """调度：处理已到期的记录，高优先级的记录先提交"""
+        if not self._running:
+            return
+
+        due = self.scheduler.pop_due()
+        if self._last_ips:
+            platforms = {key: self.platforms[key] for key in due
+                         if key in self.platforms and key not in self._warming}
+            if platforms:
+                self._update_platforms(platforms, *self._last_ips)
+
+        self._arm_tick()
+
+    def _update_platforms(self, platforms, ipv4, ipv6, cycle_deadline=None):
+        """
+        调和指定记录：生成写入计划，按优先级和预估耗时排队，最多 MAX_WORKERS 组并行执行
+        Args:
+            platforms: platform_key -> 平台实例
+            ipv4: IPv4地址
+            ipv6: IPv6地址
+            cycle_deadline: 本轮截止时间，未提供时新建
+        """
+        try:
+            groups = self.reconciler.plan(platforms, ipv4, ipv6)
+        except Exception as e:
+            self.logger.error(f"生成更新计划失败: {str(e)}")
+            return
 
-                if not current_ip:
-                    self.logger.warning(f"{platform_key} - 未获取到{record_type}记录所需的IP地址")
-                    continue
+        if groups and cycle_deadline is None:
+            cycle_deadline = self._new_deadline('记录更新')
 
-                update_thread = DNSUpdateThread(platform, ipv4, ipv6)
-                update_thread.success.connect(lambda result, p=platform: self._on_update_success(result, p))
-                update_thread.error.connect(lambda e, p=platform: self._on_update_error(e, p))
-                self._thread_manager.submit_thread(update_thread)
+        for group in groups:
+            self._enqueue_plan(group, cycle_deadline)
+        self._dispatch_plans()
 
-            except Exception as e:
-                self.logger.error(f"{platform_key} - 处理出错: {str(e)}")
+    def _on_plan_finished(self, results):
+        """计划执行完成的处理"""
+        for platform, updated in results.items():
+            if updated is False:
+                self._on_update_error("更新失败", platform)
+            elif updated:
+                self._on_update_success(updated, platform)
 
     def _on_update_success(self, updated, platform):
         """更新成功的处理"""
@@ -135,6 +515,10 @@ class DNSUpdater(QObject):
         self._running = False
         if self._timer:
             self._timer.stop()
+        if self._tick_timer:
+            self._tick_timer.stop()
+        self._plan_queue.clear()
+        self._warm_up_queue.clear()
 
         # 停止所有线程
         self._thread_manager.stop_all()
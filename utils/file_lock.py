@@ -0,0 +1,99 @@
+"""
+@Project ：DDNS
+@File    ：file_lock.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+跨进程文件锁：POSIX 使用 fcntl.flock，Windows 使用 msvcrt.locking，
+用于 GUI 和后台进程共享同一个配置文件
+"""
+
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    建议性排他锁，锁文件为 <path>.lock，支持 with 语句。
+    只约束同样使用该锁的进程
+    """
+
+    RETRY_INTERVAL = 0.05  # Windows 下重试加锁的间隔（秒）
+
+    def __init__(self, path, timeout=10):
+        """
+        Args:
+            path: 要保护的文件路径
+            timeout: 等待加锁的最长时间（秒）
+        """
+        self.lock_file = f"{path}.lock"
+        self.timeout = timeout
+        self._fd = None
+
+    def acquire(self):
+        """
+        加锁
+        Raises:
+            TimeoutError: 超时仍未获得锁
+        """
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                self._acquire_posix(fd)
+            else:
+                self._acquire_windows(fd)
+        except Exception:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    def _acquire_posix(self, fd):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"等待文件锁超时: {self.lock_file}")
+                time.sleep(self.RETRY_INTERVAL)
+
+    def _acquire_windows(self, fd):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"等待文件锁超时: {self.lock_file}")
+                time.sleep(self.RETRY_INTERVAL)
+
+    def release(self):
+        """释放锁"""
+        if self._fd is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
@@ -0,0 +1,151 @@
+"""
+@Project ：DDNS
+@File    ：file_watcher.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+文件变化监视：Linux 下通过 inotify 监视所在目录，其他平台定时比较文件状态
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+
+from utils.logger import Logger
+
+# inotify 事件掩码
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+def file_signature(path):
+    """
+    获取文件状态签名，文件被修改或替换后签名会变化
+    Returns:
+        tuple: (mtime_ns, inode, size)，文件不存在返回None
+    """
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_ino, stat.st_size
+    except OSError:
+        return None
+
+
+class FileWatcher:
+    """监视单个文件，变化时在监视线程中调用回调"""
+
+    POLL_INTERVAL = 2.0  # 轮询间隔（秒），无法使用 inotify 时生效
+
+    def __init__(self, path, callback):
+        """
+        Args:
+            path: 文件路径
+            callback: 文件变化时调用，无参数
+        """
+        self.path = os.path.abspath(path)
+        self.callback = callback
+        self.logger = Logger()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.using_inotify = False
+
+    def start(self):
+        """启动监视线程"""
+        if self._thread:
+            return
+
+        fd = self._init_inotify()
+        self.using_inotify = fd is not None
+        target = self._inotify_loop if self.using_inotify else self._poll_loop
+        self._thread = threading.Thread(target=target, args=(fd,) if self.using_inotify else (),
+                                        name=f"FileWatcher-{os.path.basename(self.path)}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止监视线程"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _init_inotify(self):
+        """
+        初始化 inotify 并监视文件所在目录（原子替换会改变文件 inode，因此监视目录而不是文件）
+        Returns:
+            int: inotify 文件描述符，不可用返回None
+        """
+        if not sys.platform.startswith('linux'):
+            return None
+
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+
+            directory = os.path.dirname(self.path) or '.'
+            if libc.inotify_add_watch(fd, directory.encode(sys.getfilesystemencoding()), WATCH_MASK) < 0:
+                os.close(fd)
+                raise OSError(ctypes.get_errno(), "inotify_add_watch 失败")
+            return fd
+        except Exception as e:
+            self.logger.debug(f"inotify 不可用，改为轮询: {str(e)}")
+            return None
+
+    def _inotify_loop(self, fd):
+        """读取 inotify 事件，只关心目标文件"""
+        name = os.path.basename(self.path).encode(sys.getfilesystemencoding())
+        try:
+            while not self._stop_event.is_set():
+                readable, _, _ = select.select([fd], [], [], 1.0)
+                if not readable:
+                    continue
+
+                try:
+                    data = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+
+                changed = False
+                offset = 0
+                while offset + EVENT_HEADER.size <= len(data):
+                    _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                    event_name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+                    offset += EVENT_HEADER.size + length
+                    if mask & IN_Q_OVERFLOW or event_name == name:
+                        changed = True
+
+                if changed:
+                    self._notify()
+        finally:
+            os.close(fd)
+
+    def _poll_loop(self):
+        """定时比较文件状态签名"""
+        signature = file_signature(self.path)
+        while not self._stop_event.wait(self.POLL_INTERVAL):
+            current = file_signature(self.path)
+            if current != signature:
+                signature = current
+                self._notify()
+
+    def _notify(self):
+        """调用回调，回调异常不影响监视线程"""
+        try:
+            self.callback()
+        except Exception as e:
+            self.logger.error(f"处理文件变化失败: {str(e)}")
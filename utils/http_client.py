@@ -0,0 +1,50 @@
+"""
+@Project ：DDNS
+@File    ：http_client.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+共享HTTP层：所有平台接口复用同一个连接池
+"""
+
+import threading
+
+import requests
+
+from utils import deadline
+
+DEFAULT_TIMEOUT = 10  # 默认请求超时时间（秒）
+
+_session = None
+_lock = threading.Lock()
+
+
+def get_session():
+    """获取共享的 requests.Session，首次使用时创建"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=32)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def request(method, url, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """
+    发送HTTP请求
+    Args:
+        method: 请求方法
+        url: 请求地址
+        timeout: 超时时间（秒），当前线程绑定了截止时间时不超过剩余时间
+        **kwargs: 透传给 requests 的其他参数
+    Returns:
+        requests.Response: 响应对象
+    Raises:
+        DeadlineExceeded: 当前线程的时间预算已用完
+    """
+    return get_session().request(method, url, timeout=deadline.get_timeout(timeout), **kwargs)
@@ -6,8 +6,7 @@
 @Date    ：2023/12/02
 """
 
-import requests
-
+from utils import http_client
 from utils.logger import Logger
 
 
@@ -21,6 +20,7 @@ class IPChecker:
         self._last_ipv6 = None
         self.ipv4_api = "https://4.ipw.cn/"
         self.ipv6_api = "https://6.ipw.cn/"
+        self.timeout = 5  # 单次请求超时（秒），绑定了截止时间时不超过剩余时间
 
     def _get_ipv4(self):
         """
@@ -29,7 +29,7 @@ class IPChecker:
             str: IPv4地址，失败返回None
         """
         try:
-            response = requests.get(self.ipv4_api, timeout=5)
+            response = http_client.request('GET', self.ipv4_api, timeout=self.timeout)
             if response.status_code == 200:
                 return response.text.strip()
             return None
@@ -43,13 +43,39 @@ class IPChecker:
             str: IPv6地址，失败返回None
         """
         try:
-            response = requests.get(self.ipv6_api, timeout=5)
+            response = http_client.request('GET', self.ipv6_api, timeout=self.timeout)
             if response.status_code == 200:
                 return response.text.strip()
             return None
         except Exception:
             return None
 
+    def get_ip(self, record_type):
+        """
+        获取单个地址族的地址，两个地址族可以在不同线程中并行获取
+        Args:
+            record_type: 'A' 获取IPv4，'AAAA' 获取IPv6
+        Returns:
+            str: IP地址，失败返回None
+        """
+        try:
+            if record_type == 'A':
+                ipv4 = self._get_ipv4()
+                if ipv4 != self._last_ipv4:
+                    self.logger.info(f"IPv4地址: {ipv4 or '无'}")
+                    self._last_ipv4 = ipv4
+                return ipv4
+
+            ipv6 = self._get_ipv6()
+            if ipv6 != self._last_ipv6:
+                self.logger.info(f"IPv6地址: {ipv6 or '无'}")
+                self._last_ipv6 = ipv6
+            return ipv6
+
+        except Exception as e:
+            self.logger.error(f"获取IP地址失败: {str(e)}")
+            return None
+
     def get_current_ips(self):
         """获取当前的IPv4和IPv6地址"""
         try:
@@ -0,0 +1,52 @@
+"""
+@Project ：DDNS
+@File    ：latency.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+接口耗时统计：按平台和区域记录指数加权平均耗时，用于安排写入顺序
+"""
+
+import threading
+
+
+class LatencyTracker:
+    """按键统计指数加权移动平均（EWMA）耗时，线程安全"""
+
+    ALPHA = 0.3  # 新样本的权重
+    DEFAULT_LATENCY = 1.0  # 没有历史数据时的预估耗时（秒）
+
+    def __init__(self):
+        self._averages = {}  # 键 -> 平均耗时（秒）
+        self._lock = threading.Lock()
+
+    def observe(self, key, seconds):
+        """
+        记录一次耗时
+        Args:
+            key: 统计键，例如 (平台标识, 区域)
+            seconds: 耗时（秒）
+        """
+        with self._lock:
+            average = self._averages.get(key)
+            if average is None:
+                self._averages[key] = seconds
+            else:
+                self._averages[key] = average + self.ALPHA * (seconds - average)
+
+    def estimate(self, key):
+        """
+        获取预估耗时
+        Args:
+            key: 统计键
+        Returns:
+            float: 预估耗时（秒）
+        """
+        with self._lock:
+            return self._averages.get(key, self.DEFAULT_LATENCY)
+
+    def snapshot(self):
+        """获取所有统计结果的副本"""
+        with self._lock:
+            return dict(self._averages)
@@ -0,0 +1,86 @@
+"""
+@Project ：DDNS
+@File    ：log_store.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+内存日志：固定容量的环形缓冲区，每条日志带递增序号，界面按序号增量读取
+"""
+
+import threading
+
+
+class LogEntry:
+    """一条日志，只保存界面需要的字段"""
+    __slots__ = ('seq', 'time', 'level', 'message')
+
+    def __init__(self, seq, time, level, message):
+        self.seq = seq  # 序号，从1开始递增，清除后也不重置
+        self.time = time  # 时间戳（秒）
+        self.level = level  # 级别名称，例如 INFO
+        self.message = message
+
+
+class LogStore:
+    """环形缓冲区，写满后覆盖最旧的日志，追加和按序号读取均不移动已有数据，线程安全"""
+
+    def __init__(self, capacity=1000):
+        """
+        Args:
+            capacity: 最多保存的日志条数
+        """
+        self.capacity = capacity
+        self._entries = [None] * capacity
+        self._next_seq = 1  # 下一条日志的序号
+        self._first_seq = 1  # 缓冲区中最旧日志的序号
+        self._lock = threading.Lock()
+
+    def append(self, time, level, message):
+        """
+        追加一条日志，O(1)
+        Returns:
+            int: 日志序号
+        """
+        with self._lock:
+            seq = self._next_seq
+            self._entries[seq % self.capacity] = LogEntry(seq, time, level, message)
+            self._next_seq = seq + 1
+            if seq - self._first_seq >= self.capacity:
+                self._first_seq = seq - self.capacity + 1
+            return seq
+
+    def read_since(self, seq, limit=None):
+        """
+        读取序号大于 seq 的日志，O(k)。
+        已被覆盖的日志无法读取，可通过返回的第一条日志的序号判断是否有遗漏
+        Args:
+            seq: 已读取的最后一条日志的序号，0 表示从头读取
+            limit: 最多返回的条数，超出时返回最新的 limit 条
+        Returns:
+            list: LogEntry 列表，按序号排列
+        """
+        with self._lock:
+            start = max(seq + 1, self._first_seq)
+            if limit is not None:
+                start = max(start, self._next_seq - limit)
+            return [self._entries[i % self.capacity] for i in range(start, self._next_seq)]
+
+    @property
+    def last_seq(self):
+        """最新一条日志的序号，没有日志时为0"""
+        return self._next_seq - 1
+
+    @property
+    def first_seq(self):
+        """缓冲区中最旧日志的序号"""
+        return self._first_seq
+
+    def __len__(self):
+        return self._next_seq - self._first_seq
+
+    def clear(self):
+        """清除缓冲区，序号继续递增"""
+        with self._lock:
+            self._entries = [None] * self.capacity
+            self._first_seq = self._next_seq
@@ -0,0 +1,307 @@
+"""
+@Project ：DDNS
+@File    ：log_writer.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+异步日志输出：记录日志时只把格式化后的文本放入有界队列，由专门的写入线程写入文件和控制台，
+按天轮换，旧日志的压缩和清理在单独的线程中进行，更新线程记录日志时不会等待磁盘
+"""
+
+import datetime
+import os
+import queue
+import threading
+import time
+import zipfile
+
+DROP = 'drop'  # 队列已满时丢弃新日志
+BLOCK = 'block'  # 队列已满时等待，最多 BLOCK_TIMEOUT 秒，超时后丢弃
+
+
+class StreamTarget:
+    """输出到流，例如 sys.stderr"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+
+
+class DailyFileTarget:
+    """按天写入 ddns_YYYY-MM-DD.log，跨天时切换文件，旧文件交给压缩线程"""
+
+    def __init__(self, directory, prefix='ddns', retention_days=30, compress=True):
+        """
+        Args:
+            directory: 日志目录
+            prefix: 文件名前缀
+            retention_days: 保留天数
+            compress: 是否压缩旧日志
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.retention_days = retention_days
+        self.compress = compress
+        self._file = None
+        self._path = None
+        self._rotate_at = 0.0  # 下一次切换文件的时间
+        self.on_error = None  # 归档失败时的回调，参数为错误信息，由 LogWriter 设置
+        self._archive_queue = queue.Queue()
+        self._archiver = threading.Thread(target=self._archive_loop, name="LogArchiver", daemon=True)
+        self._archiver.start()
+
+        # 启动时处理以前遗留的日志
+        self._archive_queue.put(None)
+
+    def write(self, text):
+        if time.time() >= self._rotate_at:
+            self._rotate()
+        self._file.write(text)
+
+    def flush(self):
+        if self._file:
+            self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self):
+        """切换到当天的日志文件（在写入线程中执行，只打开文件，不压缩）"""
+        today = datetime.date.today()
+        tomorrow = datetime.datetime.combine(today + datetime.timedelta(days=1), datetime.time())
+        self._rotate_at = tomorrow.timestamp()
+
+        path = os.path.join(self.directory, f"{self.prefix}_{today:%Y-%m-%d}.log")
+        if path == self._path and self._file:
+            return
+
+        old_path = self._path
+        self.close()
+        self._file = open(path, 'a', encoding='utf-8')
+        self._path = path
+        if old_path:
+            self._archive_queue.put(old_path)
+
+    def _archive_loop(self):
+        """压缩旧日志并清理过期文件"""
+        while True:
+            path = self._archive_queue.get()
+            try:
+                if path and self.compress:
+                    self._compress(path)
+                self._cleanup()
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(f"归档日志失败: {str(e)}")
+
+    @staticmethod
+    def _compress(path):
+        """压缩为 .zip 后删除原文件"""
+        if not os.path.exists(path):
+            return
+        temp_file = f"{path}.zip.tmp"
+        with zipfile.ZipFile(temp_file, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.write(path, os.path.basename(path))
+        os.replace(temp_file, f"{path}.zip")
+        os.remove(path)
+
+    def _cleanup(self):
+        """压缩遗留的未压缩旧日志，删除超过保留天数的日志"""
+        expire_before = time.time() - self.retention_days * 86400
+        current = f"{self.prefix}_{datetime.date.today():%Y-%m-%d}.log"  # 当天的日志仍在写入
+        for name in os.listdir(self.directory):
+            if not name.startswith(f"{self.prefix}_"):
+                continue
+            path = os.path.join(self.directory, name)
+            if os.path.getmtime(path) < expire_before:
+                os.remove(path)
+            elif self.compress and name.endswith('.log') and name != current:
+                self._compress(path)
+
+
+class LogWriter:
+    """
+    日志写入线程。所有输出共用一个有界队列，记录日志的线程只负责入队；
+    队列满时按策略丢弃或短暂等待，并统计丢弃数量
+    """
+
+    MAX_QUEUE = 10000  # 队列容量（条）
+    BLOCK_TIMEOUT = 0.1  # BLOCK 策略下最长等待时间（秒）
+    ERROR_REPORT_INTERVAL = 60  # 写入或归档失败时，两次报告之间的最短间隔（秒）
+
+    def __init__(self, policy=DROP, max_queue=None):
+        """
+        Args:
+            policy: 队列满时的策略，DROP 或 BLOCK
+            max_queue: 队列容量
+        """
+        self.policy = policy
+        self._queue = queue.Queue(max_queue or self.MAX_QUEUE)
+        self._targets = []
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0  # 写入或归档失败的次数
+        self._reported_drops = 0
+        self._last_error_report = None  # 最近一次报告失败的时间
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="LogWriter", daemon=True)
+        self._thread.start()
+
+    def sink(self, target):
+        """
+        注册输出目标
+        Args:
+            target: 具有 write / flush / close 方法的对象
+        Returns:
+            callable: 供 loguru 使用的 sink，调用时只入队
+        """
+        self._targets.append(target)
+        if hasattr(target, 'on_error'):
+            target.on_error = self._on_target_error
+
+        def enqueue(message):
+            self.put(target, str(message))
+
+        return enqueue
+
+    def put(self, target, text):
+        """日志入队，不等待磁盘"""
+        with self._lock:
+            if self._closed:
+                return
+        try:
+            if self.policy == BLOCK:
+                self._queue.put((target, text), timeout=self.BLOCK_TIMEOUT)
+            else:
+                self._queue.put_nowait((target, text))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+        with self._lock:
+            self.enqueued += 1
+
+    def stats(self):
+        """
+        获取统计
+        Returns:
+            dict: 入队、已写入、丢弃的条数，写入或归档失败的次数和当前队列长度
+        """
+        with self._lock:
+            return {'enqueued': self.enqueued, 'written': self.written, 'dropped': self.dropped,
+                    'errors': self.errors, 'pending': self._queue.qsize()}
+
+    def _on_target_error(self, message):
+        """输出在其他线程（如归档线程）中失败时调用，报告交给写入线程写入所有输出"""
+        line = self._report_error(message)
+        if line:
+            try:
+                self._queue.put_nowait((None, line))
+            except queue.Full:
+                pass
+
+    def _report_error(self, message):
+        """
+        统计写入或归档失败，限频生成报告，写入各输出（开发环境下包括控制台）；
+        打包后的窗口程序没有控制台，print 无法看到
+        Returns:
+            str: 报告内容，距上次报告不足 ERROR_REPORT_INTERVAL 时返回None
+        """
+        with self._lock:
+            self.errors += 1
+            now = time.monotonic()
+            if self._last_error_report is not None and now - self._last_error_report < self.ERROR_REPORT_INTERVAL:
+                return None
+            self._last_error_report = now
+            errors = self.errors
+
+        line = (f"{time.strftime('%Y-%m-%d %H:%M:%S')} | ERROR    | "
+                f"{message}（累计失败 {errors} 次）\n")
+        return line
+
+    def _run(self):
+        """写入线程：逐条写入，队列空闲时统一刷新"""
+        dirty = set()
+        while True:
+            try:
+                item = self._queue.get(timeout=1.0 if dirty else None)
+            except queue.Empty:
+                item = ()
+
+            if item is None:  # 关闭
+                break
+            if item:
+                target, text = item
+                if target is None:  # 失败报告，写入所有输出，不再报告其中的失败
+                    self._broadcast(text)
+                    dirty.update(self._targets)
+                    continue
+                try:
+                    target.write(text)
+                    dirty.add(target)
+                except Exception as e:
+                    line = self._report_error(f"写入日志失败: {str(e)}")
+                    if line:
+                        self._broadcast(line)
+                        dirty.update(self._targets)
+                else:
+                    with self._lock:
+                        self.written += 1
+
+            if self._queue.empty() and dirty:
+                self._report_drops()
+                for target in dirty:
+                    try:
+                        target.flush()
+                    except Exception:
+                        pass
+                dirty.clear()
+
+        for target in self._targets:
+            try:
+                target.close()
+            except Exception:
+                pass
+
+    def _report_drops(self):
+        """把新增的丢弃数量写入各输出，便于事后排查"""
+        dropped = self.dropped
+        if dropped == self._reported_drops:
+            return
+        line = (f"{time.strftime('%Y-%m-%d %H:%M:%S')} | WARNING  | "
+                f"日志队列已满，已丢弃 {dropped - self._reported_drops} 条日志\n")
+        self._reported_drops = dropped
+        self._broadcast(line)
+
+    def _broadcast(self, line):
+        """写入所有输出，忽略失败"""
+        for target in self._targets:
+            try:
+                target.write(line)
+            except Exception:
+                pass
+
+    def close(self, timeout=5):
+        """写完队列中的日志后停止写入线程"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
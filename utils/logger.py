@@ -1,15 +1,20 @@
+import atexit
 import sys
 import time
 from pathlib import Path
 
 from loguru import logger
 
+from utils.log_store import LogStore
+from utils.log_writer import DailyFileTarget, LogWriter, StreamTarget
+
 
 class Logger:
     _instance = None
-    _log_buffer = []  # 存储本次运行的日志
-    _last_log = {}  # 存储最后一条日志的内容和时间，用于去重
     _max_buffer_size = 1000  # 最大缓存日志数量
+    _log_store = LogStore(_max_buffer_size)  # 存储本次运行的日志，供界面按序号增量读取
+    _last_log = {}  # 存储最后一条日志的内容和时间，用于去重
+    _writer = None  # 日志写入线程，控制台和文件输出都经由它写入
 
     def __new__(cls):
         if cls._instance is None:
@@ -31,33 +36,31 @@ class Logger:
             # 移除默认的处理器
             logger.remove()
 
+            # 控制台和文件输出只入队，由写入线程写入，记录日志时不等待磁盘
+            Logger._writer = LogWriter()
+            atexit.register(Logger._writer.close)
+
             # 在开发环境添加控制台输出
             if not getattr(sys, 'frozen', False):  # 不是打包环境
                 logger.add(
-                    sys.stderr,
+                    self._writer.sink(StreamTarget(sys.stderr)),
                     format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <level>{message}</level>",
                     level="DEBUG",
                     colorize=True,
                     filter=self._filter_repeated_logs
                 )
 
-            # 添加文件输出（按天）
+            # 添加文件输出（按天轮换，保留30天，旧日志在后台压缩）
             logger.add(
-                str(log_dir / "ddns_{time:YYYY-MM-DD}.log"),
-                rotation="00:00",  # 每天轮换
-                retention="30 days",  # 保留30天
+                self._writer.sink(DailyFileTarget(str(log_dir), retention_days=30, compress=True)),
                 format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}",
-                encoding="utf-8",
-                level="DEBUG",
-                compression="zip"  # 压缩旧日志
+                level="DEBUG"
             )
 
-            # 添加内存日志处理器，用于界面显示
+            # 添加内存日志处理器，用于界面显示，只保存时间、级别和消息
             def log_handler(message):
-                self._log_buffer.append(message.record)
-                # 限制缓存大小
-                if len(self._log_buffer) > self._max_buffer_size:
-                    self._log_buffer.pop(0)
+                record = message.record
+                self._log_store.append(record['time'].timestamp(), record['level'].name, record['message'])
 
             logger.add(log_handler, level="DEBUG")
 
@@ -82,12 +85,35 @@ class Logger:
         return True
 
     def get_buffer(self):
-        """获取内存中的日志"""
-        return self._log_buffer
+        """获取内存中的全部日志"""
+        return self._log_store.read_since(0)
+
+    def get_buffer_capacity(self):
+        """获取日志缓存最多保存的条数"""
+        return self._log_store.capacity
+
+    def read_since(self, seq, limit=None):
+        """
+        获取序号大于 seq 的日志
+        Args:
+            seq: 已读取的最后一条日志的序号
+            limit: 最多返回的条数
+        Returns:
+            list: LogEntry 列表
+        """
+        return self._log_store.read_since(seq, limit)
 
     def clear_buffer(self):
         """清除内存中的日志"""
-        self._log_buffer.clear()
+        self._log_store.clear()
+
+    def get_writer_stats(self):
+        """
+        获取日志写入线程的统计
+        Returns:
+            dict: 入队、已写入、丢弃的条数，写入或归档失败的次数和当前队列长度
+        """
+        return self._writer.stats() if self._writer else {}
 
     def info(self, message, *args, **kwargs):
         """记录信息日志"""
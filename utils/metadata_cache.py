@@ -0,0 +1,114 @@
+"""
+@Project ：DDNS
+@File    ：metadata_cache.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+DNS平台元数据（Zone ID、记录ID等）的持久化缓存，重启后无需重新发现
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from utils.logger import Logger
+
+
+class MetadataCache:
+    """平台元数据缓存，按命名空间存储，带过期时间和版本号"""
+    _instance = None
+
+    VERSION = 1  # 缓存格式版本，不一致时整体丢弃
+    DEFAULT_TTL = 7 * 24 * 3600  # 默认保留7天
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self.initialized = True
+            self.logger = Logger()
+            self.cache_file = Path("cache") / "metadata.json"
+            self._lock = threading.Lock()
+            self._entries = self._load()
+
+    def _load(self):
+        """从磁盘加载缓存"""
+        try:
+            if not self.cache_file.exists():
+                return {}
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != self.VERSION:
+                self.logger.debug("元数据缓存版本不一致，已丢弃")
+                return {}
+            return data.get('entries', {})
+        except Exception as e:
+            self.logger.warning(f"加载元数据缓存失败: {str(e)}")
+            return {}
+
+    def _save(self):
+        """写入磁盘，先写临时文件再替换，避免写入中断损坏缓存"""
+        try:
+            self.cache_file.parent.mkdir(exist_ok=True)
+            temp_file = self.cache_file.with_suffix('.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.VERSION, 'entries': self._entries}, f, ensure_ascii=False)
+            os.replace(temp_file, self.cache_file)
+        except Exception as e:
+            self.logger.warning(f"保存元数据缓存失败: {str(e)}")
+
+    def get(self, namespace, key):
+        """
+        读取缓存
+        Args:
+            namespace: 命名空间，例如 cloudflare.zone
+            key: 缓存键
+        Returns:
+            缓存值，不存在或已过期返回None
+        """
+        with self._lock:
+            entry = self._entries.get(namespace, {}).get(key)
+            if not entry:
+                return None
+            if entry['expires'] < time.time():
+                del self._entries[namespace][key]
+                self._save()
+                return None
+            return entry['value']
+
+    def set(self, namespace, key, value, ttl=None):
+        """
+        写入缓存
+        Args:
+            namespace: 命名空间
+            key: 缓存键
+            value: 可JSON序列化的缓存值
+            ttl: 过期时间（秒），默认 DEFAULT_TTL
+        """
+        with self._lock:
+            entries = self._entries.setdefault(namespace, {})
+            entry = entries.get(key)
+            # 值未变化时只在临近过期时续期，避免频繁写盘
+            if entry and entry['value'] == value and entry['expires'] - time.time() > (ttl or self.DEFAULT_TTL) / 2:
+                return
+            entries[key] = {'value': value, 'expires': time.time() + (ttl or self.DEFAULT_TTL)}
+            self._save()
+
+    def invalidate(self, namespace, key):
+        """使缓存失效，通常在接口返回404或记录不存在时调用"""
+        with self._lock:
+            if self._entries.get(namespace, {}).pop(key, None) is not None:
+                self.logger.debug(f"元数据缓存已失效: {namespace}/{key}")
+                self._save()
+
+    def clear(self):
+        """清除所有缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._save()
@@ -0,0 +1,309 @@
+"""
+@Project ：DDNS
+@File    ：reconciler.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+记录调和引擎：根据本地IP计算每条记录的期望值，与缓存的已观测状态比较，
+生成按平台和区域分组的最小写入计划，平台只负责执行计划
+"""
+
+import threading
+import time
+
+from dns_platforms import CAP_BATCH_WRITE
+from utils import deadline
+from utils.latency import LatencyTracker
+from utils.logger import Logger
+from utils.record_store import RecordStore
+from utils.scheduler import PRIORITY_NORMAL
+
+# 记录状态
+UNKNOWN = 0  # 尚未读取，或距上次确认已超过复核间隔
+IN_SYNC = 1  # 已观测值与期望值一致
+DIRTY = 2  # 已观测值与期望值不一致，待写入
+WRITING = 3  # 已纳入计划，正在读取或写入
+ERROR = 4  # 上次写入失败，下次重新读取后再写
+
+class RecordState:
+    """单条记录的调和状态"""
+    __slots__ = ('status', 'observed', 'desired', 'checked_at')
+
+    def __init__(self):
+        self.status = UNKNOWN
+        self.observed = None  # 最近一次观测到（或成功写入）的记录值
+        self.desired = None  # 期望的记录值
+        self.checked_at = 0.0  # 最近一次确认记录值的时间
+
+
+class PlanGroup:
+    """同一平台、同一区域的待执行计划"""
+    __slots__ = ('platform_class', 'zone', 'items', 'priority', 'expected')
+
+    def __init__(self, platform_class, zone, items=None):
+        self.platform_class = platform_class
+        self.zone = zone
+        self.items = items or []  # [(平台实例, 期望值, 是否需要先读取)]
+        self.priority = PRIORITY_NORMAL  # 组内最高的优先级（数值最小）
+        self.expected = 0.0  # 预估耗时（秒）
+
+    @property
+    def latency_key(self):
+        """耗时统计键"""
+        return self.platform_class.platform_id(), self.zone
+
+
+class Reconciler:
+    """记录调和引擎，线程安全，状态表按记录标识键存储"""
+
+    VERIFY_INTERVAL = 30 * 60  # 未设置 verify_interval 和 interval 的记录的复核间隔（秒），用于发现外部修改
+
+    def __init__(self, state_store=None):
+        """
+        Args:
+            state_store: 持久保存运行状态的配置对象（get_state / set_state），
+                         用于保存已确认的记录值，重启后在复核间隔内不必重新读取
+        """
+        self.logger = Logger()
+        self.state_store = state_store
+        self._states = {}  # 记录标识键 -> RecordState
+        self._lock = threading.Lock()
+        self.latency = LatencyTracker()
+
+    def plan(self, platforms, ipv4, ipv6):
+        """
+        生成写入计划，已同步且未到复核时间的记录不进入计划。
+        返回的计划组已按执行顺序排列：先按优先级分层，同层内预估耗时最长的先执行，
+        使全部记录收敛的总耗时最短
+        Args:
+            platforms: platform_key -> 平台实例
+            ipv4: IPv4地址
+            ipv6: IPv6地址
+        Returns:
+            list: PlanGroup 列表
+        """
+        store = RecordStore()  # 待执行的记录，用其区域索引分组
+        items = {}  # 主键 -> (平台实例, 期望值, 是否需要先读取)
+        now = time.time()
+
+        with self._lock:
+            for platform_key, platform in platforms.items():
+                desired = ipv4 if platform.record_type == 'A' else ipv6
+                if not desired:
+                    self.logger.warning(f"{platform_key} - 未获取到{platform.record_type}记录所需的IP地址")
+                    continue
+
+                verify_interval = self._verify_interval(platform)
+                state = self._states.get(platform.get_record_key())
+                if state is None:
+                    state = self._states[platform.get_record_key()] = self._restore(platform, desired)
+                elif state.status == WRITING:
+                    continue  # 上一次计划仍在执行
+
+                state.desired = desired
+                if state.status in (IN_SYNC, DIRTY) and now - state.checked_at > verify_interval:
+                    state.status = UNKNOWN
+                if state.status == IN_SYNC:
+                    if state.observed == desired:
+                        continue
+                    state.status = DIRTY
+
+                # 已知记录值的记录直接写入，其余先读取
+                need_read = state.status != DIRTY
+                state.status = WRITING
+
+                items[store.upsert(platform.platform_id(), platform.config)] = (platform, desired, need_read)
+
+        groups = []
+        for zone in store.zones():
+            group_items = [items[key] for key in store.by_zone(*zone)]
+            groups.append(PlanGroup(type(group_items[0][0]), zone[1], group_items))
+        return self._order(self._partition(groups))
+
+    @staticmethod
+    def _partition(groups):
+        """
+        拆分计划组：支持批量写入的平台整组提交，其余平台每条记录单独成组，
+        可以并行执行，慢的记录不会拖住同一区域的其他记录
+        """
+        partitioned = []
+        for group in groups:
+            if group.platform_class.supports(CAP_BATCH_WRITE) or len(group.items) == 1:
+                partitioned.append(group)
+            else:
+                partitioned.extend(PlanGroup(group.platform_class, group.zone, [item]) for item in group.items)
+        return partitioned
+
+    def _order(self, groups):
+        """按优先级分层，同层内按预估耗时从长到短排列（最长处理时间优先）"""
+        for group in groups:
+            group.priority = min(self._priority(platform) for platform, _, _ in group.items)
+            group.expected = self.latency.estimate(group.latency_key)
+        groups.sort(key=lambda group: (group.priority, -group.expected))
+        return groups
+
+    def _verify_interval(self, platform):
+        """
+        已同步记录的复核间隔：优先使用记录的 verify_interval，
+        未设置时跟随记录的更新间隔 interval，单独设置了短间隔的记录按该间隔重新读取
+        """
+        for field_name in ('verify_interval', 'interval'):
+            try:
+                value = int(platform.config.get(field_name) or 0)
+            except (TypeError, ValueError):
+                continue
+            if value > 0:
+                return value
+        return self.VERIFY_INTERVAL
+
+    @staticmethod
+    def _priority(platform):
+        """记录的优先级"""
+        try:
+            return int(platform.config.get('priority', PRIORITY_NORMAL))
+        except (TypeError, ValueError):
+            return PRIORITY_NORMAL
+
+    def execute(self, group):
+        """
+        执行一组计划：读取需要确认的记录，再写入不一致的记录，支持批量写入的平台合并提交。
+        当前线程的时间预算用完后，未处理的记录恢复为未知状态，留待下一轮
+        Args:
+            group: PlanGroup
+        Returns:
+            dict: 平台实例 -> True（已更新）/ False（失败）/ None（无需更新或已跳过）
+        """
+        results = {}
+        changes = []  # [(平台实例, 期望值)]
+        started = time.perf_counter()
+
+        for index, (platform, desired, need_read) in enumerate(group.items):
+            if deadline.expired():
+                self._abandon([item[0] for item in group.items[index:]], group, results)
+                return results
+
+            observed = self._get_state(platform).observed
+            if need_read:
+                try:
+                    observed = platform.read()
+                except Exception as e:
+                    platform.logger.error(f"{platform.get_platform_key()} - 获取记录失败: {str(e)}")
+                    observed = None
+                self._observe(platform, observed)
+                platform.logger.info(f"{platform.get_platform_key()} [{platform.record_type}] - "
+                                     f"当前记录: {observed or '无'}, 本地IP: {desired}")
+
+            if observed == desired:
+                platform.logger.info(f"{platform.get_platform_key()} - 记录已是最新")
+                self._finish(platform, IN_SYNC, observed)
+                results[platform] = None
+            else:
+                platform.logger.info(f"{platform.get_platform_key()} DNS记录需要更新: "
+                                     f"{platform.record_type}: {observed} -> {desired}")
+                changes.append((platform, desired))
+
+        if changes and deadline.expired():
+            self._abandon([platform for platform, _ in changes], group, results)
+            return results
+
+        if changes:
+            try:
+                if group.platform_class.supports(CAP_BATCH_WRITE):
+                    written = group.platform_class.write_batch(changes)
+                else:
+                    written = {platform: platform.write(value) for platform, value in changes}
+            except Exception as e:
+                self.logger.error(f"[{group.platform_class.__name__}][{group.zone}] - 写入失败: {str(e)}")
+                written = {}
+
+            for platform, desired in changes:
+                success = bool(written.get(platform))
+                if success:
+                    self._finish(platform, IN_SYNC, desired)
+                else:
+                    self._finish(platform, ERROR)
+                results[platform] = success
+
+        self.latency.observe(group.latency_key, time.perf_counter() - started)
+        return results
+
+    def run(self, platforms, ipv4, ipv6):
+        """
+        在当前线程中生成并执行全部计划
+        Returns:
+            dict: 平台实例 -> True / False / None
+        """
+        results = {}
+        for group in self.plan(platforms, ipv4, ipv6):
+            results.update(self.execute(group))
+        return results
+
+    def skip(self, group):
+        """放弃整组计划，例如在开始执行前时间预算已用完"""
+        results = {}
+        self._abandon([platform for platform, _, _ in group.items], group, results)
+        return results
+
+    def _abandon(self, platforms, group, results):
+        """时间预算用完，放弃尚未执行的记录"""
+        self.logger.warning(f"[{group.platform_class.__name__}][{group.zone}] - "
+                            f"超出时间预算，跳过 {len(platforms)} 条记录")
+        for platform in platforms:
+            self._finish(platform, UNKNOWN)
+            results[platform] = None
+
+    @staticmethod
+    def _state_key(platform):
+        """持久保存记录值所用的状态键，由记录标识键生成，凭据变化后不沿用旧状态"""
+        return 'record:' + '|'.join(str(part) for part in platform.get_record_key())
+
+    def _restore(self, platform, desired):
+        """
+        从持久保存的运行状态恢复记录状态。只恢复与期望值一致的记录，
+        其余记录需要先读取，写入所需的记录ID等信息只能由读取获得
+        """
+        state = RecordState()
+        if self.state_store is None:
+            return state
+        saved = self.state_store.get_state(self._state_key(platform))
+        if isinstance(saved, dict) and saved.get('value') == desired:
+            state.status = IN_SYNC
+            state.observed = desired
+            state.checked_at = float(saved.get('checked_at') or 0)
+        return state
+
+    def _get_state(self, platform):
+        """获取记录状态，不存在时创建"""
+        with self._lock:
+            return self._states.setdefault(platform.get_record_key(), RecordState())
+
+    def _observe(self, platform, observed):
+        """记下读取到的记录值"""
+        state = self._get_state(platform)
+        with self._lock:
+            state.observed = observed
+            state.checked_at = time.time()
+
+    def _finish(self, platform, status, observed=None):
+        """记录执行结束后的状态"""
+        state = self._get_state(platform)
+        with self._lock:
+            state.status = status
+            if status == IN_SYNC:
+                state.observed = observed
+                state.checked_at = time.time()
+        if status == IN_SYNC and self.state_store is not None:
+            self.state_store.set_state(self._state_key(platform), {'value': observed, 'checked_at': state.checked_at})
+
+    def prune(self, platforms):
+        """
+        丢弃已移除记录的状态
+        Args:
+            platforms: 当前的 platform_key -> 平台实例
+        """
+        keys = {platform.get_record_key() for platform in platforms.values()}
+        with self._lock:
+            for key in list(self._states):
+                if key not in keys:
+                    del self._states[key]
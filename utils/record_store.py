@@ -0,0 +1,178 @@
+"""
+@Project ：DDNS
+@File    ：record_store.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+记录存储：按 (平台, 主机名, 域名, 记录类型) 建立主索引，按凭据和区域建立二级索引，
+查询、更新和删除单条记录均为 O(1)
+"""
+
+from dns_platforms.base import BaseDNS
+
+
+def make_key(platform_name, record):
+    """
+    计算记录的主键
+    Args:
+        platform_name: 平台标识
+        record: 记录配置
+    Returns:
+        tuple: (平台标识, 主机名, 域名, 记录类型)
+    """
+    return platform_name, record.get('hostname', '@'), record.get('domain', ''), record.get('record_type', 'A')
+
+
+class RecordStore:
+    """
+    DNS记录的内存索引，非线程安全，由 Config 在锁内维护。
+    记录按插入顺序保存，修改已有记录不改变其位置
+    """
+
+    def __init__(self):
+        self._records = {}  # 主键 -> 记录配置
+        self._by_credential = {}  # (平台标识, 凭据指纹) -> {主键}
+        self._by_zone = {}  # (平台标识, 域名) -> {主键: None}，保持插入顺序
+        self._fingerprints = {}  # 主键 -> 凭据指纹
+
+    @classmethod
+    def from_platforms(cls, platforms):
+        """
+        从配置中的 platforms 字段构建
+        Args:
+            platforms: 平台标识 -> 记录配置列表（或单条记录配置）
+        Returns:
+            RecordStore
+        """
+        store = cls()
+        for platform_name, records in (platforms or {}).items():
+            if not isinstance(records, (list, tuple)):
+                records = [records]
+            for record in records:
+                store.upsert(platform_name, dict(record))
+        return store
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, key):
+        return key in self._records
+
+    def __iter__(self):
+        """遍历 (主键, 记录配置)"""
+        return iter(self._records.items())
+
+    def get(self, key):
+        """
+        获取记录
+        Args:
+            key: 主键
+        Returns:
+            dict: 记录配置的副本，不存在返回None
+        """
+        record = self._records.get(key)
+        return dict(record) if record is not None else None
+
+    def upsert(self, platform_name, record, old_key=None):
+        """
+        新增或修改记录
+        Args:
+            platform_name: 平台标识
+            record: 记录配置
+            old_key: 修改前的主键，主机名、域名或记录类型被修改时传入
+        Returns:
+            tuple: 记录的主键
+        """
+        key = make_key(platform_name, record)
+        if old_key is not None and old_key != key:
+            self.delete(old_key)
+        self._unindex(key)
+
+        self._records[key] = record
+        fingerprint = BaseDNS.credential_fingerprint(record)
+        self._fingerprints[key] = fingerprint
+        self._by_credential.setdefault((platform_name, fingerprint), set()).add(key)
+        self._by_zone.setdefault((platform_name, key[2]), {})[key] = None
+        return key
+
+    def delete(self, key):
+        """
+        删除记录
+        Args:
+            key: 主键
+        Returns:
+            bool: 记录是否存在
+        """
+        if key not in self._records:
+            return False
+        self._unindex(key)
+        del self._records[key]
+        return True
+
+    def _unindex(self, key):
+        """从二级索引中移除记录"""
+        fingerprint = self._fingerprints.pop(key, None)
+        if fingerprint is None:
+            return
+        keys = self._by_credential.get((key[0], fingerprint))
+        if keys:
+            keys.discard(key)
+            if not keys:
+                del self._by_credential[(key[0], fingerprint)]
+        keys = self._by_zone.get((key[0], key[2]))
+        if keys:
+            keys.pop(key, None)
+            if not keys:
+                del self._by_zone[(key[0], key[2])]
+
+    def by_credential(self, platform_name, fingerprint):
+        """
+        获取使用同一凭据的记录
+        Args:
+            platform_name: 平台标识
+            fingerprint: 凭据指纹，见 BaseDNS.credential_fingerprint
+        Returns:
+            list: 主键列表
+        """
+        return list(self._by_credential.get((platform_name, fingerprint), ()))
+
+    def by_zone(self, platform_name, domain):
+        """
+        获取同一区域的记录
+        Args:
+            platform_name: 平台标识
+            domain: 域名
+        Returns:
+            list: 主键列表，按插入顺序
+        """
+        return list(self._by_zone.get((platform_name, domain), ()))
+
+    def credentials(self):
+        """所有凭据，(平台标识, 凭据指纹) 列表"""
+        return list(self._by_credential)
+
+    def zones(self):
+        """所有区域，(平台标识, 域名) 列表"""
+        return list(self._by_zone)
+
+    def fingerprint(self, key):
+        """
+        获取记录的凭据指纹
+        Args:
+            key: 主键
+        Returns:
+            str: 凭据指纹，记录不存在返回None
+        """
+        return self._fingerprints.get(key)
+
+    def to_platforms(self):
+        """
+        转换为配置中的 platforms 字段
+        Returns:
+            dict: 平台标识 -> 记录配置列表
+        """
+        platforms = {}
+        for key, record in self._records.items():
+            platforms.setdefault(key[0], []).append(record)
+        return platforms
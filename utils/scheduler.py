@@ -0,0 +1,146 @@
+"""
+@Project ：DDNS
+@File    ：scheduler.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+记录调度：每条记录有独立的更新间隔和优先级，按下次运行时间保存在最小堆中，
+首次运行时间按记录键哈希错开，避免所有记录同时请求接口
+"""
+
+import hashlib
+import heapq
+import itertools
+import time
+
+# 优先级，数值越小越优先
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_HIGH: '高',
+    PRIORITY_NORMAL: '普通',
+    PRIORITY_LOW: '低',
+}
+
+_REMOVED = None  # 已删除条目的占位键
+
+
+def stable_phase(key, interval):
+    """
+    计算记录在间隔内的固定相位，重启和重新加载后保持不变
+    Args:
+        key: 记录键
+        interval: 间隔（秒）
+    Returns:
+        float: 间隔内的偏移（秒）
+    """
+    digest = hashlib.md5(key.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % int(interval * 1000) / 1000
+
+
+class RecordScheduler:
+    """
+    基于最小堆的记录调度器。
+    堆中条目为 [下次运行时间, 优先级, 序号, 记录键]，删除和修改采用惰性删除：
+    只把旧条目的记录键置空，弹出时跳过，每次调度事件的开销为 O(log n)
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}  # 记录键 -> 堆中条目
+        self._specs = {}  # 记录键 -> (间隔, 优先级)
+        self._counter = itertools.count()
+        self._removed = 0  # 堆中已删除的条目数
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, key, interval, priority=PRIORITY_NORMAL, now=None):
+        """
+        添加或修改记录的调度，间隔和优先级未变化时保持原有的下次运行时间
+        Args:
+            key: 记录键
+            interval: 更新间隔（秒）
+            priority: 优先级
+            now: 当前时间，默认 time.monotonic()
+        """
+        spec = (interval, priority)
+        if self._specs.get(key) == spec:
+            return
+
+        self.remove(key)
+        now = time.monotonic() if now is None else now
+        self._push(key, now + stable_phase(key, interval), priority)
+        self._specs[key] = spec
+
+    def remove(self, key):
+        """删除记录的调度"""
+        entry = self._entries.pop(key, None)
+        if entry:
+            entry[-1] = _REMOVED
+            self._removed += 1
+        self._specs.pop(key, None)
+
+        # 已删除的条目过多时重建堆
+        if self._removed > 64 and self._removed > len(self._entries):
+            self._heap = [entry for entry in self._heap if entry[-1] is not _REMOVED]
+            heapq.heapify(self._heap)
+            self._removed = 0
+
+    def sync(self, specs, now=None):
+        """
+        与当前记录集合同步：删除已移除的记录，添加新增或修改的记录
+        Args:
+            specs: 记录键 -> (间隔, 优先级)
+            now: 当前时间
+        """
+        for key in [key for key in self._entries if key not in specs]:
+            self.remove(key)
+        for key, (interval, priority) in specs.items():
+            self.add(key, interval, priority, now)
+
+    def pop_due(self, now=None):
+        """
+        弹出所有已到期的记录，并按各自的间隔安排下次运行
+        Args:
+            now: 当前时间，默认 time.monotonic()
+        Returns:
+            list: 到期的记录键，按优先级排列
+        """
+        now = time.monotonic() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            next_run, priority, _, key = heapq.heappop(self._heap)
+            if key is _REMOVED:
+                self._removed -= 1
+                continue
+            due.append((priority, key))
+
+            # 保持相位不变；落后超过一个间隔时从现在重新开始
+            interval = self._specs[key][0]
+            next_run += interval
+            if next_run <= now:
+                next_run = now + interval
+            self._push(key, next_run, priority)
+
+        due.sort(key=lambda item: item[0])
+        return [key for _, key in due]
+
+    def next_due(self):
+        """
+        获取最近一次到期时间
+        Returns:
+            float: time.monotonic() 时间，无记录返回None
+        """
+        while self._heap and self._heap[0][-1] is _REMOVED:
+            heapq.heappop(self._heap)
+            self._removed -= 1
+        return self._heap[0][0] if self._heap else None
+
+    def _push(self, key, next_run, priority):
+        entry = [next_run, priority, next(self._counter), key]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
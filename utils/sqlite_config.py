@@ -0,0 +1,348 @@
+"""
+@Project ：DDNS
+@File    ：sqlite_config.py
+@IDE     ：PyCharm
+@Author  ：杨逸轩
+@Date    ：2024/12/15
+
+SQLite配置存储：记录、设置、其他顶层字段（如 include）和运行状态分表保存，修改单条记录只写一行，
+适合记录数量很多的场景，支持与 config.json 互相导入导出
+"""
+
+import copy
+import json
+import os
+import sqlite3
+import time
+
+from config import Config
+from utils.record_store import make_key
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS records (
+    platform TEXT NOT NULL,
+    hostname TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    record_type TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (platform, hostname, domain, record_type)
+);
+CREATE INDEX IF NOT EXISTS records_zone ON records (platform, domain);
+CREATE INDEX IF NOT EXISTS records_position ON records (position);
+CREATE TABLE IF NOT EXISTS settings (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+'''
+
+
+class SqliteConfig(Config):
+    """
+    SQLite存储的配置，接口与 Config 相同。
+    使用WAL模式，GUI和后台进程可同时读写；其他进程提交的修改通过 PRAGMA data_version 发现
+    """
+
+    DB_FILE = "config.db"  # 数据库路径在根目录
+
+    def __init__(self, db_file=None):
+        """
+        Args:
+            db_file: 数据库路径，默认 DB_FILE
+        """
+        self.db_file = db_file or self.DB_FILE
+        self._conn = None
+        self._data_version = None
+        self._next_position = 0
+        super().__init__()
+
+    def _open(self):
+        """打开数据库，首次使用时导入已有的 config.json"""
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA busy_timeout=10000')
+        self._conn.executescript(SCHEMA)
+
+        empty = not self._conn.execute('SELECT 1 FROM settings LIMIT 1').fetchone() and \
+            not self._conn.execute('SELECT 1 FROM records LIMIT 1').fetchone()
+        if empty:
+            if os.path.exists(self.config_file):
+                self.import_json(self.config_file)
+            else:
+                self.save_config(self.default_config)
+        self._refresh()
+
+    def _transaction(self):
+        """开始写事务，返回连接（配合 with 使用，异常时回滚）"""
+        self._conn.execute('BEGIN IMMEDIATE')
+        return _Transaction(self._conn)
+
+    def _refresh(self):
+        """首次调用或其他进程提交修改后重新读取"""
+        with self._lock:
+            version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+            if self._data is not None and version == self._data_version:
+                return
+            self._data_version = version
+
+            try:
+                data = {}
+                for name, value in self._conn.execute('SELECT name, value FROM meta'):
+                    data[name] = json.loads(value)
+                data['platforms'], data['settings'] = {}, {}
+                for name, value in self._conn.execute('SELECT name, value FROM settings'):
+                    data['settings'][name] = json.loads(value)
+                position = -1
+                for platform_name, position, value in self._conn.execute(
+                        'SELECT platform, position, data FROM records ORDER BY position'):
+                    data['platforms'].setdefault(platform_name, []).append(json.loads(value))
+                self._next_position = position + 1
+            except Exception as e:
+                self.logger.error(f"读取配置数据库失败: {str(e)}")
+                if self._data is not None:
+                    return
+                data = copy.deepcopy(self.default_config)
+
+            self._set_data(data, None)
+
+    def save_config(self, config, immediate=False):
+        """
+        在一个事务中保存完整配置，只写入有变化的行，失败时抛出异常
+        Args:
+            config: 完整配置
+            immediate: 兼容 Config 的参数，SQLite模式总是立即写入
+        """
+        with self._lock:
+            # 先读取其他进程已提交的修改，与最新的行比较
+            if self._conn is not None:
+                self._refresh()
+            current = {}
+            if self._records is not None:
+                current = {key: record for key, record in self._records}
+
+            rows = {}
+            for platform_name, records in config.get('platforms', {}).items():
+                if not isinstance(records, list):
+                    records = [records]
+                for record in records:
+                    rows[make_key(platform_name, record)] = record
+
+            # 保留下来的记录顺序未变、新增的记录都在末尾时，只写入新增和修改的行，否则重新编号
+            keys = list(rows)
+            kept = [key for key in keys if key in current]
+            kept_order = kept == [key for key in current if key in rows] and keys[:len(kept)] == kept
+            next_position = self._next_position if kept_order else 0
+
+            with self._transaction() as conn:
+                for key in current.keys() - rows.keys():
+                    conn.execute('DELETE FROM records WHERE platform=? AND hostname=? AND domain=? '
+                                 'AND record_type=?', key)
+                for key, record in rows.items():
+                    if kept_order and key in current:
+                        if current[key] != record:
+                            self._write_record(conn, key, record)
+                        continue
+                    self._write_record(conn, key, record, next_position)
+                    next_position += 1
+
+                conn.execute('DELETE FROM settings')
+                conn.executemany('INSERT INTO settings (name, value) VALUES (?, ?)',
+                                 [(name, json.dumps(value, ensure_ascii=False))
+                                  for name, value in config.get('settings', {}).items()])
+                conn.execute('DELETE FROM meta')
+                conn.executemany('INSERT INTO meta (name, value) VALUES (?, ?)',
+                                 [(name, json.dumps(value, ensure_ascii=False))
+                                  for name, value in config.items() if name not in ('platforms', 'settings')])
+
+            self._next_position = next_position
+            self._set_data(copy.deepcopy(config), None)
+
+    @staticmethod
+    def _write_record(conn, key, record, position=None):
+        """
+        写入一行记录
+        Args:
+            conn: 数据库连接
+            key: 主键
+            record: 记录配置
+            position: 排列位置，为None时只更新已有行的内容
+        """
+        data = json.dumps(record, ensure_ascii=False)
+        if position is None:
+            conn.execute('UPDATE records SET data=? WHERE platform=? AND hostname=? AND domain=? AND record_type=?',
+                         (data, *key))
+            return
+        conn.execute('INSERT INTO records (platform, hostname, domain, record_type, position, data) '
+                     'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (platform, hostname, domain, record_type) '
+                     'DO UPDATE SET data=excluded.data, position=excluded.position',
+                     (*key, position, data))
+
+    def upsert_record(self, platform_name, record, old_key=None):
+        """新增或修改单条记录，只写入一行"""
+        self._refresh()
+        with self._lock:
+            key = make_key(platform_name, record)
+            try:
+                with self._transaction() as conn:
+                    position = None
+                    for old in (old_key, key):
+                        if old is None:
+                            continue
+                        row = conn.execute('SELECT position FROM records WHERE platform=? AND hostname=? '
+                                           'AND domain=? AND record_type=?', old).fetchone()
+                        if row:
+                            position = row[0]
+                            break
+                    if old_key is not None and old_key != key:
+                        conn.execute('DELETE FROM records WHERE platform=? AND hostname=? AND domain=? '
+                                     'AND record_type=?', old_key)
+                    if position is None:
+                        position = self._next_position
+                        self._next_position += 1
+                    self._write_record(conn, key, record, position)
+            except Exception as e:
+                self.logger.error(f"保存记录失败: {str(e)}")
+                return None
+
+            self._records.upsert(platform_name, dict(record), old_key)
+            self._records_modified = True
+            self.generation += 1
+        return key
+
+    def upsert_records(self, records):
+        """批量新增或修改记录，在一个事务中写入"""
+        self._refresh()
+        with self._lock:
+            rows = []
+            for platform_name, record in records:
+                key = make_key(platform_name, record)
+                position = None
+                if key not in self._records:
+                    position = self._next_position
+                    self._next_position += 1
+                rows.append((platform_name, record, key, position))
+
+            try:
+                with self._transaction() as conn:
+                    for _, record, key, position in rows:
+                        self._write_record(conn, key, record, position)
+            except Exception as e:
+                self.logger.error(f"批量保存记录失败: {str(e)}")
+                return 0
+
+            for platform_name, record, _, _ in rows:
+                self._records.upsert(platform_name, dict(record))
+            if rows:
+                self._records_modified = True
+                self.generation += 1
+        return len(rows)
+
+    def delete_record(self, key):
+        """删除单条记录，只删除一行"""
+        self._refresh()
+        with self._lock:
+            try:
+                with self._transaction() as conn:
+                    conn.execute('DELETE FROM records WHERE platform=? AND hostname=? AND domain=? '
+                                 'AND record_type=?', key)
+            except Exception as e:
+                self.logger.error(f"删除记录失败: {str(e)}")
+                return False
+
+            deleted = self._records.delete(key)
+            if deleted:
+                self._records_modified = True
+                self.generation += 1
+        return deleted
+
+    def flush(self):
+        """SQLite模式下修改已立即写入"""
+        return True
+
+    def get_state(self, key, default=None):
+        """获取持久保存的运行状态"""
+        with self._lock:
+            try:
+                row = self._conn.execute('SELECT value FROM state WHERE key=?', (key,)).fetchone()
+            except Exception as e:
+                self.logger.error(f"读取运行状态失败: {str(e)}")
+                return default
+        return json.loads(row[0]) if row else default
+
+    def set_state(self, key, value):
+        """持久保存运行状态"""
+        with self._lock:
+            try:
+                self._conn.execute('INSERT INTO state (key, value, updated_at) VALUES (?, ?, ?) '
+                                   'ON CONFLICT (key) DO UPDATE SET value=excluded.value, updated_at=excluded.updated_at',
+                                   (key, json.dumps(value, ensure_ascii=False), time.time()))
+            except Exception as e:
+                self.logger.error(f"保存运行状态失败: {str(e)}")
+
+    def import_json(self, path):
+        """
+        从JSON配置文件导入，替换数据库中的记录和设置
+        Args:
+            path: JSON配置文件路径
+        Returns:
+            bool: 是否成功
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except Exception as e:
+            self.logger.error(f"读取JSON配置失败: {str(e)}")
+            return False
+
+        try:
+            self.save_config(config)
+        except Exception as e:
+            self.logger.error(f"导入JSON配置失败: {str(e)}")
+            return False
+        self.logger.info(f"已从 {path} 导入配置，共 {len(self._records)} 条记录")
+        return True
+
+    def export_json(self, path):
+        """
+        导出为JSON配置文件（原子替换）
+        Args:
+            path: 导出路径
+        Returns:
+            bool: 是否成功
+        """
+        temp_file = f"{path}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.load_config(), f, indent=4, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, path)
+            self.logger.info(f"配置已导出到 {path}")
+            return True
+        except Exception as e:
+            self.logger.error(f"导出JSON配置失败: {str(e)}")
+            return False
+
+
+class _Transaction:
+    """写事务，正常结束时提交，异常时回滚"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
@@ -6,13 +6,14 @@
 @Date    ：2023/12/02
 """
 
-import importlib
 import os
 import tempfile
 
-import requests
 from PySide6.QtCore import QThread, Signal
 
+from dns_platforms import get_platform_class
+from utils import bulk_io, deadline, http_client
+from utils.config_diff import record_platform_key
 from utils.logger import Logger
 
 
@@ -37,63 +38,81 @@ class BaseThread(QThread):
         return self._is_running
 
 
-class DNSUpdateThread(BaseThread):
-    """DNS更新线程"""
+class DNSPlanThread(BaseThread):
+    """DNS计划执行线程，执行同一平台、同一区域的一组调和计划"""
 
-    def __init__(self, platform, ipv4, ipv6):
+    def __init__(self, reconciler, group, cycle_deadline=None):
         super().__init__()
-        self.platform = platform
-        self.ipv4 = ipv4
-        self.ipv6 = ipv6
+        self.reconciler = reconciler
+        self.group = group
+        self.deadline = cycle_deadline
 
     def run(self):
         if not self._check_running():
             return
 
         try:
-            # 获取当前记录
-            current_ipv4, current_ipv6 = self.platform.get_current_records()
-            platform_key = self.platform.get_platform_key()
-            record_type = self.platform.record_type
-
-            # 选择要更新的IP
-            current_ip = current_ipv4 if record_type == 'A' else current_ipv6
-            new_ip = self.ipv4 if record_type == 'A' else self.ipv6
-
-            self.logger.info(f"{platform_key} [{record_type}] - 当前记录: {current_ip or '无'}, 本地IP: {new_ip}")
-
-            # 检查是否需要更新
-            if new_ip and current_ip != new_ip and self._check_running():
-                if self.platform.update_records(self.ipv4, self.ipv6):
-                    self.success.emit(True)
-                else:
-                    self.error.emit("更新失败")
-            else:
-                self.logger.info(f"{platform_key} - 记录已是最新")
-                self.success.emit(False)  # 不需要更新
+            with deadline.scope(self.deadline):
+                results = self.reconciler.execute(self.group)
+            self.success.emit(results)
+        except Exception as e:
+            self.logger.error(f"[{self.group.platform_class.__name__}][{self.group.zone}] - 更新失败: {str(e)}")
+            self.error.emit(str(e))
+        finally:
+            self.finished.emit()
+
+
+class BulkImportThread(BaseThread):
+    """批量导入线程，读取、校验文件并确认域名，结果交给主线程写入配置"""
+
+    def __init__(self, path, verify_zones=True):
+        """
+        Args:
+            path: CSV / JSONL 文件路径
+            verify_zones: 是否在线确认域名
+        """
+        super().__init__()
+        self.path = path
+        self.verify_zones = verify_zones
 
+    def run(self):
+        if not self._check_running():
+            return
+
+        try:
+            self.success.emit(bulk_io.prepare_import(self.path, self.verify_zones))
         except Exception as e:
-            self.logger.error(f"{self.platform.get_platform_key()} - 更新失败: {str(e)}")
+            self.logger.error(f"读取导入文件失败: {str(e)}")
             self.error.emit(str(e))
         finally:
             self.finished.emit()
 
 
 class DNSInitThread(BaseThread):
-    """DNS平台初始化线程"""
-
-    def __init__(self, config):
+    """DNS平台初始化线程，只构造平台实例，Zone等元数据的发现交给 DNSWarmUpThread"""
+
+    def __init__(self, config, existing=None, records=None):
+        """
+        Args:
+            config: 配置对象
+            existing: 已加载的平台实例，platform_key -> 平台实例，配置未变化的记录直接复用
+            records: 只初始化这些记录，平台标识 -> 记录配置列表，默认为配置中的全部记录
+        """
         super().__init__()
         self.config = config
+        self.records = records
         self.platforms = {}
+        self._existing = {platform.get_record_key(): platform for platform in (existing or {}).values()}
 
     def run(self):
         if not self._check_running():
             return
 
         try:
-            config_data = self.config.load_config()
-            platforms = config_data.get('platforms', {})
+            platforms = self.records
+            if platforms is None:
+                platforms = self.config.get_platform_configs()  # 只读快照，配置未变化时不重新解析
+            reused = 0
 
             for platform_name, platform_configs in platforms.items():
                 if not self._check_running():
@@ -101,12 +120,13 @@ class DNSInitThread(BaseThread):
 
                 try:
                     # 确保配置是列表形式
-                    if not isinstance(platform_configs, list):
+                    if not isinstance(platform_configs, (list, tuple)):
                         platform_configs = [platform_configs]
 
-                    # 动态加载平台模块
-                    module = importlib.import_module(f"dns_platforms.{platform_name}")
-                    platform_class = getattr(module, f"{platform_name.title()}DNS")
+                    # 按需加载平台模块
+                    platform_class = get_platform_class(platform_name)
+                    if not platform_class:
+                        continue
 
                     # 处理每个配置
                     for config in platform_configs:
@@ -118,9 +138,17 @@ class DNSInitThread(BaseThread):
                             domain = config.get('domain', 'unknown')
                             full_domain = f"{hostname}.{domain}" if hostname != '@' else domain
 
-                            platform_key = f"{platform_name}_{full_domain}_{config.get('record_type', 'A')}"
-                            self.platforms[platform_key] = platform_class(config)
+                            platform_key = record_platform_key(platform_name, config)
+
+                            # 记录及凭据均未变化时复用已有实例，保留其缓存
+                            platform = self._existing.pop(platform_class.record_key(config), None)
+                            if platform:
+                                platform.config = config  # 调度设置可能已修改
+                                self.platforms[platform_key] = platform
+                                reused += 1
+                                continue
 
+                            self.platforms[platform_key] = platform_class(config)
                             self.logger.info(f"DNS平台初始化成功: [{platform_name.upper()}][{full_domain}]")
                         except Exception as e:
                             self.logger.error(f"初始化DNS记录失败: [{platform_name}][{full_domain}] - {str(e)}")
@@ -128,6 +156,9 @@ class DNSInitThread(BaseThread):
                 except Exception as e:
                     self.logger.error(f"加载DNS平台模块失败: {platform_name} - {str(e)}")
 
+            if reused or self._existing:
+                self.logger.debug(f"DNS平台增量加载: 复用 {reused} 个，新建 {len(self.platforms) - reused} 个，"
+                                  f"移除 {len(self._existing)} 个")
             self.success.emit(self.platforms)
 
         except Exception as e:
@@ -137,19 +168,45 @@ class DNSInitThread(BaseThread):
             self.finished.emit()
 
 
+class DNSWarmUpThread(BaseThread):
+    """DNS平台预热线程，发现单条记录的元数据，并发数量由 DNSUpdater 的预热队列限制"""
+
+    def __init__(self, platform_key, platform, warm_up_deadline=None):
+        super().__init__()
+        self.platform_key = platform_key
+        self.platform = platform
+        self.deadline = warm_up_deadline
+
+    def run(self):
+        if not self._check_running():
+            return
+
+        try:
+            with deadline.scope(self.deadline):
+                ready = self.platform.warm_up()
+            self.success.emit((self.platform_key, self.platform, ready))
+        except Exception as e:
+            self.logger.error(f"{self.platform.get_platform_key()} - 预热失败: {str(e)}")
+            self.error.emit(str(e))
+        finally:
+            self.finished.emit()
+
+
 class IPCheckThread(BaseThread):
     """IP检查线程"""
 
-    def __init__(self, ip_checker):
+    def __init__(self, ip_checker, cycle_deadline=None):
         super().__init__()
         self.ip_checker = ip_checker
+        self.deadline = cycle_deadline
 
     def run(self):
         if not self._check_running():
             return
 
         try:
-            ipv4, ipv6 = self.ip_checker.get_current_ips()
+            with deadline.scope(self.deadline):
+                ipv4, ipv6 = self.ip_checker.get_current_ips()
             self.success.emit((ipv4 or '', ipv6 or ''))
         except Exception as e:
             self.error.emit(str(e))
@@ -157,10 +214,36 @@ class IPCheckThread(BaseThread):
             self.finished.emit()
 
 
+class IPFamilyCheckThread(BaseThread):
+    """单个地址族的IP检查线程，结果就绪后立即发出，不等待另一个地址族"""
+
+    def __init__(self, ip_checker, record_type, cycle_deadline=None):
+        super().__init__()
+        self.ip_checker = ip_checker
+        self.record_type = record_type
+        self.deadline = cycle_deadline
+
+    def run(self):
+        if not self._check_running():
+            return
+
+        try:
+            with deadline.scope(self.deadline):
+                ip = self.ip_checker.get_ip(self.record_type)
+            self.success.emit((self.record_type, ip or ''))
+        except Exception as e:
+            self.error.emit(str(e))
+        finally:
+            self.finished.emit()
+
+
 class UpdateDownloadThread(BaseThread):
     """更新下载线程"""
     progress = Signal(int)
 
+    DOWNLOAD_BUDGET = 10 * 60  # 整个下载的时间预算（秒）
+    REQUEST_TIMEOUT = 15  # 连接和每次读取的超时时间（秒）
+
     def __init__(self, url):
         super().__init__()
         self.url = url
@@ -170,7 +253,18 @@ class UpdateDownloadThread(BaseThread):
             return
 
         try:
-            response = requests.get(self.url, stream=True)
+            with deadline.scope(deadline.Deadline(self.DOWNLOAD_BUDGET, '下载更新')):
+                self._download()
+        except Exception as e:
+            self.error.emit(str(e))
+        finally:
+            self.finished.emit()
+
+    def _download(self):
+        """下载到临时文件，超出时间预算时抛出 DeadlineExceeded"""
+        response = http_client.request('GET', self.url, timeout=self.REQUEST_TIMEOUT, stream=True)
+        with response:
+            response.raise_for_status()
             total_size = int(response.headers.get('content-length', 0))
 
             temp_file = tempfile.NamedTemporaryFile(delete=False)
@@ -178,32 +272,33 @@ class UpdateDownloadThread(BaseThread):
             last_progress = 0
             block_size = 8192
 
-            for data in response.iter_content(block_size):
-                if not self._check_running():
-                    temp_file.close()
-                    os.unlink(temp_file.name)
-                    return
-
-                if not data:
-                    break
-
-                downloaded += len(data)
-                temp_file.write(data)
-
-                if total_size:
-                    progress = int((downloaded / total_size) * 100)
-                    if progress > last_progress:
-                        self.progress.emit(progress)
-                        last_progress = progress
+            try:
+                for data in response.iter_content(block_size):
+                    if not self._check_running():
+                        temp_file.close()
+                        os.unlink(temp_file.name)
+                        return
+                    deadline.current().check()
+
+                    if not data:
+                        break
+
+                    downloaded += len(data)
+                    temp_file.write(data)
+
+                    if total_size:
+                        progress = int((downloaded / total_size) * 100)
+                        if progress > last_progress:
+                            self.progress.emit(progress)
+                            last_progress = progress
+            except Exception:
+                temp_file.close()
+                os.unlink(temp_file.name)
+                raise
 
             temp_file.close()
             self.success.emit(temp_file.name)
 
-        except Exception as e:
-            self.error.emit(str(e))
-        finally:
-            self.finished.emit()
-
 
 class ThreadManager:
     """线程管理器"""
@@ -227,6 +322,8 @@ class ThreadManager:
         """线程完成时的处理"""
         if thread in ThreadManager._active_threads:
             ThreadManager._active_threads.remove(thread)
+            # finished 在 run 结束前发出，等待线程真正退出后再释放
+            thread.wait()
             thread.deleteLater()
 
     def stop_all(self):
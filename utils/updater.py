@@ -5,6 +5,7 @@ import json
 import requests
 from packaging import version
 
+from utils import deadline, http_client
 from utils.logger import Logger
 from utils.threads import BaseThread, ThreadManager
 from utils.signals import Signal
@@ -49,6 +50,8 @@ class UpdateDownloadThread(BaseThread):
     """更新下载线程"""
     progress = Signal(int)
 
+    MIRROR_BUDGET = 10 * 60  # 每个镜像下载的时间预算（秒），超出后换下一个镜像
+
     def __init__(self, url):
         super().__init__()
         self.original_url = url
@@ -74,12 +77,9 @@ class UpdateDownloadThread(BaseThread):
                 mirror_name = current_url.split("/")[2]  # 获取镜像域名
                 self.logger.info(f"开始使用镜像下载: {mirror_name}")
 
-                response = requests.get(
-                    current_url,
-                    stream=True,
-                    timeout=15,
-                    verify=True
-                )
+                mirror_deadline = deadline.Deadline(self.MIRROR_BUDGET, f"镜像 {mirror_name} 下载")
+                with deadline.scope(mirror_deadline):
+                    response = http_client.request('GET', current_url, timeout=15, stream=True, verify=True)
 
                 if not response.ok:
                     self.logger.error(f"镜像 {mirror_name} 下载失败: HTTP {response.status_code}")
@@ -108,6 +108,10 @@ class UpdateDownloadThread(BaseThread):
                         os.unlink(temp_file.name)
                         self.logger.debug("下载已取消")
                         return
+                    if mirror_deadline.expired():
+                        temp_file.close()
+                        os.unlink(temp_file.name)
+                        mirror_deadline.check()
 
                     if not data:
                         break
@@ -138,7 +142,7 @@ class UpdateDownloadThread(BaseThread):
                 self.success.emit(temp_file.name)
                 return
 
-            except requests.exceptions.RequestException as e:
+            except (requests.exceptions.RequestException, deadline.DeadlineExceeded) as e:
                 mirror_name = self.download_urls[self.current_url_index].split("/")[2]
                 self.logger.error(f"镜像 {mirror_name} 下载失败: {str(e)}")
                 if self.try_next_mirror():
@@ -158,6 +162,8 @@ class UpdateDownloadThread(BaseThread):
 class UpdateCheckThread(BaseThread):
     """版本检查线程"""
 
+    CHECK_BUDGET = 30  # 检查更新的时间预算（秒）
+
     def __init__(self, current_version, api_url):
         super().__init__()
         self.current_version = current_version
@@ -171,12 +177,9 @@ class UpdateCheckThread(BaseThread):
     def run(self):
         try:
             # 发送请求
-            response = requests.get(
-                self.api_url,
-                headers=self.headers,
-                timeout=30,
-                verify=True
-            )
+            with deadline.scope(deadline.Deadline(self.CHECK_BUDGET, '检查更新')):
+                response = http_client.request('GET', self.api_url, timeout=self.CHECK_BUDGET,
+                                               headers=self.headers, verify=True)
 
             if not response.ok:
                 error_msg = f"GitHub API请求失败: HTTP {response.status_code}"
@@ -215,7 +218,7 @@ class UpdateCheckThread(BaseThread):
                 self.logger.info("当前已是最新版本")
                 self.success.emit((False, None))
 
-        except requests.exceptions.Timeout:
+        except (requests.exceptions.Timeout, deadline.DeadlineExceeded):
             error_msg = "GitHub API请求超时，请检查网络连接"
             self.logger.error(error_msg)
             self.error.emit(error_msg)